@@ -0,0 +1,95 @@
+"""
+Export all-MiniLM-L6-v2 to ONNX (fp32 and dynamically quantized int8) for the
+"onnx" embedding backend.
+
+Needs torch, transformers and onnxruntime once, at export time; the workers
+that serve queries only need onnxruntime and tokenizers.
+
+    python -m RAG.export_onnx_embeddings [--output-dir RAG/onnx_embeddings] [--no-int8]
+"""
+
+import argparse
+import os
+import time
+import numpy as np
+from services.llm_connector.embeddings import (
+    EMBEDDING_MODEL_NAME, MAX_SEQ_LENGTH, ONNX_INT8_MODEL_FILE, ONNX_MODEL_DIR, ONNX_MODEL_FILE, OnnxEmbeddings,
+)
+
+# Sentences used to check that the exported model reproduces the PyTorch vectors
+PARITY_TEXTS = [
+    "How many tracks are in the database?",
+    "Show me all customers from Germany",
+    "Table: Invoice. Columns: InvoiceId, CustomerId, InvoiceDate, BillingCountry, Total",
+    "Hello, how are you today?",
+]
+OPSET = 14
+
+
+def export_onnx(output_dir: str = ONNX_MODEL_DIR, int8: bool = True) -> str:
+    """Write model.onnx (+ model_int8.onnx) and tokenizer.json to output_dir"""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    class _Encoder(torch.nn.Module):
+        """Returns last_hidden_state only; pooling is done by OnnxEmbeddings"""
+
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask,
+                              token_type_ids=token_type_ids).last_hidden_state
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(EMBEDDING_MODEL_NAME)
+    tokenizer.save_pretrained(output_dir)
+    model = AutoModel.from_pretrained(EMBEDDING_MODEL_NAME).eval()
+
+    sample = tokenizer(PARITY_TEXTS[:2], padding=True, truncation=True, max_length=MAX_SEQ_LENGTH, return_tensors="pt")
+    model_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    with torch.no_grad():
+        torch.onnx.export(
+            _Encoder(model),
+            tuple(sample[name] for name in names),
+            model_path,
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={**{name: {0: "batch", 1: "sequence"} for name in names},
+                          "last_hidden_state": {0: "batch", 1: "sequence"}},
+            opset_version=OPSET,
+        )
+    print(f"✅ [RAG/export_onnx_embeddings.py:export_onnx] Exported {model_path}")
+
+    if int8:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        int8_path = os.path.join(output_dir, ONNX_INT8_MODEL_FILE)
+        quantize_dynamic(model_path, int8_path, weight_type=QuantType.QInt8)
+        print(f"✅ [RAG/export_onnx_embeddings.py:export_onnx] Quantized {int8_path}")
+    return output_dir
+
+
+def check_parity(output_dir: str = ONNX_MODEL_DIR, int8: bool = True):
+    """Cosine similarity between PyTorch and ONNX vectors for a few sentences"""
+    from langchain_huggingface.embeddings import HuggingFaceEmbeddings
+    reference = np.asarray(HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME).embed_documents(PARITY_TEXTS))
+    for quantized in ([False, True] if int8 else [False]):
+        vectors = np.asarray(OnnxEmbeddings(output_dir, quantized=quantized).embed_documents(PARITY_TEXTS))
+        cosine = (reference * vectors).sum(axis=1)
+        print(f"{'int8' if quantized else 'fp32'}: cosine to PyTorch min {cosine.min():.4f}, mean {cosine.mean():.4f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX for the onnx backend")
+    parser.add_argument("--output-dir", default=ONNX_MODEL_DIR)
+    parser.add_argument("--no-int8", action="store_true", help="Skip the int8 quantized model")
+    parser.add_argument("--skip-parity", action="store_true", help="Do not compare against the PyTorch model")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    export_onnx(args.output_dir, int8=not args.no_int8)
+    if not args.skip_parity:
+        check_parity(args.output_dir, int8=not args.no_int8)
+    print(f"Done in {time.perf_counter() - start:.1f}s")
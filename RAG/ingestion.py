@@ -1,27 +1,260 @@
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+import numpy as np
+from langchain_core.documents import Document
 from langchain_community.document_loaders import TextLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from RAG.schema_extractor import extract_table_schemas, format_schema_chunk, format_column_chunk
+from services.llm_connector.embeddings import EMBEDDING_MODEL_NAME, load_embeddings
+from services.llm_connector.index_store import (INDEX_TYPE, INDEX_TYPES, LEGACY_FILES, STORE_FILES, VERSION_PREFIX, build_index,
+                                                is_store, publish_store, store_path, write_store)
 
-def create_faiss_index():
-    """Create FAISS index from knowledge base"""
+DB_PATH = os.path.join("persistence", "db", "Chinook_Sqlite.db")
+KNOWLEDGE_BASE_PATH = os.path.join("RAG", "chinook_knowledge_base.txt")
+INDEX_PATH = os.path.join("RAG", "faiss_index")
+
+# Incremental ingestion bookkeeping, stored next to the index files
+MANIFEST_NAME = "manifest.json"
+VECTOR_CACHE_NAME = "vector_cache.npz"
+BATCH_SIZE = int(os.getenv("INGESTION_BATCH_SIZE", "64"))
+WORKERS = int(os.getenv("INGESTION_WORKERS", "4"))
+
+
+def load_business_rules(knowledge_base_path: str = KNOWLEDGE_BASE_PATH) -> Dict[str, List[str]]:
+    """Pull the business rules and example queries out of the knowledge base text"""
+    with open(knowledge_base_path, "r", encoding="utf-8") as f:
+        text = f.read()
+
+    sections = {"rules": [], "examples": []}
+    current = None
+    for block in text.split("\n---\n"):
+        block = block.strip()
+        if block.startswith("[BUSINESS LOGIC]"):
+            current = "rules"
+            block = block[len("[BUSINESS LOGIC]"):]
+        elif block.startswith("[EXAMPLE QUERIES]"):
+            current = "examples"
+            block = block[len("[EXAMPLE QUERIES]"):]
+        elif block.startswith("["):
+            current = None
+
+        if current == "rules":
+            sections["rules"].extend(line[2:].strip() for line in block.splitlines() if line.startswith("- "))
+        elif current == "examples" and block.strip().startswith("Q:"):
+            sections["examples"].append(block.strip())
+
+    return sections
+
+
+def _mentioned_tables(text: str, tables: List[str]) -> List[str]:
+    """Return the table names that appear as whole words in the text"""
+    return [table for table in tables if re.search(rf"\b{re.escape(table)}\b", text)]
+
+
+def build_schema_documents(db_path: str = DB_PATH, knowledge_base_path: str = KNOWLEDGE_BASE_PATH) -> List[Document]:
+    """Build one document per table, per column and per business rule"""
+    schemas = extract_table_schemas(db_path)
+    tables = [schema["table"] for schema in schemas]
+
+    docs = []
+    for schema in schemas:
+        docs.append(Document(
+            page_content=format_schema_chunk(schema),
+            metadata={"kind": "table", "table": schema["table"]}
+        ))
+        for column in schema["columns"]:
+            docs.append(Document(
+                page_content=format_column_chunk(schema, column),
+                metadata={"kind": "column", "table": schema["table"], "column": column["name"]}
+            ))
+
+    if os.path.exists(knowledge_base_path):
+        sections = load_business_rules(knowledge_base_path)
+        for rule in sections["rules"]:
+            docs.append(Document(
+                page_content=f"Business rule: {rule}",
+                metadata={"kind": "rule", "tables": ",".join(_mentioned_tables(rule, tables))}
+            ))
+        for example in sections["examples"]:
+            docs.append(Document(
+                page_content=example,
+                metadata={"kind": "example", "tables": ",".join(_mentioned_tables(example, tables))}
+            ))
+
+    return docs
+
+
+def build_text_documents(knowledge_base_path: str = KNOWLEDGE_BASE_PATH) -> List[Document]:
+    """Split the knowledge base text into fixed-size chunks"""
+    loader = TextLoader(knowledge_base_path, encoding="utf-8")
+    docs = loader.load()
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+    return splitter.split_documents(docs)
+
+
+def _content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _chunk_id(doc: Document) -> str:
+    """Stable id for a chunk: its text plus its metadata"""
+    payload = doc.page_content + "\0" + json.dumps(doc.metadata, sort_keys=True)
+    return _content_hash(payload)
+
+
+def load_manifest(index_path: str = INDEX_PATH) -> Dict:
+    manifest_path = os.path.join(index_path, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_vector_cache(index_path: str = INDEX_PATH) -> Dict[str, np.ndarray]:
+    """Return content hash -> embedding for every vector computed by a previous run"""
+    cache_path = os.path.join(index_path, VECTOR_CACHE_NAME)
+    if not os.path.exists(cache_path):
+        return {}
+    with np.load(cache_path) as data:
+        return dict(zip(data["hashes"].tolist(), data["vectors"]))
+
+
+def _save_vector_cache(cache: Dict[str, np.ndarray], index_path: str):
+    hashes = list(cache)
+    vectors = np.array([cache[h] for h in hashes], dtype=np.float32)
+    np.savez(os.path.join(index_path, VECTOR_CACHE_NAME), hashes=np.array(hashes), vectors=vectors)
+
+
+def embed_in_batches(embedding_model, texts: List[str], batch_size: int = BATCH_SIZE, workers: int = WORKERS) -> List[List[float]]:
+    """Embed texts in fixed-size batches spread across a thread pool, preserving order"""
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    if not batches:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(batches)))) as pool:
+        results = pool.map(embedding_model.embed_documents, batches)
+    return [vector for batch in results for vector in batch]
+
+
+def _save_store_atomically(index, documents: List, info: Dict, index_path: str):
+    """Write the store to a new versioned subdirectory, then switch CURRENT over to it in one rename"""
+    os.makedirs(index_path, exist_ok=True)
+    previous = os.path.basename(store_path(index_path))
+    version = f"{VERSION_PREFIX}{time.time_ns()}"
+    build_path = os.path.join(index_path, version)
+    try:
+        write_store(build_path, index, documents, info)
+        publish_store(index_path, version)
+    except BaseException:
+        shutil.rmtree(build_path, ignore_errors=True)
+        raise
+    # The replaced build stays for readers still opening it; older builds and files of the flat layouts go
+    for name in os.listdir(index_path):
+        if name.startswith(VERSION_PREFIX) and name not in (version, previous):
+            shutil.rmtree(os.path.join(index_path, name), ignore_errors=True)
+        elif name in STORE_FILES or name in LEGACY_FILES:
+            os.remove(os.path.join(index_path, name))
+
+
+def create_faiss_index(mode: str = "text", batch_size: int = BATCH_SIZE, workers: int = WORKERS,
+                       full_rebuild: bool = False, index_path: str = INDEX_PATH, embedding_backend: str = None,
+                       index_type: str = INDEX_TYPE, db_path: str = DB_PATH) -> Dict:
+    """
+    Create or incrementally update the FAISS index from the knowledge base
+    ("text" chunks or "schema" units of the database at db_path).
+
+    Chunks whose content hash is already in the vector cache are reused and
+    new or changed chunks are embedded in batches across a worker pool. The
+    index itself (flat, hnsw or ivfpq) is rebuilt from the cached vectors
+    and written as a store with an offset-indexed document file.
+    """
     try:
-        loader = TextLoader(r"RAG\chinook_knowledge_base.txt", encoding="utf-8")
-        docs = loader.load()
-        
-        splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-        chunks = splitter.split_documents(docs)
-        
-        embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-        
-        vectorstore = FAISS.from_documents(chunks, embedding_model)
-        vectorstore.save_local(r"RAG\faiss_index")
-        
-        print("✅ [RAG/ingestion.py:create_faiss_index] FAISS index created successfully")
-        
+        start = time.perf_counter()
+        if mode == "schema":
+            chunks = build_schema_documents(db_path)
+        elif mode == "text":
+            chunks = build_text_documents()
+        else:
+            raise ValueError(f"Unknown ingestion mode: {mode}")
+
+        docs_by_id = {}
+        for doc in chunks:
+            docs_by_id.setdefault(_chunk_id(doc), doc)
+
+        manifest = load_manifest(index_path)
+        incremental = (not full_rebuild and is_store(index_path) and manifest.get("mode") == mode
+                       and manifest.get("model") == EMBEDDING_MODEL_NAME and manifest.get("index_type") == index_type)
+        indexed_ids = set(manifest.get("chunks", {})) if incremental else set()
+        vector_cache = load_vector_cache(index_path) if manifest.get("model") == EMBEDDING_MODEL_NAME else {}
+
+        added_ids = [chunk_id for chunk_id in docs_by_id if chunk_id not in indexed_ids]
+        removed_ids = [chunk_id for chunk_id in indexed_ids if chunk_id not in docs_by_id]
+
+        # Embed each distinct text that has no cached vector yet
+        texts_by_hash = {_content_hash(doc.page_content): doc.page_content for doc in docs_by_id.values()}
+        pending = [h for h in texts_by_hash if h not in vector_cache]
+        stats = {"chunks": len(docs_by_id), "reused": len(docs_by_id) - len(pending), "embedded": len(pending),
+                 "removed": len(removed_ids), "seconds": 0.0}
+
+        if incremental and not added_ids and not removed_ids:
+            stats["seconds"] = round(time.perf_counter() - start, 3)
+            print(f"✅ [RAG/ingestion.py:create_faiss_index] FAISS index up to date ({stats['chunks']} {mode} chunks reused, 0 embedded) in {stats['seconds']}s")
+            return stats
+
+        if pending:
+            # Any backend yields vectors compatible with the index (same model, pooling and normalization)
+            embedding_model = load_embeddings(embedding_backend)
+            vectors = embed_in_batches(embedding_model, [texts_by_hash[h] for h in pending], batch_size, workers)
+            vector_cache.update(zip(pending, (np.asarray(v, dtype=np.float32) for v in vectors)))
+
+        documents = list(docs_by_id.items())
+        index, params = build_index(
+            np.array([vector_cache[_content_hash(doc.page_content)] for _, doc in documents], dtype=np.float32),
+            index_type,
+        )
+        _save_store_atomically(index, documents, {**params, "mode": mode, "model": EMBEDDING_MODEL_NAME}, index_path)
+
+        # Only keep vectors for chunks that are still indexed
+        _save_vector_cache({h: v for h, v in vector_cache.items() if h in texts_by_hash}, index_path)
+        with open(os.path.join(index_path, MANIFEST_NAME), "w", encoding="utf-8") as f:
+            json.dump({
+                "mode": mode,
+                "model": EMBEDDING_MODEL_NAME,
+                "index_type": index_type,
+                "chunks": {chunk_id: _content_hash(doc.page_content) for chunk_id, doc in docs_by_id.items()}
+            }, f, indent=2)
+
+        stats["seconds"] = round(time.perf_counter() - start, 3)
+        print(f"✅ [RAG/ingestion.py:create_faiss_index] FAISS {params['index_type']} index {'updated' if incremental else 'created'} successfully "
+              f"({stats['chunks']} {mode} chunks: {stats['reused']} reused, {stats['embedded']} embedded, "
+              f"{stats['removed']} removed) in {stats['seconds']}s")
+        return stats
+
     except Exception as e:
         print(f"❌ [RAG/ingestion.py:create_faiss_index] Error creating FAISS index: {str(e)}")
         raise
 
 if __name__ == "__main__":
-    create_faiss_index()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build the FAISS index for RAG")
+    parser.add_argument("--mode", choices=["text", "schema"], default="text",
+                        help="'text' splits the knowledge base into 500-char chunks, 'schema' indexes one document per table, column and business rule")
+    parser.add_argument("--db", default=DB_PATH, help="Database whose schema is indexed in schema mode")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Chunks per embedding batch")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Threads embedding batches in parallel")
+    parser.add_argument("--full-rebuild", action="store_true", help="Ignore the manifest and rebuild the index from scratch")
+    parser.add_argument("--embedding-backend", choices=["torch", "onnx"], default=None,
+                        help="Embedding backend (default: EMBEDDING_BACKEND, or torch)")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=INDEX_TYPE,
+                        help="flat (exact), hnsw (graph) or ivfpq (clustered + product-quantized); "
+                             "build parameters come from the FAISS_HNSW_*, FAISS_IVF_* and FAISS_PQ_* variables")
+    args = parser.parse_args()
+
+    create_faiss_index(args.mode, batch_size=args.batch_size, workers=args.workers, full_rebuild=args.full_rebuild,
+                       embedding_backend=args.embedding_backend, index_type=args.index_type, db_path=args.db)
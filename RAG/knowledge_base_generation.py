@@ -1,22 +1,20 @@
-# Construct a full RAG knowledge base text from the given JSON schema
+# Construct a full RAG knowledge base text from the live database schema
+import argparse
+import hashlib
 import json
-
-# Given schema as JSON string (truncated here, assume full schema is loaded)
-schema_json = [
-  "Table: Album\nColumns:\n  - AlbumId (INTEGER) [PK] [NOT NULL]\n  - Title (NVARCHAR(160)) [NOT NULL]\n  - ArtistId (INTEGER) [NOT NULL]\nForeign Keys:\n  - ArtistId → Artist.ArtistId",
-  "Table: Artist\nColumns:\n  - ArtistId (INTEGER) [PK] [NOT NULL]\n  - Name (NVARCHAR(120))",
-  "Table: Customer\nColumns:\n  - CustomerId (INTEGER) [PK] [NOT NULL]\n  - FirstName (NVARCHAR(40)) [NOT NULL]\n  - LastName (NVARCHAR(20)) [NOT NULL]\n  - Company (NVARCHAR(80))\n  - Address (NVARCHAR(70))\n  - City (NVARCHAR(40))\n  - State (NVARCHAR(40))\n  - Country (NVARCHAR(40))\n  - PostalCode (NVARCHAR(10))\n  - Phone (NVARCHAR(24))\n  - Fax (NVARCHAR(24))\n  - Email (NVARCHAR(60)) [NOT NULL]\n  - SupportRepId (INTEGER)\nForeign Keys:\n  - SupportRepId → Employee.EmployeeId",
-  "Table: Employee\nColumns:\n  - EmployeeId (INTEGER) [PK] [NOT NULL]\n  - LastName (NVARCHAR(20)) [NOT NULL]\n  - FirstName (NVARCHAR(20)) [NOT NULL]\n  - Title (NVARCHAR(30))\n  - ReportsTo (INTEGER)\n  - BirthDate (DATETIME)\n  - HireDate (DATETIME)\n  - Address (NVARCHAR(70))\n  - City (NVARCHAR(40))\n  - State (NVARCHAR(40))\n  - Country (NVARCHAR(40))\n  - PostalCode (NVARCHAR(10))\n  - Phone (NVARCHAR(24))\n  - Fax (NVARCHAR(24))\n  - Email (NVARCHAR(60))\nForeign Keys:\n  - ReportsTo → Employee.EmployeeId",
-  "Table: Genre\nColumns:\n  - GenreId (INTEGER) [PK] [NOT NULL]\n  - Name (NVARCHAR(120))",
-  "Table: Invoice\nColumns:\n  - InvoiceId (INTEGER) [PK] [NOT NULL]\n  - CustomerId (INTEGER) [NOT NULL]\n  - InvoiceDate (DATETIME) [NOT NULL]\n  - BillingAddress (NVARCHAR(70))\n  - BillingCity (NVARCHAR(40))\n  - BillingState (NVARCHAR(40))\n  - BillingCountry (NVARCHAR(40))\n  - BillingPostalCode (NVARCHAR(10))\n  - Total (NUMERIC(10,2)) [NOT NULL]\nForeign Keys:\n  - CustomerId → Customer.CustomerId",
-  "Table: InvoiceLine\nColumns:\n  - InvoiceLineId (INTEGER) [PK] [NOT NULL]\n  - InvoiceId (INTEGER) [NOT NULL]\n  - TrackId (INTEGER) [NOT NULL]\n  - UnitPrice (NUMERIC(10,2)) [NOT NULL]\n  - Quantity (INTEGER) [NOT NULL]\nForeign Keys:\n  - TrackId → Track.TrackId\n  - InvoiceId → Invoice.InvoiceId",
-  "Table: MediaType\nColumns:\n  - MediaTypeId (INTEGER) [PK] [NOT NULL]\n  - Name (NVARCHAR(120))",
-  "Table: Playlist\nColumns:\n  - PlaylistId (INTEGER) [PK] [NOT NULL]\n  - Name (NVARCHAR(120))",
-  "Table: PlaylistTrack\nColumns:\n  - PlaylistId (INTEGER) [PK] [NOT NULL]\n  - TrackId (INTEGER) [PK] [NOT NULL]\nForeign Keys:\n  - TrackId → Track.TrackId\n  - PlaylistId → Playlist.PlaylistId",
-  "Table: Track\nColumns:\n  - TrackId (INTEGER) [PK] [NOT NULL]\n  - Name (NVARCHAR(200)) [NOT NULL]\n  - AlbumId (INTEGER)\n  - MediaTypeId (INTEGER) [NOT NULL]\n  - GenreId (INTEGER)\n  - Composer (NVARCHAR(220))\n  - Milliseconds (INTEGER) [NOT NULL]\n  - Bytes (INTEGER)\n  - UnitPrice (NUMERIC(10,2)) [NOT NULL]\nForeign Keys:\n  - MediaTypeId → MediaType.MediaTypeId\n  - GenreId → Genre.GenreId\n  - AlbumId → Album.AlbumId"
-]
-
-# Business logic and query examples to append
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+from RAG.schema_extractor import iter_table_schemas, format_schema_chunk
+
+DB_PATH = os.path.join("persistence", "db", "Chinook_Sqlite.db")
+KNOWLEDGE_BASE_PATH = os.path.join("RAG", "chinook_knowledge_base.txt")
+FINGERPRINT_PATH = os.path.join("RAG", "schema_fingerprint.json")
+WATCH_INTERVAL = float(os.getenv("SCHEMA_WATCH_INTERVAL_SECONDS", "30"))
+
+# Curated business logic and query examples (these cannot be derived from the schema)
 business_logic = """
 ---
 [BUSINESS LOGIC]
@@ -100,12 +98,153 @@ ORDER BY PlaylistCount DESC
 LIMIT 5;
 """
 
-# Combine all parts into one string
-full_knowledge_base = "\n---\n[SCHEMA]\n\n" + "\n\n---\n".join(schema_json) + business_logic + sample_queries
-
-# Save to a file
-file_path = "RAG\chinook_knowledge_base.txt"
-with open(file_path, "w", encoding="utf-8") as f:
-    f.write(full_knowledge_base)
 
-file_path
+def get_schema_version(conn) -> int:
+    """SQLite bumps this counter on every schema change (CREATE/ALTER/DROP)"""
+    return conn.execute("PRAGMA schema_version;").fetchone()[0]
+
+
+def table_fingerprint(table_schema: Dict) -> str:
+    """Hash of a table's columns, keys and indexes"""
+    payload = json.dumps(
+        {key: table_schema.get(key) for key in ("table", "columns", "foreign_keys", "indexes")},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_fingerprint(fingerprint_path: str = FINGERPRINT_PATH) -> Dict:
+    if not os.path.exists(fingerprint_path):
+        return {}
+    with open(fingerprint_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_knowledge_base(schema_chunks: List[str]) -> str:
+    """Combine the schema chunks with the curated business logic and example queries"""
+    return "\n---\n[SCHEMA]\n\n" + "\n\n---\n".join(schema_chunks) + business_logic + sample_queries
+
+
+def generate_knowledge_base(db_path: str = DB_PATH, knowledge_base_path: str = KNOWLEDGE_BASE_PATH,
+                            fingerprint_path: str = FINGERPRINT_PATH, force: bool = False) -> Dict:
+    """
+    Regenerate the knowledge base from the live database.
+
+    PRAGMA schema_version is checked first, so an unchanged database costs a
+    single query. Otherwise every table is fingerprinted and only tables whose
+    fingerprint moved get their chunk regenerated; the rest are reused from
+    the fingerprint file. Returns the changed/added/removed table names.
+    """
+    previous = {} if force else load_fingerprint(fingerprint_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        schema_version = get_schema_version(conn)
+        if previous.get("schema_version") == schema_version and os.path.exists(knowledge_base_path):
+            return {"schema_version": schema_version, "changed": [], "added": [], "removed": []}
+
+        old_tables = previous.get("tables", {})
+        tables, changed, added = {}, [], []
+        for table_schema in iter_table_schemas(conn, ["main"]):
+            name = table_schema["table"]
+            fingerprint = table_fingerprint(table_schema)
+            old = old_tables.get(name)
+            if old and old["fingerprint"] == fingerprint:
+                tables[name] = old
+                continue
+            tables[name] = {"fingerprint": fingerprint, "chunk": format_schema_chunk(table_schema)}
+            (changed if old else added).append(name)
+    finally:
+        conn.close()
+
+    removed = [name for name in old_tables if name not in tables]
+    report = {"schema_version": schema_version, "changed": changed, "added": added, "removed": removed}
+
+    if changed or added or removed or not os.path.exists(knowledge_base_path):
+        with open(knowledge_base_path, "w", encoding="utf-8") as f:
+            f.write(build_knowledge_base([tables[name]["chunk"] for name in tables]))
+
+    with open(fingerprint_path, "w", encoding="utf-8") as f:
+        json.dump({"schema_version": schema_version, "tables": tables}, f, indent=2)
+
+    return report
+
+
+def rebuild_knowledge_base(db_path: str = DB_PATH, mode: Optional[str] = None, force: bool = False) -> Dict:
+    """Regenerate the knowledge base and re-embed only the chunks of tables that changed"""
+    report = generate_knowledge_base(db_path, force=force)
+    if not (report["changed"] or report["added"] or report["removed"] or force):
+        return report
+
+    # The incremental ingestion manifest skips every chunk whose content is unchanged
+    from RAG.ingestion import create_faiss_index, load_manifest
+    mode = mode or load_manifest().get("mode", "text")
+    report["ingestion"] = create_faiss_index(mode, db_path=db_path)
+
+    print(f"✅ [RAG/knowledge_base_generation.py:rebuild_knowledge_base] Schema v{report['schema_version']}: "
+          f"{len(report['changed'])} changed, {len(report['added'])} added, {len(report['removed'])} removed tables")
+    return report
+
+
+class SchemaWatcher(threading.Thread):
+    """Background thread that rebuilds the knowledge base when the database schema moves"""
+
+    def __init__(self, db_path: str = DB_PATH, interval: float = WATCH_INTERVAL, mode: Optional[str] = None):
+        super().__init__(name="schema-watcher", daemon=True)
+        self.db_path = db_path
+        self.interval = interval
+        self.mode = mode
+        self._stop_event = threading.Event()
+
+    def run(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        last_version = load_fingerprint().get("schema_version")
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    version = get_schema_version(conn)
+                    if version != last_version:
+                        rebuild_knowledge_base(self.db_path, self.mode)
+                        last_version = version
+                except Exception as e:
+                    print(f"❌ [RAG/knowledge_base_generation.py:SchemaWatcher.run] Error rebuilding knowledge base: {str(e)}")
+                self._stop_event.wait(self.interval)
+        finally:
+            conn.close()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_watcher: Optional[SchemaWatcher] = None
+_watcher_lock = threading.Lock()
+
+
+def start_schema_watcher(db_path: str = DB_PATH, interval: float = WATCH_INTERVAL) -> SchemaWatcher:
+    """Start the process-wide schema watcher (idempotent)"""
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None or not _watcher.is_alive():
+            _watcher = SchemaWatcher(db_path, interval)
+            _watcher.start()
+    return _watcher
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the RAG knowledge base from the live database")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--force", action="store_true", help="Regenerate every table even if its fingerprint is unchanged")
+    parser.add_argument("--reindex", action="store_true", help="Also re-embed the changed chunks into the FAISS index")
+    parser.add_argument("--watch", action="store_true", help="Keep running and rebuild whenever the schema changes")
+    args = parser.parse_args()
+
+    if args.watch:
+        watcher = start_schema_watcher(args.db)
+        try:
+            while watcher.is_alive():
+                time.sleep(1)
+        except KeyboardInterrupt:
+            watcher.stop()
+    elif args.reindex:
+        print(rebuild_knowledge_base(args.db, force=args.force))
+    else:
+        print(generate_knowledge_base(args.db, force=args.force))
@@ -1,6 +1,9 @@
+import argparse
 import sqlite3
 import json
-from typing import List, Dict
+import os
+from itertools import groupby
+from typing import Dict, Iterator, List, Optional
 
 
 def get_all_tables(conn) -> List[str]:
@@ -44,8 +47,105 @@ def get_table_schema(conn, table: str) -> Dict:
     }
 
 
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def get_schema_names(conn) -> List[str]:
+    """Return main plus every attached database (temp is skipped)"""
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA database_list;")
+    return [row[1] for row in cursor.fetchall() if row[1] != "temp"]
+
+
+def _grouped_by_table(cursor) -> Iterator:
+    """Lazily group rows (already ordered by table name) into (table, rows)"""
+    for table, rows in groupby(cursor, key=lambda row: row[0]):
+        yield table, list(rows)
+
+
+def _rows_for(groups: Iterator, pending: List, table: str) -> List:
+    """Advance a grouped cursor to `table`, returning its rows (or [])"""
+    while True:
+        if not pending:
+            nxt = next(groups, None)
+            if nxt is None:
+                return []
+            pending.append(nxt)
+        current, rows = pending[0]
+        if current < table:
+            pending.clear()
+            continue
+        if current == table:
+            pending.clear()
+            return rows
+        return []
+
+
+def iter_table_schemas(conn, schemas: Optional[List[str]] = None) -> Iterator[Dict]:
+    """
+    Yield one schema dict per table using four set-based queries per database
+    (tables, columns, indexes, foreign keys) over the pragma table-valued
+    functions. Each query streams rows ordered by table name, so the cursors
+    are walked in lockstep and only one table is held in memory at a time.
+    """
+    for schema in schemas or get_schema_names(conn):
+        master = f"{_quote(schema)}.sqlite_master"
+        schema_arg = schema.replace("'", "''")
+        table_filter = "m.type = 'table' AND m.name NOT LIKE 'sqlite_%'"
+
+        tables = conn.cursor().execute(
+            f"SELECT m.name FROM {master} AS m WHERE {table_filter} ORDER BY m.name;"
+        )
+        columns = _grouped_by_table(conn.cursor().execute(
+            f"""SELECT m.name, p.name, p.type, p."notnull", p.pk
+                FROM {master} AS m JOIN pragma_table_info(m.name, '{schema_arg}') AS p
+                WHERE {table_filter} ORDER BY m.name, p.cid;"""
+        ))
+        # index_xinfo also lists the rowid and other auxiliary columns; key = 1 keeps the indexed ones.
+        # Expression terms such as lower(x) have no column name and are shown as <expr>
+        indexes = _grouped_by_table(conn.cursor().execute(
+            f"""SELECT m.name, il.name, il."unique", il.origin, COALESCE(ii.name, '<expr>')
+                FROM {master} AS m
+                JOIN pragma_index_list(m.name, '{schema_arg}') AS il
+                JOIN pragma_index_xinfo(il.name, '{schema_arg}') AS ii
+                WHERE {table_filter} AND ii.key = 1 ORDER BY m.name, il.name, ii.seqno;"""
+        ))
+        foreign_keys = _grouped_by_table(conn.cursor().execute(
+            f"""SELECT m.name, f."from", f."table", f."to"
+                FROM {master} AS m JOIN pragma_foreign_key_list(m.name, '{schema_arg}') AS f
+                WHERE {table_filter} ORDER BY m.name, f.id, f.seq;"""
+        ))
+
+        column_pending, index_pending, fk_pending = [], [], []
+        for (table,) in tables:
+            index_data = []
+            for row in _rows_for(indexes, index_pending, table):
+                if index_data and index_data[-1]["name"] == row[1]:
+                    index_data[-1]["columns"].append(row[4])
+                else:
+                    index_data.append({"name": row[1], "unique": bool(row[2]), "origin": row[3], "columns": [row[4]]})
+
+            yield {
+                "schema": schema,
+                "table": table,
+                "columns": [
+                    {"name": row[1], "type": row[2], "primary_key": bool(row[4]), "not_null": bool(row[3])}
+                    for row in _rows_for(columns, column_pending, table)
+                ],
+                "foreign_keys": [
+                    {"column": row[1], "ref_table": row[2], "ref_column": row[3]}
+                    for row in _rows_for(foreign_keys, fk_pending, table)
+                ],
+                "indexes": index_data,
+            }
+
+
 def format_schema_chunk(table_schema: Dict) -> str:
-    lines = [f"Table: {table_schema['table']}"]
+    name = table_schema['table']
+    if table_schema.get("schema", "main") != "main":
+        name = f"{table_schema['schema']}.{name}"
+    lines = [f"Table: {name}"]
 
     lines.append("Columns:")
     for col in table_schema['columns']:
@@ -61,21 +161,43 @@ def format_schema_chunk(table_schema: Dict) -> str:
         for fk in table_schema['foreign_keys']:
             lines.append(f"  - {fk['column']} → {fk['ref_table']}.{fk['ref_column']}")
 
+    # Primary key autoindexes are already covered by the [PK] markers
+    indexes = [index for index in table_schema.get('indexes', []) if index['origin'] != 'pk']
+    if indexes:
+        lines.append("Indexes:")
+        for index in indexes:
+            line = f"  - {index['name']} ({', '.join(index['columns'])})"
+            if index["unique"]:
+                line += " [UNIQUE]"
+            lines.append(line)
+
     return "\n".join(lines)
 
 
-def extract_all_schema_chunks(db_path: str) -> List[str]:
+def format_column_chunk(table_schema: Dict, column: Dict) -> str:
+    line = f"Column: {table_schema['table']}.{column['name']} ({column['type']})"
+    if column["primary_key"]:
+        line += " [PK]"
+    if column["not_null"]:
+        line += " [NOT NULL]"
+
+    lines = [line, f"Table: {table_schema['table']}"]
+    for fk in table_schema['foreign_keys']:
+        if fk['column'] == column['name']:
+            lines.append(f"References: {fk['ref_table']}.{fk['ref_column']}")
+    return "\n".join(lines)
+
+
+def extract_table_schemas(db_path: str) -> List[Dict]:
     conn = sqlite3.connect(db_path)
-    tables = get_all_tables(conn)
+    try:
+        return list(iter_table_schemas(conn))
+    finally:
+        conn.close()
 
-    chunks = []
-    for table in tables:
-        schema = get_table_schema(conn, table)
-        chunk = format_schema_chunk(schema)
-        chunks.append(chunk)
 
-    conn.close()
-    return chunks
+def extract_all_schema_chunks(db_path: str) -> List[str]:
+    return [format_schema_chunk(schema) for schema in extract_table_schemas(db_path)]
 
 
 def save_chunks_to_json(chunks: List[str], output_path: str):
@@ -83,12 +205,46 @@ def save_chunks_to_json(chunks: List[str], output_path: str):
         json.dump(chunks, f, indent=2)
 
 
-if __name__ == "__main__":
-    db_path = "persistence\db\Chinook_Sqlite.db"  # Update if your DB is named differently
-    output_json = "RAG\chinook_schema_chunks.json"
+def stream_chunks_to_jsonl(db_path: str, output_path: str, attach: Optional[Dict[str, str]] = None) -> int:
+    """
+    Write one JSON line per table (structured schema plus its text chunk),
+    covering main and any attached databases. Memory stays flat regardless
+    of the number of tables.
+    """
+    conn = sqlite3.connect(db_path)
+    count = 0
+    try:
+        for alias, path in (attach or {}).items():
+            conn.execute(f"ATTACH DATABASE ? AS {_quote(alias)};", (path,))
 
-    chunks = extract_all_schema_chunks(db_path)
-    save_chunks_to_json(chunks, output_json)
+        with open(output_path, "w", encoding="utf-8") as f:
+            for schema in iter_table_schemas(conn):
+                schema["chunk"] = format_schema_chunk(schema)
+                f.write(json.dumps(schema, ensure_ascii=False) + "\n")
+                count += 1
+    finally:
+        conn.close()
+    return count
 
-    print(f"✅ Extracted {len(chunks)} schema chunks.")
-    print(f"📄 Saved to {output_json}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract per-table schema chunks from a SQLite database")
+    parser.add_argument("--db", default=os.path.join("persistence", "db", "Chinook_Sqlite.db"))
+    parser.add_argument("--output", default=None, help="Output path (defaults to RAG/chinook_schema_chunks.json[l])")
+    parser.add_argument("--format", choices=["json", "jsonl"], default="json",
+                        help="'json' writes a list of chunk strings, 'jsonl' streams one table per line")
+    parser.add_argument("--attach", action="append", default=[], metavar="ALIAS=PATH",
+                        help="Attach another database and extract its tables too (repeatable)")
+    args = parser.parse_args()
+
+    output = args.output or os.path.join("RAG", f"chinook_schema_chunks.{args.format}")
+    if args.format == "jsonl":
+        attach = dict(item.split("=", 1) for item in args.attach)
+        count = stream_chunks_to_jsonl(args.db, output, attach)
+    else:
+        chunks = extract_all_schema_chunks(args.db)
+        save_chunks_to_json(chunks, output)
+        count = len(chunks)
+
+    print(f"✅ Extracted {count} schema chunks.")
+    print(f"📄 Saved to {output}")
@@ -0,0 +1,72 @@
+"""
+Checkpoint write latency vs. session length.
+
+Saves a turn-end checkpoint for sessions of increasing length, once with the
+raw message history and once with the bounded window the update_memory node
+keeps (with evicted turns folded into the summary), and reports the mean
+put() latency and serialized bytes per checkpoint.
+
+    python -m benchmarks.checkpoint_write_latency --turns 10 100 1000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from memory.conversation import SQL_RESULT_MESSAGE, WINDOW_TURNS, ConversationMemory
+from persistence.checkpointer import SQLiteCheckpointSaver
+from utils.metrics import counters
+
+_RESULT_TABLE = "Query Results:\n" + "\n".join(f"Row {i}: Artist {i} | {i * 3} albums" for i in range(40))
+
+
+def _session(turns: int, bounded: bool):
+    messages, memory = [], ConversationMemory()
+    for i in range(turns):
+        user = HumanMessage(content=f"How many albums does artist {i} have?", id=f"h{i}")
+        answer = AIMessage(content=f"Artist {i} has {i * 3} albums in the catalogue.", id=f"a{i}")
+        messages += [user, SystemMessage(content=_RESULT_TABLE, name=SQL_RESULT_MESSAGE, id=f"s{i}"), answer]
+        memory.add_turn(user, answer)
+        if bounded and memory.needs_summary():
+            memory.apply_summary(None)
+    if bounded:
+        messages = messages[-3 * WINDOW_TURNS:]
+    return {"messages": messages, "memory": memory, "sql_query": "SELECT 1", "sql_output": _RESULT_TABLE}
+
+
+def measure(saver: SQLiteCheckpointSaver, turns: int, bounded: bool, repeats: int):
+    values = _session(turns, bounded)
+    thread_id = f"{'bounded' if bounded else 'raw'}-{turns}"
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    bytes_before = counters.get("checkpoint.put_bytes")
+    start = time.perf_counter()
+    for i in range(repeats):
+        checkpoint = empty_checkpoint()
+        checkpoint["channel_values"] = values
+        checkpoint["channel_versions"] = {channel: saver.get_next_version(None, None) for channel in values}
+        # Every channel changes, as in the superstep that appends the answer
+        config = saver.put(config, checkpoint, {"source": "loop", "step": i}, checkpoint["channel_versions"])
+    elapsed = (time.perf_counter() - start) / repeats
+    return elapsed * 1000, (counters.get("checkpoint.put_bytes") - bytes_before) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark checkpoint write latency against session length")
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        saver = SQLiteCheckpointSaver(os.path.join(directory, "checkpoints.db"))
+        print(f"{'turns':>6} {'history':>8} {'put ms':>8} {'bytes/put':>12}")
+        for turns in args.turns:
+            for bounded in (False, True):
+                ms, size = measure(saver, turns, bounded, args.repeats)
+                print(f"{turns:>6} {'window' if bounded else 'full':>8} {ms:>8.2f} {size:>10.0f} B")
+        saver.close()
+
+
+if __name__ == "__main__":
+    main()
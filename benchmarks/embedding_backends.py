@@ -0,0 +1,142 @@
+"""
+Embedding backends: PyTorch vs. ONNX Runtime (fp32 and int8).
+
+Each backend runs in its own interpreter so resident memory is not shared.
+Reports load time, single-query latency (p50/p95), batch throughput, RSS
+after loading, and recall@k of FAISS searches over the existing index with
+the PyTorch query vectors as ground truth.
+
+    python -m benchmarks.embedding_backends [--backends torch onnx-fp32 onnx-int8] [--k 5]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+EXAMPLES_PATH = os.path.join("services", "classifiers", "labeled_examples.json")
+INDEX_FILE = os.path.join(os.getenv("FAISS_INDEX_PATH", os.path.join("RAG", "faiss_index")), "index.faiss")
+_RESULT_MARKER = "embedding-benchmark-result:"
+
+
+def _rss_mb() -> float:
+    """Current resident set size (Linux), else the peak reported by getrusage"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _queries() -> list:
+    with open(EXAMPLES_PATH, encoding="utf-8") as f:
+        return [example["text"] for example in json.load(f)]
+
+
+def _load(backend: str):
+    if backend == "torch":
+        from langchain_huggingface.embeddings import HuggingFaceEmbeddings
+        from services.llm_connector.embeddings import EMBEDDING_MODEL_NAME
+        return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
+    from services.llm_connector.embeddings import OnnxEmbeddings
+    return OnnxEmbeddings(quantized=backend == "onnx-int8")
+
+
+def run_backend(backend: str, vectors_path: str, repeats: int, batch: int) -> dict:
+    """Measure one backend in this process and save its query vectors"""
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    model = _load(backend)
+    queries = _queries()
+    model.embed_query(queries[0])
+    load_seconds = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(repeats):
+        for query in queries:
+            start = time.perf_counter()
+            model.embed_query(query)
+            latencies.append(time.perf_counter() - start)
+
+    texts = (queries * (batch // len(queries) + 1))[:batch]
+    start = time.perf_counter()
+    model.embed_documents(texts)
+    throughput = batch / (time.perf_counter() - start)
+
+    np.save(vectors_path, np.asarray([model.embed_query(query) for query in queries], dtype=np.float32))
+    return {
+        "backend": backend,
+        "load_seconds": load_seconds,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p95_ms": float(np.percentile(latencies, 95) * 1000),
+        "texts_per_second": throughput,
+        "rss_mb": _rss_mb(),
+        "rss_delta_mb": _rss_mb() - rss_before,
+    }
+
+
+def _recall(index, reference: np.ndarray, vectors: np.ndarray, k: int) -> float:
+    _, expected = index.search(reference, k)
+    _, found = index.search(vectors, k)
+    return float(np.mean([len(set(e) & set(f)) / k for e, f in zip(expected, found)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the PyTorch and ONNX Runtime embedding backends")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx-fp32", "onnx-int8"],
+                        choices=["torch", "onnx-fp32", "onnx-int8"])
+    parser.add_argument("--k", type=int, default=5, help="Neighbours compared for recall@k")
+    parser.add_argument("--repeats", type=int, default=5, help="Passes over the query set for latency")
+    parser.add_argument("--batch", type=int, default=256, help="Texts per throughput batch")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--vectors", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = run_backend(args.child, args.vectors, args.repeats, args.batch)
+        print(_RESULT_MARKER + json.dumps(result), flush=True)
+        return
+
+    results, vectors = [], {}
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in args.backends:
+            path = os.path.join(directory, f"{backend}.npy")
+            completed = subprocess.run(
+                [sys.executable, "-m", "benchmarks.embedding_backends", "--child", backend, "--vectors", path,
+                 "--repeats", str(args.repeats), "--batch", str(args.batch)],
+                capture_output=True, text=True,
+            )
+            line = next((line for line in completed.stdout.splitlines() if line.startswith(_RESULT_MARKER)), None)
+            if line is None:
+                error = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else f"exit {completed.returncode}"
+                print(f"❌ [benchmarks/embedding_backends.py:main] {backend} failed: {error}")
+                continue
+            results.append(json.loads(line[len(_RESULT_MARKER):]))
+            vectors[backend] = np.load(path)
+
+    index = None
+    if "torch" in vectors and os.path.exists(INDEX_FILE):
+        import faiss
+        index = faiss.read_index(INDEX_FILE)
+
+    print(f"{'backend':<10} {'load s':>7} {'p50 ms':>7} {'p95 ms':>7} {'texts/s':>8} {'RSS MB':>7} {'+MB':>6} "
+          f"{'cos':>6} {f'recall@{args.k}':>9}")
+    for result in results:
+        backend = result["backend"]
+        cosine = recall = "-"
+        if "torch" in vectors and backend != "torch":
+            cosine = f"{float((vectors['torch'] * vectors[backend]).sum(axis=1).mean()):.4f}"
+            if index is not None:
+                recall = f"{_recall(index, vectors['torch'], vectors[backend], args.k):.3f}"
+        print(f"{backend:<10} {result['load_seconds']:>7.2f} {result['p50_ms']:>7.2f} {result['p95_ms']:>7.2f} "
+              f"{result['texts_per_second']:>8.0f} {result['rss_mb']:>7.0f} {result['rss_delta_mb']:>6.0f} "
+              f"{cosine:>6} {recall:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+FAISS index types: flat vs. HNSW vs. IVF-PQ, loaded with and without mmap.
+
+Builds a store of each type from the same synthetic unit vectors (clustered
+like sentence embeddings, at the embedding model's dimension), then loads
+each one in its own interpreter so resident memory is not shared. Reports
+file size, build and load time, RSS added by the load and by queries, query
+latency (p50/p95) and recall@k against exact search.
+
+    python -m benchmarks.faiss_index_types [--vectors 100000] [--types flat hnsw ivfpq] [--k 10]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from langchain_core.documents import Document
+from services.llm_connector.index_store import INDEX_TYPES, VECTORS_FILE, MmapVectorStore, build_index, write_store
+
+DIM = 384
+_RESULT_MARKER = "index-benchmark-result:"
+
+
+def _rss_mb() -> float:
+    """Current resident set size (Linux), else the peak reported by getrusage"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def _clustered_vectors(count: int, clusters: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = _normalize(rng.standard_normal((clusters, DIM)))
+    return _normalize(centers[rng.integers(clusters, size=count)] + 0.6 * rng.standard_normal((count, DIM)) / np.sqrt(DIM))
+
+
+def run_load(path: str, use_mmap: bool, queries_path: str, k: int) -> dict:
+    """Load one store in this process, search it and save the neighbour ids"""
+    import faiss  # noqa: F401 - keep the library itself out of the load delta
+    queries = np.load(queries_path)
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    store = MmapVectorStore(path, embeddings=None, use_mmap=use_mmap)
+    load_seconds = time.perf_counter() - start
+    rss_loaded = _rss_mb() - rss_before
+
+    latencies, neighbours = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits = store.similarity_search_with_score_by_vector(query.tolist(), k)
+        latencies.append(time.perf_counter() - start)
+        neighbours.append([doc.id for doc, _ in hits])
+    np.save(queries_path + f".{os.path.basename(path)}.{int(use_mmap)}.npy", np.array(neighbours, dtype=object), allow_pickle=True)
+    return {
+        "load_seconds": load_seconds,
+        "rss_load_mb": rss_loaded,
+        "rss_after_queries_mb": _rss_mb() - rss_before,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p95_ms": float(np.percentile(latencies, 95) * 1000),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare FAISS index types and mmap loading")
+    parser.add_argument("--vectors", type=int, default=100_000, help="Indexed vectors")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--types", nargs="+", default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    parser.add_argument("--k", type=int, default=10, help="Neighbours compared for recall@k")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--mmap", type=int, default=1, help=argparse.SUPPRESS)
+    parser.add_argument("--queries-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(_RESULT_MARKER + json.dumps(run_load(args.child, bool(args.mmap), args.queries_file, args.k)), flush=True)
+        return
+
+    vectors = _clustered_vectors(args.vectors, clusters=max(1, args.vectors // 100), seed=0)
+    # Queries near indexed vectors, as real questions land near their documents
+    rng = np.random.default_rng(1)
+    queries = _normalize(vectors[rng.integers(args.vectors, size=args.queries)]
+                         + 0.3 * rng.standard_normal((args.queries, DIM)) / np.sqrt(DIM))
+    documents = [(str(i), Document(page_content=f"document {i}", metadata={"n": i})) for i in range(args.vectors)]
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        queries_file = os.path.join(directory, "queries.npy")
+        np.save(queries_file, queries.astype(np.float32))
+        for index_type in args.types:
+            path = os.path.join(directory, index_type)
+            start = time.perf_counter()
+            index, params = build_index(vectors, index_type)
+            write_store(path, index, documents, params)
+            build_seconds = time.perf_counter() - start
+            size_mb = os.path.getsize(os.path.join(path, VECTORS_FILE)) / 2**20
+            del index
+
+            for use_mmap in (False, True):
+                completed = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.faiss_index_types", "--child", path, "--mmap", str(int(use_mmap)),
+                     "--queries-file", queries_file, "--k", str(args.k)],
+                    capture_output=True, text=True,
+                )
+                line = next((line for line in completed.stdout.splitlines() if line.startswith(_RESULT_MARKER)), None)
+                if line is None:
+                    error = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else f"exit {completed.returncode}"
+                    print(f"❌ [benchmarks/faiss_index_types.py:main] {index_type} failed: {error}")
+                    continue
+                found = np.load(queries_file + f".{index_type}.{int(use_mmap)}.npy", allow_pickle=True)
+                rows.append({"type": params["index_type"], "mmap": use_mmap, "size_mb": size_mb,
+                             "build_seconds": build_seconds, "found": found, **json.loads(line[len(_RESULT_MARKER):])})
+
+    exact = next((row["found"] for row in rows if row["type"] == "flat"), None)
+    print(f"{'type':<7} {'mmap':>5} {'file MB':>8} {'build s':>8} {'load s':>7} {'+MB load':>9} {'+MB query':>10} "
+          f"{'p50 ms':>7} {'p95 ms':>7} {f'recall@{args.k}':>10}")
+    for row in rows:
+        recall = "-"
+        if exact is not None:
+            recall = f"{np.mean([len(set(e) & set(f)) / args.k for e, f in zip(exact, row['found'])]):.3f}"
+        print(f"{row['type']:<7} {str(row['mmap']):>5} {row['size_mb']:>8.1f} {row['build_seconds']:>8.2f} "
+              f"{row['load_seconds']:>7.3f} {row['rss_load_mb']:>9.1f} {row['rss_after_queries_mb']:>10.1f} "
+              f"{row['p50_ms']:>7.3f} {row['p95_ms']:>7.3f} {recall:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Graph invoke cost vs. history length.
+
+Runs one SQL turn through the compiled graph on top of a conversation that
+already holds 10, 100 and 1000 messages, and reports the mean invoke time and
+the peak Python allocation (tracemalloc) per turn. The LLM is replaced with a
+scripted offline model so only the graph's own work is measured; the memory
+window is widened to cover the whole history so nothing is compacted away and
+every node really runs against the full message list.
+
+    python -m benchmarks.graph_invoke_history --messages 10 100 1000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import time
+import tracemalloc
+
+# Measure the graph, not the semantic question cache; keep every SQL payload in the history
+os.environ.setdefault("SQL_QUESTION_CACHE_ENABLED", "false")
+os.environ.setdefault("MEMORY_SQL_PAYLOAD_TURNS", "100000")
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from graph.graph import graph
+from memory.conversation import SQL_RESULT_MESSAGE, ConversationMemory
+from services.llm_connector.llm_connector import set_llm
+
+_RESULT_TABLE = "Query Results:\n" + "\n".join(f"Row {i}: Artist {i} | {i * 3} albums" for i in range(40))
+_SQL = "SELECT COUNT(*) FROM sqlite_master"
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Offline stand-in for the LLM: classifies as SQL, drafts a fixed query, answers briefly"""
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        system = messages[0].content if isinstance(messages[0], SystemMessage) else ""
+        if system.startswith("You are a classifier"):
+            text = "true"
+        elif system.startswith("You are a world-class SQL expert"):
+            text = _SQL
+        else:
+            text = "There are a few tables in the database."
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+
+def _history(length: int) -> list:
+    messages = []
+    for i in range(length // 3 + 1):
+        messages += [
+            HumanMessage(content=f"How many albums does artist {i} have?", id=f"h{i}"),
+            SystemMessage(content=_RESULT_TABLE, name=SQL_RESULT_MESSAGE, id=f"s{i}"),
+            AIMessage(content=f"Artist {i} has {i * 3} albums in the catalogue.", id=f"a{i}"),
+        ]
+    return messages[:length]
+
+
+def _turn_state(length: int) -> dict:
+    return {
+        "messages": _history(length) + [HumanMessage(content="How many tables are in the database?")],
+        "memory": ConversationMemory(window_turns=length + 1),
+    }
+
+
+def measure(app, length: int, repeats: int):
+    # Node logging is not part of the cost being measured
+    with contextlib.redirect_stdout(io.StringIO()):
+        app.invoke(_turn_state(length))
+        elapsed = 0.0
+        for _ in range(repeats):
+            state = _turn_state(length)
+            start = time.perf_counter()
+            app.invoke(state)
+            elapsed += time.perf_counter() - start
+
+        state = _turn_state(length)
+        tracemalloc.start()
+        baseline, _ = tracemalloc.get_traced_memory()
+        app.invoke(state)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return elapsed / repeats * 1000, (peak - baseline) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark graph invoke time and allocations against history length")
+    parser.add_argument("--messages", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    set_llm(ScriptedChatModel())
+    app = graph(speculative=False)
+    print(f"{'messages':>8} {'invoke ms':>10} {'peak KiB':>10}")
+    for length in args.messages:
+        ms, peak = measure(app, length, args.repeats)
+        print(f"{length:>8} {ms:>10.2f} {peak:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Schema retrieval quality: vector vs. BM25 vs. hybrid (reciprocal rank fusion).
+
+For each labeled question, compares the tables picked by schema_search with
+the tables its SQL needs. Reports table recall (all needed tables retrieved),
+precision, prompt context tokens and latency per mode and fetch_k.
+Needs a schema-mode index (python -m RAG.ingestion --mode schema); the vector
+and hybrid modes also need the embedding model.
+
+    python -m benchmarks.schema_retrieval [--modes vector lexical hybrid] [--fetch-k 4 8 12]
+"""
+
+import argparse
+import os
+import time
+import numpy as np
+from memory.tokens import count_tokens
+from services.llm_connector.retriever import INDEX_PATH, RetrieverService
+
+# (question, tables the SQL needs)
+QUESTIONS = [
+    ("Which InvoiceLine has the highest UnitPrice?", {"InvoiceLine"}),
+    ("Total sales per genre", {"Genre", "Track", "InvoiceLine"}),
+    ("How many tracks are in each playlist?", {"Playlist", "PlaylistTrack"}),
+    ("List the albums by AC/DC", {"Album", "Artist"}),
+    ("Which employee supports the most customers?", {"Employee", "Customer"}),
+    ("What is the average invoice total by billing country?", {"Invoice"}),
+    ("Which media type is most common among tracks?", {"MediaType", "Track"}),
+    ("Show customers from Germany with their email", {"Customer"}),
+    ("Top 5 artists by number of tracks sold", {"Artist", "Album", "Track", "InvoiceLine"}),
+    ("Which composer wrote the longest track in milliseconds?", {"Track"}),
+    ("Revenue per customer in 2010", {"Customer", "Invoice"}),
+    ("Who does each employee report to?", {"Employee"}),
+    ("What genres are in the Grunge playlist?", {"Genre", "Track", "PlaylistTrack", "Playlist"}),
+    ("How many invoices has each sales support agent handled?", {"Employee", "Customer", "Invoice"}),
+]
+
+
+def run_mode(retriever: RetrieverService, fetch_k: int, max_tables: int) -> dict:
+    recall, precision, tokens, latencies = [], [], [], []
+    for question, needed in QUESTIONS:
+        start = time.perf_counter()
+        table_docs, rule_docs = retriever.schema_search(question, max_tables=max_tables, fetch_k=fetch_k)
+        latencies.append(time.perf_counter() - start)
+        found = {doc.metadata["table"] for doc in table_docs}
+        recall.append(float(needed <= found))
+        precision.append(len(found & needed) / len(found) if found else 0.0)
+        tokens.append(count_tokens("\n\n".join(doc.page_content for doc in table_docs + rule_docs)))
+    return {
+        "recall": float(np.mean(recall)),
+        "precision": float(np.mean(precision)),
+        "tokens": float(np.mean(tokens)),
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare vector, BM25 and hybrid schema retrieval")
+    parser.add_argument("--index-path", default=INDEX_PATH)
+    parser.add_argument("--modes", nargs="+", default=["vector", "lexical", "hybrid"], choices=["vector", "lexical", "hybrid"])
+    parser.add_argument("--fetch-k", nargs="+", type=int, default=[4, 8, 12], help="Ranked documents used to pick tables")
+    parser.add_argument("--max-tables", type=int, default=4)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.index_path):
+        print(f"❌ [benchmarks/schema_retrieval.py:main] No index at {args.index_path}")
+        return
+
+    print(f"{'mode':<8} {'fetch_k':>7} {'recall':>7} {'precision':>9} {'ctx tokens':>10} {'p50 ms':>7}")
+    for mode in args.modes:
+        retriever = RetrieverService(args.index_path, mode=mode)
+        if not retriever.has_schema_units():
+            print(f"❌ [benchmarks/schema_retrieval.py:main] {args.index_path} is not a schema index; "
+                  "build one with: python -m RAG.ingestion --mode schema")
+            return
+        if mode != "lexical":
+            try:
+                retriever.get_embeddings()
+            except Exception as e:
+                print(f"❌ [benchmarks/schema_retrieval.py:main] {mode} skipped, embedding model unavailable: {str(e)}")
+                continue
+            # Warm the model so the first question's latency is comparable
+            retriever.schema_search(QUESTIONS[0][0])
+        for fetch_k in args.fetch_k:
+            result = run_mode(retriever, fetch_k, args.max_tables)
+            print(f"{mode:<8} {fetch_k:>7} {result['recall']:>7.2f} {result['precision']:>9.2f} "
+                  f"{result['tokens']:>10.0f} {result['p50_ms']:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,15 @@
 import os
 from pathlib import Path
 
+# Entry points and library modules all call set_env_variables(); only the first call does the work
+_env_loaded = False
+
 def set_env_variables():
     """Set up environment variables, including loading from .env file if it exists"""
+    global _env_loaded
+    if _env_loaded:
+        return
+    _env_loaded = True
     
     # Try to load from .env file
     env_file = Path(".env")
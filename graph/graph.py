@@ -1,47 +1,106 @@
+import os
+from typing import Optional
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, START, END, add_messages
 from models.schema import State
 from routes.routes import *
-from services.chat.chatbot import chatbot
+from services.chat.chatbot import chatbot, achatbot
+from services.chat.update_memory import update_memory, aupdate_memory
 from services.classifiers import *
-from services.sql.generate_sql_query import generate_sql_query
-from services.sql.execute_sql_query import execute_sql_query
-from services.classifiers.classify_sql_needed_or_not import classify_sql_needed_or_not
+from services.sql.generate_sql_query import generate_sql_query, agenerate_sql_query
+from services.sql.execute_sql_query import execute_sql_query, aexecute_sql_query
+from services.sql.lookup_cached_sql import lookup_cached_sql, alookup_cached_sql
+from services.sql.speculative_sql import (
+    speculative_classify, aspeculative_classify,
+    speculative_generate_sql, aspeculative_generate_sql,
+    resolve_speculation,
+)
+from services.classifiers.classify_sql_needed_or_not import classify_sql_needed_or_not, aclassify_sql_needed_or_not
+
+# Opt-in: classify and draft SQL concurrently instead of one after the other
+SPECULATIVE = os.getenv("SPECULATIVE_GRAPH", "false").lower() == "true"
+
+def _node(func, afunc):
+    """One node usable from both invoke/stream (func) and ainvoke/astream (afunc)"""
+    return RunnableLambda(func, afunc=afunc, name=func.__name__)
+
+def graph(speculative: Optional[bool] = None, checkpointer=None):
+    if speculative is None:
+        speculative = SPECULATIVE
 
-def graph():
     # Build the graph
     workflow = StateGraph(State)
 
     # Basic nodes
     workflow.add_node("start_node", start_node)
-    workflow.add_node("classify_sql_needed_or_not", classify_sql_needed_or_not)
-    workflow.add_node("generate_sql_query", generate_sql_query)
-    workflow.add_node("execute_sql_query", execute_sql_query)
-    workflow.add_node("chatbot", chatbot)
+    workflow.add_node("lookup_cached_sql", _node(lookup_cached_sql, alookup_cached_sql))
+    if speculative:
+        workflow.add_node("classify_sql_needed_or_not", _node(speculative_classify, aspeculative_classify))
+    else:
+        workflow.add_node("classify_sql_needed_or_not", _node(classify_sql_needed_or_not, aclassify_sql_needed_or_not))
+    workflow.add_node("generate_sql_query", _node(generate_sql_query, agenerate_sql_query))
+    workflow.add_node("execute_sql_query", _node(execute_sql_query, aexecute_sql_query))
+    workflow.add_node("chatbot", _node(chatbot, achatbot))
+    workflow.add_node("update_memory", _node(update_memory, aupdate_memory))
 
     # Set entry point
     workflow.set_entry_point("start_node")
     
-    # Flow: start_node -> classify_sql_needed_or_not
-    workflow.add_edge("start_node", "classify_sql_needed_or_not")
-    
-    # Conditional routing from classify_sql_needed_or_not
-    workflow.add_conditional_edges(
-        "classify_sql_needed_or_not",
-        route_sql_needed_or_not,
-        {
-            "generate_sql_query": "generate_sql_query",
-            "chatbot": "chatbot"
-        }
-    )
+    # Flow: start_node -> lookup_cached_sql
+    workflow.add_edge("start_node", "lookup_cached_sql")
+
+    if speculative:
+        workflow.add_node("speculative_generate_sql", _node(speculative_generate_sql, aspeculative_generate_sql))
+        workflow.add_node("resolve_speculation", resolve_speculation)
+
+        # A cache hit executes directly; a miss fans out to classifier + SQL draft in parallel
+        workflow.add_conditional_edges(
+            "lookup_cached_sql",
+            route_cached_sql_speculative,
+            ["execute_sql_query", "classify_sql_needed_or_not", "speculative_generate_sql"]
+        )
+
+        # Join: wait for both branches, then keep or discard the drafted SQL
+        workflow.add_edge(["classify_sql_needed_or_not", "speculative_generate_sql"], "resolve_speculation")
+        workflow.add_conditional_edges(
+            "resolve_speculation",
+            route_speculation,
+            {
+                "execute_sql_query": "execute_sql_query",
+                "generate_sql_query": "generate_sql_query",
+                "chatbot": "chatbot"
+            }
+        )
+    else:
+        # A semantically similar cached question skips classification and generation
+        workflow.add_conditional_edges(
+            "lookup_cached_sql",
+            route_cached_sql,
+            {
+                "execute_sql_query": "execute_sql_query",
+                "classify_sql_needed_or_not": "classify_sql_needed_or_not"
+            }
+        )
+
+        # Conditional routing from classify_sql_needed_or_not
+        workflow.add_conditional_edges(
+            "classify_sql_needed_or_not",
+            route_sql_needed_or_not,
+            {
+                "generate_sql_query": "generate_sql_query",
+                "chatbot": "chatbot"
+            }
+        )
     
     # SQL flow: generate -> execute -> chatbot
     workflow.add_edge("generate_sql_query", "execute_sql_query")
     workflow.add_edge("execute_sql_query", "chatbot")
 
-    # Add terminal edges
-    workflow.add_edge("chatbot", END)
+    # Record the turn in bounded memory, then finish
+    workflow.add_edge("chatbot", "update_memory")
+    workflow.add_edge("update_memory", END)
 
-    # Compile the graph
-    app = workflow.compile()
-    return app
\ No newline at end of file
+    # Compile the graph; with a checkpointer each thread_id resumes its own saved state
+    app = workflow.compile(checkpointer=checkpointer)
+    return app
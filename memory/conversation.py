@@ -0,0 +1,149 @@
+import os
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, List, Optional, Tuple
+from langchain_core.messages import BaseMessage, BaseMessageChunk, HumanMessage, RemoveMessage, SystemMessage
+from memory.tokens import count_tokens, truncate_to_tokens
+
+# Most recent turns kept verbatim (the ring buffer)
+WINDOW_TURNS = int(os.getenv("MEMORY_WINDOW_TURNS", "6"))
+# Upper bound for the rolling summary of older turns
+SUMMARY_TOKENS = int(os.getenv("MEMORY_SUMMARY_TOKENS", "400"))
+# Turns that fell out of the window are folded into the summary once they add up to this many tokens
+SUMMARIZE_AFTER_TOKENS = int(os.getenv("MEMORY_SUMMARIZE_AFTER_TOKENS", "800"))
+# Turns (including the current one) whose SQL result payloads stay in State["messages"]
+SQL_PAYLOAD_TURNS = int(os.getenv("MEMORY_SQL_PAYLOAD_TURNS", "1"))
+
+# Name given to SystemMessages carrying SQL result tables, so they can be found and evicted
+SQL_RESULT_MESSAGE = "sql_result"
+_EVICTED_SQL_RESULT = "sql_result_evicted"
+
+Turn = Tuple[BaseMessage, BaseMessage]
+
+
+@dataclass
+class ConversationMemory:
+    """
+    Bounded conversation memory.
+
+    The last window_turns (user, assistant) pairs are kept verbatim in a ring
+    buffer. Pairs pushed out of the buffer wait in `pending` until they are
+    worth summarizing, then get folded into a rolling summary capped at
+    SUMMARY_TOKENS. Every operation touches a bounded amount of data, so the
+    cost of a turn does not depend on how long the session has been running.
+    """
+
+    window_turns: int = WINDOW_TURNS
+    turns: Deque[Turn] = field(default_factory=deque)
+    summary: str = ""
+    pending: List[Turn] = field(default_factory=list)
+    pending_tokens: int = 0
+    total_turns: int = 0
+
+    def __post_init__(self):
+        self.turns = deque(self.turns, maxlen=max(1, self.window_turns))
+
+    def add_turn(self, user_msg: BaseMessage, ai_msg: BaseMessage):
+        if len(self.turns) == self.turns.maxlen:
+            evicted = self.turns[0]
+            self.pending.append(evicted)
+            self.pending_tokens += sum(count_tokens(msg.content) for msg in evicted)
+        self.turns.append((user_msg, ai_msg))
+        self.total_turns += 1
+
+    def needs_summary(self) -> bool:
+        return self.pending_tokens >= SUMMARIZE_AFTER_TOKENS
+
+    def summary_prompt(self) -> List[BaseMessage]:
+        """Messages asking the LLM to fold the pending turns into the summary"""
+        transcript = "\n".join(
+            f"User: {user.content}\nAssistant: {ai.content}" for user, ai in self.pending
+        )
+        return [
+            SystemMessage(content=f"""You maintain a running summary of a conversation between a user and a database assistant.
+Merge the new exchanges into the existing summary. Keep facts, numbers, table names and open questions; drop pleasantries.
+Answer with the updated summary only, in at most {SUMMARY_TOKENS} tokens.
+
+Existing summary:
+{self.summary or "(none)"}"""),
+            HumanMessage(content=f"New exchanges:\n{truncate_to_tokens(transcript, SUMMARIZE_AFTER_TOKENS * 2, from_end=True)}"),
+        ]
+
+    def apply_summary(self, summary: Optional[str]):
+        """Replace the summary with the LLM's (or, without one, an extractive fallback) and clear pending"""
+        if not summary:
+            # Keep the most recent exchanges verbatim, trimmed to the budget
+            lines = [self.summary] if self.summary else []
+            lines += [f"User: {user.content}\nAssistant: {ai.content}" for user, ai in self.pending]
+            summary = truncate_to_tokens("\n".join(lines), SUMMARY_TOKENS, from_end=True)
+        self.summary = truncate_to_tokens(summary.strip(), SUMMARY_TOKENS)
+        self.pending = []
+        self.pending_tokens = 0
+
+    def history(self) -> List[BaseMessage]:
+        """Verbatim messages of the turns in the window, oldest first"""
+        return [msg for turn in self.turns for msg in turn]
+
+
+def as_memory(value) -> ConversationMemory:
+    """Accept the legacy flat message list (or nothing) and return a ConversationMemory"""
+    if isinstance(value, ConversationMemory):
+        return value
+    memory = ConversationMemory()
+    messages = list(value or [])
+    for user_msg, ai_msg in zip(messages[::2], messages[1::2]):
+        memory.add_turn(user_msg, ai_msg)
+    return memory
+
+
+def compact_messages(messages: List[BaseMessage], window_turns: int = WINDOW_TURNS,
+                     sql_payload_turns: int = SQL_PAYLOAD_TURNS) -> List[BaseMessage]:
+    """
+    Updates for State["messages"] (applied by the add_messages reducer) that
+    drop every message older than the window and replace SQL result payloads
+    of older turns with a short placeholder.
+    """
+    starts = [i for i, msg in enumerate(messages) if isinstance(msg, HumanMessage)]
+    if not starts:
+        return []
+
+    updates: List[BaseMessage] = []
+    keep_from = starts[-window_turns] if len(starts) >= window_turns else starts[0]
+    updates.extend(RemoveMessage(id=msg.id) for msg in messages[:keep_from] if msg.id)
+
+    if sql_payload_turns <= 0:
+        payload_from = len(messages)
+    elif len(starts) > sql_payload_turns:
+        payload_from = starts[-sql_payload_turns]
+    else:
+        payload_from = keep_from
+    for msg in messages[keep_from:payload_from]:
+        if isinstance(msg, SystemMessage) and msg.name == SQL_RESULT_MESSAGE and msg.id:
+            updates.append(SystemMessage(content="[SQL result evicted from memory]", name=_EVICTED_SQL_RESULT, id=msg.id))
+    return updates
+
+
+def merge_messages(left: List[BaseMessage], right) -> List[BaseMessage]:
+    """
+    Reducer for State["messages"]: add_messages with an append fast path.
+
+    add_messages re-converts and re-indexes the whole history on every write.
+    Nodes return only new messages (no id yet), and a fresh id cannot collide
+    with an existing one, so those are appended without touching the history.
+    Updates that replace or remove messages by id go through add_messages.
+    """
+    if not isinstance(right, list):
+        right = [right]
+    if not right:
+        return left
+    if isinstance(left, list) and all(
+        isinstance(msg, BaseMessage) and msg.id is None
+        and not isinstance(msg, (BaseMessageChunk, RemoveMessage))
+        for msg in right
+    ):
+        for msg in right:
+            msg.id = str(uuid.uuid4())
+        return left + right
+    from langgraph.graph.message import add_messages
+    return add_messages(left, right)
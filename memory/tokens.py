@@ -0,0 +1,50 @@
+import os
+import threading
+
+# cl100k_base is not Gemini's tokenizer, but it tracks it closely enough for budgeting
+TOKEN_ENCODING = os.getenv("TOKEN_ENCODING", "cl100k_base")
+# Characters per token when the tiktoken encoding cannot be loaded (e.g. offline)
+_CHARS_PER_TOKEN = 4
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+                except Exception as e:
+                    print(f"❌ [memory/tokens.py:_get_encoding] tiktoken unavailable, estimating tokens from length: {str(e)}")
+                    _encoding = None
+                _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in text (estimated from its length if tiktoken is unavailable)"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, from_end: bool = False) -> str:
+    """Cut text to at most max_tokens, keeping the start (or the end if from_end)"""
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding()
+    if encoding is None:
+        max_chars = max_tokens * _CHARS_PER_TOKEN
+        return text[-max_chars:] if from_end else text[:max_chars]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[-max_tokens:] if from_end else tokens[:max_tokens])
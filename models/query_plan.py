@@ -0,0 +1,23 @@
+from dataclasses import dataclass, field
+from typing import List
+
+
+@dataclass
+class GuardDecision:
+    """
+    Outcome of the pre-execution cost check for one query.
+
+    action is "run", "limit" (a LIMIT was injected), "low_priority" (run in
+    the low-priority lane) or "reject". estimated_cost counts row visits
+    across every loop of the plan; estimated_rows is an upper bound on the
+    rows returned. sql is the statement that was (or would be) executed.
+    """
+    action: str
+    sql: str
+    estimated_cost: float = 0.0
+    estimated_rows: float = 0.0
+    plan: List[str] = field(default_factory=list)
+    reason: str = ""
+
+    def plan_text(self) -> str:
+        return "\n".join(self.plan)
@@ -1,10 +1,19 @@
 from typing_extensions import TypedDict
-from typing import Annotated
-from langgraph.graph import add_messages
+from typing import Annotated, Optional
+from models.query_plan import GuardDecision
+from models.sql_result import SQLInterruption, SQLResult
+from memory.conversation import ConversationMemory, merge_messages
 
 class State(TypedDict):
-    messages: Annotated[list, add_messages]
-    memory: list
+    messages: Annotated[list, merge_messages]
+    memory: ConversationMemory
     sql_needed_or_not: bool = False
     sql_query: str = ""
-    sql_output: str = ""
\ No newline at end of file
+    sql_output: str = ""
+    sql_result: Optional[SQLResult] = None
+    # Plan, cost estimate and cost guard decision for the executed query (None when served from cache)
+    sql_guard: Optional[GuardDecision] = None
+    # Set when the query hit its time/step budget or was cancelled
+    sql_interrupted: Optional[SQLInterruption] = None
+    sql_cache_hit: bool = False
+    speculation_status: str = ""
\ No newline at end of file
@@ -0,0 +1,228 @@
+import csv
+import io
+import os
+from dataclasses import dataclass, field
+from typing import Any, Iterator, List, Sequence, Tuple
+import numpy as np
+
+# Caps applied while fetching, so one huge SELECT cannot blow up memory or the prompt
+MAX_ROWS = int(os.getenv("SQL_MAX_ROWS", "1000"))
+MAX_BYTES = int(os.getenv("SQL_MAX_BYTES", str(1024 * 1024)))
+FETCH_BATCH_SIZE = int(os.getenv("SQL_FETCH_BATCH_SIZE", "200"))
+# Rows past the cap are only counted (not stored) up to this many
+COUNT_TRUNCATED_LIMIT = int(os.getenv("SQL_COUNT_TRUNCATED_LIMIT", "100000"))
+
+
+def _cell_size(value: Any) -> int:
+    """Rough in-memory size of a cell, used for the byte cap"""
+    if value is None:
+        return 1
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    return 8
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else f"{value:.4g}"
+
+
+def _summarize_column(values: List[Any], top_values: int) -> str:
+    """count/nulls plus min/max/mean for numeric columns, distinct and top values otherwise"""
+    present = [value for value in values if value is not None]
+    parts = [f"count={len(present)}"]
+    if len(present) < len(values):
+        parts.append(f"nulls={len(values) - len(present)}")
+    if not present:
+        return ", ".join(parts)
+
+    if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in present):
+        numbers = np.asarray(present, dtype=np.float64)
+        parts += [f"min={_format_number(numbers.min())}", f"max={_format_number(numbers.max())}",
+                  f"mean={_format_number(numbers.mean())}"]
+    else:
+        labels, counts = np.unique(np.asarray([str(value) for value in present]), return_counts=True)
+        top = np.argsort(-counts, kind="stable")[:top_values]
+        parts.append(f"distinct={len(labels)}")
+        parts.append("top=" + ", ".join(f"{str(labels[i])!r} ({counts[i]})" for i in top))
+    return ", ".join(parts)
+
+
+@dataclass
+class SQLResult:
+    """
+    Columnar result of a SQL query.
+
+    Values are stored one list per column and only turned into text, markdown
+    or CSV when a renderer is called. truncated_rows records how many rows
+    were dropped by the row/byte caps (a lower bound when truncated_exact is
+    False).
+    """
+    columns: List[str] = field(default_factory=list)
+    data: List[List[Any]] = field(default_factory=list)
+    row_count: int = 0
+    truncated_rows: int = 0
+    truncated_exact: bool = True
+    truncation_reason: str = ""
+    size_bytes: int = 0
+
+    @classmethod
+    def from_cursor(cls, cursor, max_rows: int = MAX_ROWS, max_bytes: int = MAX_BYTES,
+                    batch_size: int = FETCH_BATCH_SIZE, count_limit: int = COUNT_TRUNCATED_LIMIT) -> "SQLResult":
+        """Fetch an executed cursor in fetchmany batches until it is drained or a cap is hit"""
+        columns = [description[0] for description in cursor.description] if cursor.description else []
+        result = cls(columns=columns, data=[[] for _ in columns])
+        if not columns:
+            result.row_count = max(cursor.rowcount, 0)
+            return result
+
+        size = 0
+        overflow: List[Tuple] = []
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            for index, row in enumerate(batch):
+                if result.row_count >= max_rows:
+                    result.truncation_reason = "max_rows"
+                elif size >= max_bytes:
+                    result.truncation_reason = "max_bytes"
+                else:
+                    for column, value in zip(result.data, row):
+                        column.append(value)
+                        size += _cell_size(value)
+                    result.row_count += 1
+                    continue
+                overflow = batch[index:]
+                break
+            if overflow:
+                break
+
+        result.size_bytes = size
+        if overflow:
+            # Count the remaining rows without keeping them
+            result.truncated_rows = len(overflow)
+            while result.truncated_rows < count_limit:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                result.truncated_rows += len(batch)
+            else:
+                result.truncated_exact = False
+        return result
+
+    @property
+    def truncated(self) -> bool:
+        return self.truncated_rows > 0
+
+    def rows(self) -> Iterator[Tuple]:
+        return zip(*self.data)
+
+    def _truncation_note(self) -> str:
+        if not self.truncated:
+            return ""
+        more = f"{self.truncated_rows}{'' if self.truncated_exact else '+'}"
+        return f" (showing first {self.row_count}; {more} more rows truncated by {self.truncation_reason})"
+
+    def _table_lines(self, row_indices: Sequence[int]) -> List[str]:
+        """Header, separator and the given rows as fixed-width lines"""
+        # Stringify every cell once, then size columns from those strings
+        text_columns = [[str(column[i]) for i in row_indices] for column in self.data]
+        col_widths = [max([len(name)] + [len(value) for value in values]) for name, values in zip(self.columns, text_columns)]
+
+        header = " | ".join(f"{col:<{col_widths[i]}}" for i, col in enumerate(self.columns))
+        separator = "-" * len(header)
+        formatted_rows = [
+            " | ".join(f"{cell:<{col_widths[i]}}" for i, cell in enumerate(row))
+            for row in zip(*text_columns)
+        ]
+        return [separator, header, separator] + formatted_rows + [separator]
+
+    def describe(self) -> str:
+        """One line about the result (row count, columns, truncation) without rendering any rows"""
+        if not self.columns:
+            return f"Query executed successfully. {self.row_count} rows affected."
+        return (f"Query returned {self.row_count} rows with columns {', '.join(self.columns)}"
+                f"{self._truncation_note()}.")
+
+    def to_text(self) -> str:
+        """Render as the fixed-width table used in prompts and the CLI"""
+        if not self.columns:
+            return f"Query executed successfully. {self.row_count} rows affected."
+        if not self.row_count:
+            return "Query executed successfully. No results returned."
+
+        result_text = "Query Results:\n" + "\n".join(self._table_lines(range(self.row_count)))
+        result_text += f"\nTotal rows: {self.row_count}{self._truncation_note()}"
+        return result_text
+
+    def column_summaries(self, top_values: int = 3) -> List[str]:
+        """One line per column: counts, min/max/mean or the most frequent values (over the fetched rows)"""
+        return [f"- {name}: {_summarize_column(values, top_values)}" for name, values in zip(self.columns, self.data)]
+
+    def to_summary_text(self, head_rows: int = 5, tail_rows: int = 5, top_values: int = 3) -> str:
+        """
+        Compact rendering for results too large to show in full: the first and
+        last rows plus per-column summaries computed over every fetched row.
+        """
+        if not self.columns or self.row_count <= head_rows + tail_rows:
+            return self.to_text()
+
+        lines = [f"Query Results (summarized, {self.row_count} rows{self._truncation_note()}):"]
+        if head_rows:
+            lines.append(f"First {head_rows} rows:")
+            lines += self._table_lines(range(head_rows))
+        if tail_rows:
+            lines.append(f"Last {tail_rows} rows:")
+            lines += self._table_lines(range(self.row_count - tail_rows, self.row_count))
+        lines.append("Column summaries:")
+        lines += self.column_summaries(top_values)
+        return "\n".join(lines)
+
+    def to_markdown(self) -> str:
+        if not self.columns:
+            return f"_{self.row_count} rows affected._"
+
+        def escape(value: Any) -> str:
+            return str(value).replace("|", "\\|").replace("\n", " ")
+
+        lines = ["| " + " | ".join(escape(col) for col in self.columns) + " |",
+                 "| " + " | ".join("---" for _ in self.columns) + " |"]
+        lines.extend("| " + " | ".join(escape(value) for value in row) + " |" for row in self.rows())
+        if self.truncated:
+            lines.append(f"\n_{self._truncation_note().strip(' ()')}_")
+        return "\n".join(lines)
+
+    def to_csv(self) -> str:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self.columns)
+        writer.writerows(self.rows())
+        return buffer.getvalue()
+
+    def __str__(self) -> str:
+        return self.to_text()
+
+
+@dataclass
+class SQLInterruption:
+    """
+    Why a query was stopped before it finished: "timeout" (wall-clock
+    budget), "steps" (SQLite VM-step budget) or a cancellation reason such as
+    "cancelled" or "disconnected".
+    """
+    reason: str
+    elapsed_seconds: float = 0.0
+    vm_steps: int = 0
+    timeout_seconds: float = 0.0
+    max_vm_steps: int = 0
+
+    @property
+    def timed_out(self) -> bool:
+        return self.reason in ("timeout", "steps")
+
+    def describe(self) -> str:
+        if self.reason == "timeout":
+            return f"Query timed out after {self.elapsed_seconds:.1f}s (limit {self.timeout_seconds:g}s)"
+        if self.reason == "steps":
+            return f"Query stopped after {self.vm_steps:,} SQLite VM steps (limit {self.max_vm_steps:,})"
+        return f"Query {self.reason} after {self.elapsed_seconds:.1f}s"
@@ -0,0 +1,374 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.serde.types import TASKS
+from persistence.connection_pool import run_in_db_executor
+from utils.metrics import counters
+
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", os.path.join("persistence", "checkpoints.db"))
+# Checkpoints kept per conversation thread; older ones (and the blobs only they use) are pruned
+KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "20"))
+# Threads untouched for this long are deleted entirely
+MAX_AGE_SECONDS = float(os.getenv("CHECKPOINT_MAX_AGE_SECONDS", str(30 * 24 * 3600)))
+# Idle-thread sweep runs once every this many checkpoint writes
+SWEEP_EVERY = int(os.getenv("CHECKPOINT_SWEEP_EVERY", "500"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE INDEX IF NOT EXISTS checkpoints_by_age ON checkpoints (created_at);
+"""
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver):
+    """
+    LangGraph checkpointer persisting conversation threads to a SQLite file.
+
+    Values are serialized with JsonPlusSerializer, which encodes them as
+    msgpack via ormsgpack. Channel values are stored once per version, so a
+    checkpoint only writes the channels that changed in that step. Each
+    thread keeps its last keep_last checkpoints; threads idle for longer
+    than max_age are deleted.
+    """
+
+    def __init__(self, db_path: str = CHECKPOINT_DB_PATH, keep_last: int = KEEP_LAST,
+                 max_age: float = MAX_AGE_SECONDS, serde=None):
+        super().__init__(serde=serde or JsonPlusSerializer())
+        self.db_path = db_path
+        self.keep_last = max(1, keep_last)
+        self.max_age = max_age
+        self._puts = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode = WAL;")
+        self._conn.execute("PRAGMA synchronous = NORMAL;")
+        self._conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE;")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK;")
+                raise
+            self._conn.execute("COMMIT;")
+
+    def _load_blobs(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> Dict[str, Any]:
+        values: Dict[str, Any] = {}
+        if not versions:
+            return values
+        pairs = [item for channel, version in versions.items() for item in (channel, str(version))]
+        with self._lock:
+            rows = self._conn.execute(
+                f"""SELECT channel, type, blob FROM blobs WHERE thread_id = ? AND checkpoint_ns = ?
+                    AND (channel, version) IN (VALUES {','.join(['(?, ?)'] * len(versions))});""",
+                (thread_id, checkpoint_ns, *pairs),
+            ).fetchall()
+        for channel, type_, blob in rows:
+            if type_ != "empty":
+                values[channel] = self.serde.loads_typed((type_, blob))
+        return values
+
+    def _load_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str,
+                     channel: Optional[str] = None) -> List[Tuple[str, str, Any]]:
+        query = """SELECT task_id, channel, type, value FROM writes
+                   WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?"""
+        params: Tuple = (thread_id, checkpoint_ns, checkpoint_id)
+        if channel is not None:
+            query += " AND channel = ?"
+            params += (channel,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY task_path, task_id, idx;", params).fetchall()
+        return [(task_id, channel_, self.serde.loads_typed((type_, value))) for task_id, channel_, type_, value in rows]
+
+    def _tuple(self, thread_id: str, checkpoint_ns: str, row) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, type_, checkpoint_blob, metadata_type, metadata_blob = row
+        checkpoint: Checkpoint = self.serde.loads_typed((type_, checkpoint_blob))
+        sends = (
+            [value for _, _, value in self._load_writes(thread_id, checkpoint_ns, parent_checkpoint_id, TASKS)]
+            if parent_checkpoint_id else []
+        )
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}},
+            checkpoint={
+                **checkpoint,
+                "channel_values": self._load_blobs(thread_id, checkpoint_ns, checkpoint["channel_versions"]),
+                "pending_sends": sends,
+            },
+            metadata=self.serde.loads_typed((metadata_type, metadata_blob)),
+            pending_writes=self._load_writes(thread_id, checkpoint_ns, checkpoint_id),
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_checkpoint_id}}
+                if parent_checkpoint_id else None
+            ),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?;",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    f"""SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?
+                        ORDER BY checkpoint_id DESC LIMIT 1;""",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+        return self._tuple(thread_id, checkpoint_ns, row) if row else None
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        query = """SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint,
+                          metadata_type, metadata FROM checkpoints WHERE 1 = 1"""
+        params: List[Any] = []
+        if config:
+            query += " AND thread_id = ?"
+            params.append(config["configurable"]["thread_id"])
+            if config["configurable"].get("checkpoint_ns") is not None:
+                query += " AND checkpoint_ns = ?"
+                params.append(config["configurable"]["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                query += " AND checkpoint_id = ?"
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            query += " AND checkpoint_id < ?"
+            params.append(before_id)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY checkpoint_id DESC;", params).fetchall()
+
+        for thread_id, checkpoint_ns, *row in rows:
+            if limit is not None and limit <= 0:
+                break
+            item = self._tuple(thread_id, checkpoint_ns, row)
+            if filter and not all(item.metadata.get(key) == value for key, value in filter.items()):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield item
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        start = time.perf_counter()
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        stored = checkpoint.copy()
+        stored.pop("pending_sends", None)
+        values: Dict[str, Any] = stored.pop("channel_values")
+
+        blobs = [
+            (thread_id, checkpoint_ns, channel, str(version),
+             *(self.serde.dumps_typed(values[channel]) if channel in values else ("empty", b"")))
+            for channel, version in new_versions.items()
+        ]
+        type_, checkpoint_blob = self.serde.dumps_typed(stored)
+        metadata_type, metadata_blob = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+
+        with self._transaction() as conn:
+            conn.executemany("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?);", blobs)
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);",
+                (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                 type_, checkpoint_blob, metadata_type, metadata_blob, time.time()),
+            )
+            self._prune(conn, thread_id, checkpoint_ns)
+            self._puts += 1
+            if self._puts % SWEEP_EVERY == 0:
+                self._sweep(conn)
+
+        counters.increment("checkpoint.puts")
+        counters.increment("checkpoint.put_seconds", time.perf_counter() - start)
+        counters.increment("checkpoint.put_bytes", len(checkpoint_blob) + sum(len(blob[-1]) for blob in blobs))
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = [
+            (thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx), channel,
+             *self.serde.dumps_typed(value), task_path)
+            for idx, (channel, value) in enumerate(writes)
+        ]
+        # Special channels (errors, interrupts) overwrite; regular writes are kept once per index
+        verb = "INSERT OR REPLACE" if all(channel in WRITES_IDX_MAP for channel, _ in writes) else "INSERT OR IGNORE"
+        with self._transaction() as conn:
+            conn.executemany(f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);", rows)
+
+    def _prune(self, conn: sqlite3.Connection, thread_id: str, checkpoint_ns: str):
+        """Drop checkpoints beyond keep_last, their writes, and blob versions nothing kept can reach"""
+        stale = [row[0] for row in conn.execute(
+            """SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?
+               ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?;""",
+            (thread_id, checkpoint_ns, self.keep_last),
+        )]
+        if not stale:
+            return
+        placeholders = ",".join("?" * len(stale))
+        conn.execute(
+            f"DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id IN ({placeholders});",
+            (thread_id, checkpoint_ns, *stale),
+        )
+        conn.execute(
+            f"DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id IN ({placeholders});",
+            (thread_id, checkpoint_ns, *stale),
+        )
+
+        # Versions only grow, so anything older than what the oldest kept checkpoint uses is unreachable
+        type_, blob = conn.execute(
+            """SELECT type, checkpoint FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?
+               ORDER BY checkpoint_id ASC LIMIT 1;""",
+            (thread_id, checkpoint_ns),
+        ).fetchone()
+        oldest_versions = self.serde.loads_typed((type_, blob))["channel_versions"]
+        conn.executemany(
+            "DELETE FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version < ?;",
+            [(thread_id, checkpoint_ns, channel, str(version)) for channel, version in oldest_versions.items()],
+        )
+        counters.increment("checkpoint.pruned", len(stale))
+
+    def _sweep(self, conn: sqlite3.Connection):
+        """Delete threads whose newest checkpoint is older than max_age"""
+        cutoff = time.time() - self.max_age
+        idle = [row[0] for row in conn.execute(
+            "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(created_at) < ?;", (cutoff,)
+        )]
+        for thread_id in idle:
+            for table in ("checkpoints", "blobs", "writes"):
+                conn.execute(f"DELETE FROM {table} WHERE thread_id = ?;", (thread_id,))
+        if idle:
+            counters.increment("checkpoint.threads_expired", len(idle))
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._transaction() as conn:
+            for table in ("checkpoints", "blobs", "writes"):
+                conn.execute(f"DELETE FROM {table} WHERE thread_id = ?;", (thread_id,))
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            threads, checkpoints = self._conn.execute(
+                "SELECT COUNT(DISTINCT thread_id), COUNT(*) FROM checkpoints;"
+            ).fetchone()
+        puts = counters.get("checkpoint.puts")
+        return {
+            "threads": threads,
+            "checkpoints": checkpoints,
+            "puts": puts,
+            "pruned": counters.get("checkpoint.pruned"),
+            "avg_put_ms": 1000 * counters.get("checkpoint.put_seconds") / puts if puts else 0.0,
+            "avg_put_bytes": counters.get("checkpoint.put_bytes") / puts if puts else 0.0,
+        }
+
+    def get_next_version(self, current: Optional[str], channel) -> str:
+        """Zero-padded versions, so SQL string comparison orders them (used when pruning blobs)"""
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}"
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # Async variants run the SQLite work on the bounded executor
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await run_in_db_executor(self.get_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        items = await run_in_db_executor(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return await run_in_db_executor(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        return await run_in_db_executor(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await run_in_db_executor(self.delete_thread, thread_id)
+
+
+_checkpointer: Optional[SQLiteCheckpointSaver] = None
+_checkpointer_lock = threading.Lock()
+
+
+def get_checkpointer() -> SQLiteCheckpointSaver:
+    """Return the process-wide SQLite checkpointer"""
+    global _checkpointer
+    if _checkpointer is None:
+        with _checkpointer_lock:
+            if _checkpointer is None:
+                _checkpointer = SQLiteCheckpointSaver()
+    return _checkpointer
+
+
+def close_checkpointer():
+    global _checkpointer
+    with _checkpointer_lock:
+        if _checkpointer is not None:
+            _checkpointer.close()
+            _checkpointer = None
@@ -0,0 +1,215 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+DB_PATH = os.getenv("SQLITE_DB_PATH", os.path.join("persistence", "db", "Chinook_Sqlite.db"))
+
+# Pool sizing and per-connection tuning (see https://www.sqlite.org/pragma.html)
+POOL_MAX_SIZE = int(os.getenv("SQLITE_POOL_MAX_SIZE", "8"))
+POOL_TIMEOUT = float(os.getenv("SQLITE_POOL_TIMEOUT_SECONDS", "10"))
+HEALTH_CHECK_INTERVAL = float(os.getenv("SQLITE_HEALTH_CHECK_SECONDS", "30"))
+MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # negative = KiB, so 64 MiB
+QUERY_ONLY = os.getenv("SQLITE_QUERY_ONLY", "true").lower() == "true"
+TEMP_STORE = os.getenv("SQLITE_TEMP_STORE", "MEMORY")
+# Threads that run blocking SQLite work for async callers; defaults to the pool size
+EXECUTOR_WORKERS = int(os.getenv("SQLITE_EXECUTOR_WORKERS", str(POOL_MAX_SIZE)))
+
+
+class PoolTimeoutError(sqlite3.OperationalError):
+    """Raised when no pooled connection becomes free within the timeout"""
+
+
+class ConnectionPool:
+    """
+    Bounded pool of warm, read-only SQLite connections.
+
+    Each thread is handed back the connection it used last whenever that one
+    is idle, so its page cache stays warm. New connections are opened until
+    max_size is reached; after that callers wait for an idle connection.
+    Idle connections are health-checked before reuse.
+    """
+
+    def __init__(self, db_path: str = DB_PATH, max_size: int = POOL_MAX_SIZE, timeout: float = POOL_TIMEOUT,
+                 mmap_size: int = MMAP_SIZE, cache_size: int = CACHE_SIZE, query_only: bool = QUERY_ONLY,
+                 temp_store: str = TEMP_STORE, health_check_interval: float = HEALTH_CHECK_INTERVAL):
+        self.db_path = db_path
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+        self.mmap_size = mmap_size
+        self.cache_size = cache_size
+        self.query_only = query_only
+        self.temp_store = temp_store
+        self.health_check_interval = health_check_interval
+
+        self._idle: List[sqlite3.Connection] = []
+        self._last_checked: Dict[int, float] = {}
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        uri = Path(self.db_path).resolve().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)};")
+        conn.execute(f"PRAGMA cache_size = {int(self.cache_size)};")
+        conn.execute(f"PRAGMA query_only = {'ON' if self.query_only else 'OFF'};")
+        conn.execute(f"PRAGMA temp_store = {self.temp_store};")
+        self._last_checked[id(conn)] = time.monotonic()
+        return conn
+
+    def _is_healthy(self, conn: sqlite3.Connection) -> bool:
+        """Ping connections that have been idle longer than the health-check interval"""
+        if time.monotonic() - self._last_checked.get(id(conn), 0.0) < self.health_check_interval:
+            return True
+        try:
+            conn.execute("SELECT 1;").fetchone()
+        except sqlite3.Error:
+            return False
+        self._last_checked[id(conn)] = time.monotonic()
+        return True
+
+    def _discard(self, conn: sqlite3.Connection):
+        self._last_checked.pop(id(conn), None)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _checkout(self) -> sqlite3.Connection:
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("Connection pool is closed")
+                preferred = getattr(self._local, "conn", None)
+                if preferred is not None and any(conn is preferred for conn in self._idle):
+                    self._idle = [conn for conn in self._idle if conn is not preferred]
+                    conn = preferred
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn = None
+                    break
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(f"No SQLite connection available after {self.timeout}s (max_size={self.max_size})")
+                self._cond.wait(remaining)
+
+        try:
+            if conn is not None and not self._is_healthy(conn):
+                self._discard(conn)
+                conn = None
+            if conn is None:
+                conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        self._local.conn = conn
+        return conn
+
+    def _checkin(self, conn: sqlite3.Connection):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            return
+
+        with self._cond:
+            if self._closed:
+                self._discard(conn)
+                self._size -= 1
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a with-block"""
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            self._checkin(conn)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {"size": self._size, "idle": len(self._idle), "in_use": self._size - len(self._idle), "max_size": self.max_size}
+
+    def close(self):
+        """Close idle connections now and in-use ones as they are returned"""
+        with self._cond:
+            self._closed = True
+            for conn in self._idle:
+                self._discard(conn)
+            self._size -= len(self._idle)
+            self._idle = []
+            self._cond.notify_all()
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide read-only connection pool"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def close_pool():
+    """Close the process-wide pool; the next get_pool() opens a fresh one"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Return the bounded thread pool that runs SQLite work on behalf of async code"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=max(1, EXECUTOR_WORKERS), thread_name_prefix="sqlite")
+    return _executor
+
+
+async def run_in_db_executor(func, *args):
+    """Await a blocking database call without stalling the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(get_executor(), func, *args)
+
+
+def shutdown_executor(wait: bool = True):
+    """Stop the SQLite executor threads; the next get_executor() starts a fresh pool"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
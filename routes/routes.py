@@ -1,23 +1,45 @@
 
 from models.schema import State
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from services.llm_connector.llm_connector import llm
 import os
 
-def start_node(state: State) -> State:
+def start_node(state: State) -> dict:
     """Initialize the workflow and route to the first step"""
-    # Initialize SQL-related state variables if not present
-    if "sql_needed_or_not" not in state:
-        state["sql_needed_or_not"] = False
-    if "sql_query" not in state:
-        state["sql_query"] = ""
-    if "sql_output" not in state:
-        state["sql_output"] = ""
-    
-    return state
+    # Reset per-turn SQL state; a checkpointed thread still carries the previous turn's values
+    return {
+        "sql_needed_or_not": False,
+        "sql_query": "",
+        "sql_output": "",
+        "sql_result": None,
+        "sql_guard": None,
+        "sql_interrupted": None,
+        "sql_cache_hit": False,
+    }
 
 def route_sql_needed_or_not(state: State) -> str:
     if state["sql_needed_or_not"] == True:
         return "generate_sql_query"
     else:
-        return "chatbot"
\ No newline at end of file
+        return "chatbot"
+
+def route_cached_sql(state: State) -> str:
+    if state.get("sql_cache_hit"):
+        return "execute_sql_query"
+    else:
+        return "classify_sql_needed_or_not"
+
+def route_cached_sql_speculative(state: State):
+    if state.get("sql_cache_hit"):
+        return "execute_sql_query"
+    else:
+        # Fan out: classify and draft SQL in parallel
+        return ["classify_sql_needed_or_not", "speculative_generate_sql"]
+
+def route_speculation(state: State) -> str:
+    if not state.get("sql_needed_or_not"):
+        return "chatbot"
+    elif state.get("sql_query"):
+        return "execute_sql_query"
+    else:
+        # Speculative draft failed or was cancelled; generate the normal way
+        return "generate_sql_query"
\ No newline at end of file
@@ -1,18 +1,52 @@
-from services.chat.chat import run_chatbot
-from utils.cache_cleaner import clean_pycache
+import argparse
+import os
 
 # Load environment variables
 from config.config import set_env_variables
 set_env_variables()
 
-# Load the LLM
-from services.llm_connector.llm_connector import load_llm
-llm = load_llm()
+from utils.cache_cleaner import CLEAN_PYCACHE, clean_pycache
+
+# Modules the CLI imports before its first prompt
+CLI_MODULES = ["services.chat.chat"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Agentic RAG with SQL chat (CLI)")
+    parser.add_argument("--lazy", action="store_true",
+                        help="build the LLM, retriever, DB pool and workflow on first use instead of at startup")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="report import and initialization time per module, then exit")
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    clean_pycache()
+    args = parse_args()
+    if args.lazy:
+        os.environ["RUNTIME_STARTUP"] = "lazy"
+
+    if args.profile_startup:
+        from utils.startup_profile import profile_startup
+        raise SystemExit(profile_startup(CLI_MODULES))
+
+    if CLEAN_PYCACHE:
+        clean_pycache()
+
+    # Optionally rebuild the knowledge base in the background when the DB schema changes
+    if os.getenv("SCHEMA_WATCHER", "false").lower() == "true":
+        from RAG.knowledge_base_generation import start_schema_watcher
+        start_schema_watcher()
+
+    # Build the LLM, retriever, DB pool and workflow once for the whole process
+    from services.chat.chat import run_chatbot
+    from services.runtime.runtime import get_runtime
 
-    run_chatbot()    
+    runtime = get_runtime()
+    runtime.startup()
+    try:
+        run_chatbot()
+    finally:
+        runtime.shutdown()
 
-    clean_pycache()
\ No newline at end of file
+    if CLEAN_PYCACHE:
+        clean_pycache()
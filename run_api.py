@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Launcher for the HTTP API (JSON chat, SSE streaming, health/readiness).
+
+Serves one threaded process. For more processes run it under a prefork WSGI
+server instead, e.g.:
+    gunicorn -w 4 --threads 16 -k gthread "services.api.server:create_app()"
+Without --preload each worker calls create_app() after the fork, so SQLite
+connections and executor threads are opened per worker, never shared.
+"""
+
+import argparse
+import atexit
+import os
+from config.config import set_env_variables
+
+set_env_variables()
+
+from services.api.server import create_app
+from services.runtime.runtime import get_runtime
+
+HOST = os.getenv("API_HOST", "0.0.0.0")
+PORT = int(os.getenv("API_PORT", "8000"))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Agentic RAG with SQL HTTP API")
+    parser.add_argument("--lazy", action="store_true",
+                        help="build the LLM, retriever, DB pool and workflow on first use instead of at startup")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="report import and initialization time per module, then exit")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.lazy:
+        # Also read by the child process that --profile-startup runs
+        os.environ["RUNTIME_STARTUP"] = "lazy"
+    if args.profile_startup:
+        from utils.startup_profile import profile_startup
+        raise SystemExit(profile_startup(["services.api.server"]))
+    if args.lazy:
+        get_runtime().startup("lazy")
+
+    app = create_app()
+    atexit.register(get_runtime().shutdown)
+
+    print(f"🚀 Starting Agentic RAG with SQL API on http://{HOST}:{PORT}")
+    app.run(host=HOST, port=PORT, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import json
+import os
+import queue
+import threading
+from typing import Any, Dict
+from flask import Flask, Response, jsonify, request, stream_with_context
+from flask_cors import CORS
+from langchain_core.messages import HumanMessage
+from services.api.sessions import SessionStore
+from services.chat.streaming import stream_turn, final_answer, thread_config
+from services.runtime.runtime import get_runtime
+from services.sql.query_control import cancel_queries
+
+# Turns allowed to run at once in this process; further requests get 503 instead of queueing forever
+MAX_CONCURRENT_TURNS = int(os.getenv("API_MAX_CONCURRENT_TURNS", "32"))
+QUEUE_TIMEOUT = float(os.getenv("API_QUEUE_TIMEOUT_SECONDS", "30"))
+CORS_ORIGINS = os.getenv("API_CORS_ORIGINS", "*")
+# Seconds between SSE keep-alive comments while a turn produces no output; a write is how a disconnect shows up
+SSE_HEARTBEAT_SECONDS = float(os.getenv("API_SSE_HEARTBEAT_SECONDS", "5"))
+
+# Resources without which no turn can be answered
+_REQUIRED_RESOURCES = ("graph", "db_pool", "llm")
+
+
+def _turn_payload(session_id: str, result) -> Dict[str, Any]:
+    state = result.state
+    return {
+        "session_id": session_id,
+        "answer": final_answer(state),
+        "sql_needed": bool(state.get("sql_needed_or_not")),
+        "sql_query": state.get("sql_query") or None,
+        "timings": {
+            "time_to_first_token": result.time_to_first_token,
+            "total_seconds": result.total_seconds,
+        },
+    }
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def create_app() -> Flask:
+    """Build the Flask app serving the shared compiled graph"""
+    runtime = get_runtime()
+    runtime.startup()
+
+    app = Flask(__name__)
+    CORS(app, origins=CORS_ORIGINS)
+    sessions = SessionStore()
+    turn_slots = threading.BoundedSemaphore(MAX_CONCURRENT_TURNS)
+
+    def _read_request():
+        body = request.get_json(silent=True) or {}
+        message = (body.get("message") or "").strip()
+        if not message:
+            return None, None, (jsonify({"error": "Field 'message' is required."}), 400)
+        session, _ = sessions.get_or_create(body.get("session_id"))
+        return session, message, None
+
+    def _begin_turn(session):
+        """Reserve a turn slot and the session; returns an error response or None"""
+        if not turn_slots.acquire(timeout=QUEUE_TIMEOUT):
+            return jsonify({"error": "Server busy, try again later."}), 503
+        if not session.lock.acquire(blocking=False):
+            turn_slots.release()
+            return jsonify({"error": "A turn is already running for this session.", "session_id": session.session_id}), 409
+        return None
+
+    def _end_turn(session):
+        session.lock.release()
+        turn_slots.release()
+
+    def _once(func):
+        done = threading.Lock()
+
+        def wrapper():
+            if done.acquire(blocking=False):
+                func()
+        return wrapper
+
+    @app.post("/api/chat")
+    def chat():
+        session, message, error = _read_request()
+        if error:
+            return error
+        error = _begin_turn(session)
+        if error:
+            return error
+        try:
+            turn = {"messages": [HumanMessage(content=message)]}
+            for kind, payload in stream_turn(runtime.graph, turn, thread_config(session.session_id)):
+                if kind == "done":
+                    return jsonify(_turn_payload(session.session_id, payload))
+        except Exception as e:
+            print(f"❌ [services/api/server.py:chat] Error processing turn: {str(e)}")
+            return jsonify({"error": f"Error processing your request: {str(e)}", "session_id": session.session_id}), 500
+        finally:
+            _end_turn(session)
+
+    @app.post("/api/chat/stream")
+    def chat_stream():
+        session, message, error = _read_request()
+        if error:
+            return error
+        error = _begin_turn(session)
+        if error:
+            return error
+        # Released when the turn's worker finishes, or on close if the client left before the stream started
+        end_turn = _once(lambda: _end_turn(session))
+        started = threading.Event()
+        disconnected = threading.Event()
+        items: "queue.Queue" = queue.Queue()
+
+        def run_turn():
+            """Run the turn off the response thread, so a disconnect is noticed while a node is still working"""
+            try:
+                turn = {"messages": [HumanMessage(content=message)]}
+                for item in stream_turn(runtime.graph, turn, thread_config(session.session_id)):
+                    if disconnected.is_set():
+                        # Closing the graph stream stops the turn before its next step
+                        break
+                    items.put(item)
+            except Exception as e:
+                print(f"❌ [services/api/server.py:chat_stream] Error processing turn: {str(e)}")
+                items.put(("error", e))
+            finally:
+                items.put(None)
+                end_turn()
+
+        def events():
+            started.set()
+            threading.Thread(target=run_turn, name=f"turn-{session.session_id}", daemon=True).start()
+            finished = False
+            try:
+                yield _sse("session", {"session_id": session.session_id})
+                while True:
+                    try:
+                        item = items.get(timeout=SSE_HEARTBEAT_SECONDS)
+                    except queue.Empty:
+                        # Writing is how a disconnect is detected, so never stay silent for long
+                        yield ": ping\n\n"
+                        continue
+                    if item is None:
+                        finished = True
+                        return
+                    kind, payload = item
+                    if kind == "token":
+                        yield _sse("token", {"text": payload})
+                    elif kind == "done":
+                        yield _sse("done", _turn_payload(session.session_id, payload))
+                    else:
+                        yield _sse("error", {"error": f"Error processing your request: {str(payload)}"})
+            finally:
+                if not finished:
+                    disconnected.set()
+                    cancel_queries(session.session_id, "disconnected")
+
+        def on_close():
+            if not started.is_set():
+                end_turn()
+
+        response = Response(
+            stream_with_context(events()),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+        response.call_on_close(on_close)
+        return response
+
+    @app.post("/api/sessions/<session_id>/cancel")
+    def cancel_session(session_id: str):
+        """Interrupt the SQL currently running for a session; the turn answers with a cancelled result"""
+        return jsonify({"session_id": session_id, "cancelled_queries": cancel_queries(session_id)})
+
+    @app.delete("/api/sessions/<session_id>")
+    def delete_session(session_id: str):
+        cancel_queries(session_id, "deleted")
+        known = sessions.delete(session_id)
+        saved = runtime.graph.get_state(thread_config(session_id)).values
+        if not known and not saved:
+            return jsonify({"error": "Unknown session."}), 404
+        runtime.checkpointer.delete_thread(session_id)
+        return "", 204
+
+    @app.get("/healthz")
+    def health():
+        """Liveness: the process is up and serving requests"""
+        return jsonify({"status": "ok", "sessions": len(sessions)})
+
+    @app.get("/readyz")
+    def ready():
+        """Readiness: every resource needed to answer a question is loaded"""
+        # After a lazy startup (or a failed build) the probe is what builds them
+        for name in _REQUIRED_RESOURCES:
+            try:
+                getattr(runtime, name)
+            except Exception:
+                pass
+        status = runtime.status()
+        is_ready = all(status[name]["ready"] for name in _REQUIRED_RESOURCES)
+        return jsonify({"ready": is_ready, "resources": status}), 200 if is_ready else 503
+
+    return app
@@ -0,0 +1,66 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+SESSION_TTL_SECONDS = float(os.getenv("API_SESSION_TTL_SECONDS", "3600"))
+MAX_SESSIONS = int(os.getenv("API_MAX_SESSIONS", "1000"))
+
+
+class Session:
+    """
+    One client conversation. Its state lives in the graph checkpointer under
+    thread_id == session_id; the lock lets only one turn run at a time.
+    """
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+
+class SessionStore:
+    """
+    In-process map of session id -> Session (per-session locks).
+
+    Sessions idle longer than ttl are dropped, and the least recently used
+    session is evicted past max_sessions. Dropping a session only forgets
+    its lock: the conversation itself stays in the checkpointer, and a
+    request with the same id picks it up again.
+    """
+
+    def __init__(self, ttl: float = SESSION_TTL_SECONDS, max_sessions: int = MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        for session_id in [sid for sid, session in self._sessions.items() if session.last_used < cutoff]:
+            del self._sessions[session_id]
+
+    def get_or_create(self, session_id: Optional[str] = None) -> Tuple[Session, bool]:
+        """Return (session, created); a missing or unknown id starts a new session"""
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id) if session_id else None
+            created = session is None
+            if created:
+                session = Session(session_id or uuid.uuid4().hex)
+                self._sessions[session.session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            self._sessions.move_to_end(session.session_id)
+            session.last_used = time.monotonic()
+            return session, created
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
@@ -1,20 +1,21 @@
-from models.schema import State
+import os
+import uuid
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from services.llm_connector.llm_connector import llm
-from graph.graph import graph
+from services.runtime.runtime import get_runtime
+from services.chat.streaming import stream_turn, final_answer, thread_config
 
 def run_chatbot():
     """Run the chatbot application"""
-    # Initialize the graph inside the function to ensure latest modules are used
-    app = graph()
-    
-    state: State = {
-        "messages": [],
-        "memory": []
-    }
+    # Share the workflow compiled once by the runtime registry
+    app = get_runtime().graph
+
+    # Conversation state lives in the checkpointer; reuse a thread id to resume it
+    thread_id = os.getenv("CHAT_THREAD_ID") or uuid.uuid4().hex
+    config = thread_config(thread_id)
 
     print("Welcome to the Agentic RAG with SQL Chatbot!")
     print("Type 'exit', 'quit', 'bye', or '/bye' to exit.")
+    print(f"Session: {thread_id} (set CHAT_THREAD_ID={thread_id} to resume it later)")
     print("-" * 50)
 
     while True:
@@ -29,18 +30,26 @@ def run_chatbot():
                 print("Please provide a valid message.")
                 continue
 
-            # Add user message to state
-            state["messages"].append(HumanMessage(content=user_input))
+            # Only the new message is sent; history is restored from the checkpoint
+            turn = {"messages": [HumanMessage(content=user_input)]}
             
-            # Execute graph
+            # Execute graph, printing answer tokens as they arrive
             try:
-                output = app.invoke(state)
-                state.update(output)
+                streamed = False
+                for kind, payload in stream_turn(app, turn, config):
+                    if kind == "token":
+                        if not streamed:
+                            print("\nAssistant: ", end="", flush=True)
+                            streamed = True
+                        print(payload, end="", flush=True)
+                    else:
+                        if not streamed:
+                            print(f"\nAssistant: {final_answer(payload.state)}", end="")
+                        ttft = f"{payload.time_to_first_token:.2f}s" if payload.time_to_first_token is not None else "n/a"
+                        print(f"\n⏱️ First token: {ttft} | Total: {payload.total_seconds:.2f}s")
             except Exception as e:
                 error_msg = f"Error processing your request: {str(e)}"
                 print(f"❌ [services/chat/chat.py:run_chatbot] {error_msg}")
-                # Add error message to state
-                state["messages"].append(SystemMessage(content=error_msg))
                 
         except KeyboardInterrupt:
             print("\n\nGoodbye!")
@@ -1,76 +1,134 @@
+import time
 from langchain_core.messages import AIMessage, SystemMessage, HumanMessage
 from models.schema import State
-from services.llm_connector.llm_connector import llm
+from services.llm_connector.llm_connector import get_llm
+from memory.conversation import as_memory
+from services.llm_connector.prompt_builder import PromptBuilder, fit_history, fit_sql_result
+from utils.metrics import counters
 
-def chatbot(state: State) -> State:
-    """Handle chatbot interactions with enhanced prompting"""
+def _reply(response_text: str) -> dict:
+    # Only the new message: the add_messages reducer appends it to the history.
+    # The turn is recorded in memory by the update_memory node
+    return {"messages": [AIMessage(content=response_text)]}
+
+def _user_input(state: State) -> str:
+    # The latest message is the SQL result when a query ran this turn
+    user_msg = next((msg for msg in reversed(state["messages"]) if isinstance(msg, HumanMessage)), None)
+    return user_msg.content if user_msg is not None else ""
+
+def _precheck(state: State):
+    """Answer directly when there is nothing the LLM can do; returns None otherwise"""
     if not state["messages"]:
         error_msg = "No messages in state to process."
         print(f"❌ [services/chat/chatbot.py:chatbot] {error_msg}")
-        ai_msg = AIMessage(content=error_msg)
-        state["messages"].append(ai_msg)
-        return state
+        return _reply(error_msg)
     
-    user_msg = state["messages"][-1]
-    user_input = user_msg.content
+    user_input = _user_input(state)
 
     # Check if LLM is available
-    if llm is None:
+    if get_llm() is None:
         error_msg = "LLM not available. Please check your Google API key configuration."
         print(f"❌ [services/chat/chatbot.py:chatbot] {error_msg}")
-        ai_msg = AIMessage(content=error_msg)
-        state["messages"].append(ai_msg)
-        state["memory"] = state["memory"] + [user_msg, ai_msg]
-        return state
+        return _reply(error_msg)
 
     # Validate user input
     if not user_input or not user_input.strip():
         error_msg = "Please provide a valid message."
         print(f"❌ [services/chat/chatbot.py:chatbot] {error_msg}")
-        ai_msg = AIMessage(content=error_msg)
-        state["messages"].append(ai_msg)
-        state["memory"] = state["memory"] + [user_msg, ai_msg]
-        return state
+        return _reply(error_msg)
+    return None
 
-    # Check if we have SQL output from previous execution
+def _chat_messages(state: State) -> list:
+    user_input = _user_input(state)
+
+    # Check if we have SQL output from previous execution (the result itself, or an error to explain)
+    sql_result = state.get("sql_result")
     sql_output = state.get("sql_output", "")
     
-    # Construct messages for Gemini
+    # Bounded memory: rolling summary of older turns plus the last few turns verbatim
+    memory = as_memory(state.get("memory"))
+
+    # Construct messages for Gemini; every section is held to its token budget
+    prompt = PromptBuilder("chatbot")
     messages = []
     
-    # Add system message if we have SQL output
-    if sql_output:
-        system_content = f"""You are a helpful assistant. Answer the user's question based on the SQL results provided below.
-If the answer is not in the SQL results, provide a helpful response based on your knowledge.
+    # Add system message if we have SQL output or a conversation summary
+    system_sections = []
+    if sql_result is not None or sql_output:
+        instructions = prompt.add("instructions", """You are a helpful assistant. Answer the user's question based on the SQL results provided below.
+If the answer is not in the SQL results, provide a helpful response based on your knowledge.""")
+        sql_results = prompt.add("sql_result", fit_sql_result(sql_result, sql_output))
+        system_sections.append(f"""{instructions}
 
 SQL Results:
-{sql_output}"""
-        messages.append(SystemMessage(content=system_content))
-    
-    # Add the user message
-    messages.append(HumanMessage(content=user_input))
+{sql_results}""")
+    if memory.summary:
+        system_sections.append(f"Summary of the earlier conversation:\n{prompt.add('summary', memory.summary)}")
+    if system_sections:
+        messages.append(SystemMessage(content="\n\n".join(system_sections)))
+
+    # Recent turns that fit the history budget, then the user message
+    messages.extend(prompt.add_messages("history", fit_history(memory.history())))
+    messages.append(HumanMessage(content=prompt.add("question", user_input)))
+    prompt.log()
+
+    # Debug: Print the messages being sent
+    print(f"\nDEBUG: Number of messages: {len(messages)}")
+    for i, msg in enumerate(messages):
+        print(f"DEBUG: Message {i+1} type: {type(msg).__name__}, content length: {len(msg.content)}")
+    return messages
+
+def _record_latency(start: float, first_token_at):
+    """Time-to-first-token and total LLM latency, kept apart"""
+    end = time.perf_counter()
+    counters.increment("chatbot.responses")
+    counters.increment("chatbot.total_seconds", end - start)
+    if first_token_at is not None:
+        counters.increment("chatbot.first_token_seconds", first_token_at - start)
+
+def chatbot(state: State) -> dict:
+    """Handle chatbot interactions with enhanced prompting"""
+    done = _precheck(state)
+    if done is not None:
+        return done
 
-    # Stream response from Gemini
+    # Stream response from Gemini; tokens reach callers through the graph's "messages" stream mode
     response_text = ""
-    print("Assistant (streaming): ", end="", flush=True)
     try:
-        # Debug: Print the messages being sent
-        print(f"\nDEBUG: Number of messages: {len(messages)}")
-        for i, msg in enumerate(messages):
-            print(f"DEBUG: Message {i+1} type: {type(msg).__name__}, content length: {len(msg.content)}")
-        
-        # Use invoke with the properly formatted messages
-        response = llm.invoke(messages)
-        response_text = response.content
-        
-        print(response_text)
+        messages = _chat_messages(state)
+        start, first_token_at = time.perf_counter(), None
+        for chunk in get_llm().stream(messages):
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            response_text += chunk.content
+        _record_latency(start, first_token_at)
         
     except Exception as e:
         error_msg = f"Error generating response: {str(e)}"
         print(f"\n❌ [services/chat/chatbot.py:chatbot] {error_msg}")
         response_text = "I'm sorry, I encountered an error while processing your request. Please try again."
 
-    ai_msg = AIMessage(content=response_text)
-    state["messages"].append(ai_msg)
-    state["memory"] = state["memory"] + [user_msg, ai_msg]
-    return state
+    return _reply(response_text)
+
+async def achatbot(state: State) -> dict:
+    """Async chatbot: streams the LLM with astream so other conversations proceed meanwhile"""
+    done = _precheck(state)
+    if done is not None:
+        return done
+
+    response_text = ""
+    try:
+        messages = _chat_messages(state)
+        start, first_token_at = time.perf_counter(), None
+        async for chunk in get_llm().astream(messages):
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            response_text += chunk.content
+        _record_latency(start, first_token_at)
+
+    except Exception as e:
+        error_msg = f"Error generating response: {str(e)}"
+        print(f"\n❌ [services/chat/chatbot.py:achatbot] {error_msg}")
+        response_text = "I'm sorry, I encountered an error while processing your request. Please try again."
+
+    return _reply(response_text)
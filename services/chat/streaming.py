@@ -0,0 +1,84 @@
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, NamedTuple, Optional, Tuple
+from langchain_core.messages import AIMessage, AIMessageChunk
+from utils.metrics import counters
+
+# Only tokens produced inside this node are user-facing; classifier and SQL-generation calls are not
+ANSWER_NODE = "chatbot"
+
+
+class TurnResult(NamedTuple):
+    state: Dict[str, Any]
+    time_to_first_token: Optional[float]
+    total_seconds: float
+
+
+def _answer_token(chunk, metadata: Dict[str, Any]) -> str:
+    # Whole messages written to state are echoed by the "messages" mode too; keep only LLM chunks
+    if metadata.get("langgraph_node") != ANSWER_NODE or not isinstance(chunk, AIMessageChunk):
+        return ""
+    content = getattr(chunk, "content", "")
+    return content if isinstance(content, str) else ""
+
+
+def final_answer(state: Dict[str, Any]) -> str:
+    """Content of the last AI message in a graph output"""
+    messages = state.get("messages") or []
+    if messages and isinstance(messages[-1], AIMessage):
+        return messages[-1].content
+    return "I'm sorry, I couldn't generate a response. Please try again."
+
+
+def _finish(state: Dict[str, Any], start: float, first_token_at: Optional[float]) -> TurnResult:
+    total = time.perf_counter() - start
+    ttft = first_token_at - start if first_token_at is not None else None
+    counters.increment("turn.count")
+    counters.increment("turn.total_seconds", total)
+    if ttft is not None:
+        counters.increment("turn.first_token_seconds", ttft)
+    return TurnResult(state, ttft, total)
+
+
+def thread_config(thread_id: str) -> Dict[str, Any]:
+    """Graph config selecting the checkpointed conversation thread"""
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def stream_turn(app, state: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> Iterator[Tuple[str, Any]]:
+    """
+    Run one conversation turn through the compiled graph. With a checkpointed
+    graph, state only needs the new message and config names the thread.
+
+    Yields ("token", text) for every answer token as Gemini produces it, then
+    ("done", TurnResult) with the final state. Time-to-first-token is measured
+    from the start of the turn, so it includes classification, SQL generation
+    and execution.
+    """
+    start, first_token_at = time.perf_counter(), None
+    final_state = state
+    for mode, payload in app.stream(state, config, stream_mode=["messages", "values"]):
+        if mode == "values":
+            final_state = payload
+            continue
+        token = _answer_token(*payload)
+        if token:
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            yield "token", token
+    yield "done", _finish(final_state, start, first_token_at)
+
+
+async def astream_turn(app, state: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> AsyncIterator[Tuple[str, Any]]:
+    """Async stream_turn"""
+    start, first_token_at = time.perf_counter(), None
+    final_state = state
+    async for mode, payload in app.astream(state, config, stream_mode=["messages", "values"]):
+        if mode == "values":
+            final_state = payload
+            continue
+        token = _answer_token(*payload)
+        if token:
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            yield "token", token
+    yield "done", _finish(final_state, start, first_token_at)
@@ -0,0 +1,48 @@
+from langchain_core.messages import AIMessage, HumanMessage
+from models.schema import State
+from memory.conversation import ConversationMemory, as_memory, compact_messages
+from services.llm_connector.llm_connector import get_llm
+from utils.metrics import counters
+
+def _record_turn(state: State) -> ConversationMemory:
+    """Push the turn that just finished into the memory ring buffer"""
+    memory = as_memory(state.get("memory"))
+    messages = state["messages"]
+    if len(messages) >= 2 and isinstance(messages[-1], AIMessage):
+        user_msg = next((msg for msg in reversed(messages) if isinstance(msg, HumanMessage)), None)
+        if user_msg is not None:
+            memory.add_turn(user_msg, messages[-1])
+    return memory
+
+def update_memory(state: State) -> dict:
+    """
+    Record the finished turn, fold turns that left the window into the rolling
+    summary when they add up, and trim State["messages"] to the window.
+    """
+    memory = _record_turn(state)
+    if memory.needs_summary():
+        summary = None
+        llm = get_llm()
+        if llm is not None:
+            try:
+                summary = llm.invoke(memory.summary_prompt()).content
+            except Exception as e:
+                print(f"❌ [services/chat/update_memory.py:update_memory] Error summarizing memory: {str(e)}")
+        memory.apply_summary(summary)
+        counters.increment("memory.summaries")
+    return {"memory": memory, "messages": compact_messages(state["messages"], memory.window_turns)}
+
+async def aupdate_memory(state: State) -> dict:
+    """Async update_memory"""
+    memory = _record_turn(state)
+    if memory.needs_summary():
+        summary = None
+        llm = get_llm()
+        if llm is not None:
+            try:
+                summary = (await llm.ainvoke(memory.summary_prompt())).content
+            except Exception as e:
+                print(f"❌ [services/chat/update_memory.py:aupdate_memory] Error summarizing memory: {str(e)}")
+        memory.apply_summary(summary)
+        counters.increment("memory.summaries")
+    return {"memory": memory, "messages": compact_messages(state["messages"], memory.window_turns)}
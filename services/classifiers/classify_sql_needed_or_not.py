@@ -1,46 +1,93 @@
 from langchain_core.messages import HumanMessage, SystemMessage
 from models.schema import State
-from services.llm_connector.llm_connector import llm
+from services.llm_connector.llm_connector import get_llm
+from services.classifiers.local_classifier import get_local_classifier, MIN_CONFIDENCE
+from persistence.connection_pool import run_in_db_executor
+from utils.metrics import counters
 
-def classify_sql_needed_or_not(state: State) -> dict:
-    """Classify if SQL is needed or not based on the user's last message"""
-    
-    last_user_message = next(
+CLASSIFIER_PROMPT = "You are a classifier. Analyze the user's message and respond with ONLY 'true' if the user is asking for data, database information, or wants to query the database. Respond with ONLY 'false' for general conversation. Do not include any other text in your response."
+
+def _last_user_message(state: State):
+    return next(
         (msg for msg in reversed(state["messages"]) if isinstance(msg, HumanMessage)),
         None,
     )
+
+def _classify_locally(user_text: str):
+    """Run the in-process classifier; returns None if it fails"""
+    try:
+        return get_local_classifier().classify(user_text)
+    except Exception as e:
+        print(f"❌ [services/classifiers/classify_sql_needed_or_not.py:classify_sql_needed_or_not] Local classifier failed: {e}")
+        return None
+
+def _is_confident(local_result) -> bool:
+    return local_result is not None and (local_result.confidence >= MIN_CONFIDENCE or get_llm() is None)
+
+def _parse_llm_answer(result_text: str, user_text: str, local_result) -> dict:
+    result_text = result_text.strip().lower()
+    if result_text == "true":
+        return {"sql_needed_or_not": True}
+    elif result_text == "false":
+        return {"sql_needed_or_not": False}
+    else:
+        # Fallback to the local (or keyword-based) classification
+        return _fallback_classification(user_text, local_result)
+
+def _classifier_messages(user_text: str):
+    return [
+        SystemMessage(content=CLASSIFIER_PROMPT),
+        HumanMessage(content=user_text),
+    ]
+
+def classify_sql_needed_or_not(state: State) -> dict:
+    """Classify if SQL is needed or not based on the user's last message"""
+    
+    last_user_message = _last_user_message(state)
     
     if not last_user_message:
         return {"sql_needed_or_not": False}
 
+    # Fast path: route locally when the in-process classifier is confident enough
+    local_result = _classify_locally(last_user_message.content)
+    if _is_confident(local_result):
+        counters.increment("classifier.local")
+        return {"sql_needed_or_not": local_result.sql_needed}
+
+    counters.increment("classifier.llm")
     try:
-        # Use a simple classification approach
-        messages = [
-            SystemMessage(
-                content="You are a classifier. Analyze the user's message and respond with ONLY 'true' if the user is asking for data, database information, or wants to query the database. Respond with ONLY 'false' for general conversation. Do not include any other text in your response."
-            ),
-            HumanMessage(content=last_user_message.content),
-        ]
-        
-        response = llm.invoke(messages)
-        result_text = response.content.strip().lower()
-        
-        # Parse the response
-        if result_text == "true":
-            return {"sql_needed_or_not": True}
-        elif result_text == "false":
-            return {"sql_needed_or_not": False}
-        else:
-            # Fallback to keyword-based classification
-            return _fallback_classification(last_user_message.content)
-    
+        response = get_llm().invoke(_classifier_messages(last_user_message.content))
+        return _parse_llm_answer(response.content, last_user_message.content, local_result)
     except Exception as e:
         print(f"❌ [services/classifiers/classify_sql_needed_or_not.py:classify_sql_needed_or_not] Error in classification: {e}")
-        return _fallback_classification(last_user_message.content)
+        return _fallback_classification(last_user_message.content, local_result)
+
+async def aclassify_sql_needed_or_not(state: State) -> dict:
+    """Async classify_sql_needed_or_not: the local model runs off the event loop, the LLM via ainvoke"""
+    last_user_message = _last_user_message(state)
+
+    if not last_user_message:
+        return {"sql_needed_or_not": False}
+
+    # The local classifier embeds the question and may read the schema vocabulary
+    local_result = await run_in_db_executor(_classify_locally, last_user_message.content)
+    if _is_confident(local_result):
+        counters.increment("classifier.local")
+        return {"sql_needed_or_not": local_result.sql_needed}
+
+    counters.increment("classifier.llm")
+    try:
+        response = await get_llm().ainvoke(_classifier_messages(last_user_message.content))
+        return _parse_llm_answer(response.content, last_user_message.content, local_result)
+    except Exception as e:
+        print(f"❌ [services/classifiers/classify_sql_needed_or_not.py:aclassify_sql_needed_or_not] Error in classification: {e}")
+        return _fallback_classification(last_user_message.content, local_result)
 
-def _fallback_classification(user_text: str) -> dict:
-    """Fallback classification based on keywords"""
+def _fallback_classification(user_text: str, local_result=None) -> dict:
+    """Fallback to the low-confidence local decision if there is one, else to keywords"""
+    if local_result is not None:
+        return {"sql_needed_or_not": local_result.sql_needed}
     user_text_lower = user_text.lower()
     sql_keywords = ['show', 'select', 'find', 'get', 'list', 'count', 'customer', 'invoice', 'employee', 'track', 'album', 'artist', 'data', 'database', 'query']
     has_sql_keywords = any(keyword in user_text_lower for keyword in sql_keywords)
-    return {"sql_needed_or_not": has_sql_keywords}
\ No newline at end of file
+    return {"sql_needed_or_not": has_sql_keywords}
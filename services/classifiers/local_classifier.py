@@ -0,0 +1,158 @@
+import json
+import os
+import re
+import threading
+import time
+from typing import List, NamedTuple, Optional, Set
+import numpy as np
+from persistence.connection_pool import get_pool
+from services.llm_connector.lexical_index import split_identifier
+from services.llm_connector.retriever import get_retriever
+
+EXAMPLES_PATH = os.getenv("LOCAL_CLASSIFIER_EXAMPLES", os.path.join("services", "classifiers", "labeled_examples.json"))
+# Below this confidence the LLM classifier is consulted
+MIN_CONFIDENCE = float(os.getenv("LOCAL_CLASSIFIER_MIN_CONFIDENCE", "0.6"))
+# Text columns with at most this many distinct short values contribute their values to the vocabulary
+MAX_DISTINCT_VALUES = int(os.getenv("LOCAL_CLASSIFIER_MAX_DISTINCT_VALUES", "300"))
+
+# Identifier parts too generic to signal a data question on their own
+_GENERIC_TOKENS = {"id", "name", "type", "line", "title", "state", "date", "code"}
+# Phrasing that usually asks for data
+_INTENT_TOKENS = {"how many", "how much", "count", "total", "average", "sum", "top", "most", "least",
+                  "list", "show", "per", "highest", "lowest", "number of", "revenue", "sales"}
+
+# Weight of the embedding model vs. schema vocabulary in the blended probability
+_EMBEDDING_WEIGHT = 0.6
+
+
+class Classification(NamedTuple):
+    sql_needed: bool
+    probability: float
+    confidence: float
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9/&']+", text.lower())
+
+
+class LocalClassifier:
+    """
+    In-process SQL-needed classifier.
+
+    Blends two signals into a probability:
+      * schema vocabulary: table, column and low-cardinality value names from the database
+      * a logistic-regression model over MiniLM embeddings of labeled example questions
+    Confidence is the distance of the probability from 0.5, scaled to [0, 1].
+    """
+
+    def __init__(self, examples_path: str = EXAMPLES_PATH):
+        self.examples_path = examples_path
+        self.identifiers: Set[str] = set()
+        self.identifier_parts: Set[str] = set()
+        self.values: Set[str] = set()
+        self._weights: Optional[np.ndarray] = None
+        self._bias = 0.0
+
+    def load_vocabulary(self):
+        """Collect table/column names and short distinct text values from every table"""
+        with get_pool().connection() as conn:
+            tables = [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%';"
+            )]
+            columns = conn.execute(
+                """SELECT m.name, p.name, p.type FROM sqlite_master AS m JOIN pragma_table_info(m.name) AS p
+                   WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%';"""
+            ).fetchall()
+
+            for table in tables:
+                self.identifiers.add(table.lower())
+                self.identifier_parts.update(split_identifier(table))
+            for table, column, column_type in columns:
+                self.identifiers.add(column.lower())
+                self.identifier_parts.update(split_identifier(column))
+                if "CHAR" not in column_type.upper() and "TEXT" not in column_type.upper():
+                    continue
+                quoted_table, quoted_column = '"' + table.replace('"', '""') + '"', '"' + column.replace('"', '""') + '"'
+                values = conn.execute(
+                    f"SELECT DISTINCT {quoted_column} FROM {quoted_table} WHERE length({quoted_column}) <= 40 LIMIT ?;",
+                    (MAX_DISTINCT_VALUES + 1,)
+                ).fetchall()
+                if len(values) <= MAX_DISTINCT_VALUES:
+                    self.values.update(str(value[0]).lower() for value in values if value[0] and len(str(value[0])) >= 3)
+
+        self.identifier_parts -= _GENERIC_TOKENS
+        self.identifier_parts = {part for part in self.identifier_parts if len(part) > 2}
+
+    def train(self, epochs: int = 300, learning_rate: float = 0.5):
+        """Fit a logistic regression on embeddings of the labeled examples"""
+        with open(self.examples_path, "r", encoding="utf-8") as f:
+            examples = json.load(f)
+        embeddings = get_retriever().get_embeddings()
+        features = np.array(embeddings.embed_documents([example["text"] for example in examples]), dtype=np.float32)
+        labels = np.array([1.0 if example["sql"] else 0.0 for example in examples], dtype=np.float32)
+
+        weights = np.zeros(features.shape[1], dtype=np.float32)
+        bias = 0.0
+        for _ in range(epochs):
+            predictions = 1.0 / (1.0 + np.exp(-(features @ weights + bias)))
+            error = predictions - labels
+            weights -= learning_rate * (features.T @ error / len(labels) + 1e-3 * weights)
+            bias -= learning_rate * float(error.mean())
+        self._weights, self._bias = weights, bias
+
+    def vocabulary_score(self, text: str) -> float:
+        """Count schema and intent matches; whole identifiers and values weigh more than word parts"""
+        words = _words(text)
+        lowered = " ".join(words)
+        singular = [word[:-1] if word.endswith("s") and len(word) > 3 else word for word in words]
+
+        score = 0.0
+        for word, stem in zip(words, singular):
+            if word in self.identifiers or stem in self.identifiers:
+                score += 1.0
+            elif word in self.identifier_parts or stem in self.identifier_parts:
+                score += 0.5
+
+        # Values may span several words ("heavy metal", "rock and roll")
+        for size in range(1, 5):
+            for i in range(len(words) - size + 1):
+                if " ".join(words[i:i + size]) in self.values:
+                    score += 1.0
+
+        score += 0.5 * sum(1 for intent in _INTENT_TOKENS if re.search(rf"\b{intent}\b", lowered))
+        return score
+
+    def classify(self, text: str) -> Classification:
+        score = self.vocabulary_score(text)
+        vocabulary_probability = 0.25 if score == 0 else min(0.5 + 0.2 * score, 0.95)
+
+        if self._weights is not None:
+            vector = np.asarray(get_retriever().get_embeddings().embed_query(text), dtype=np.float32)
+            embedding_probability = float(1.0 / (1.0 + np.exp(-(vector @ self._weights + self._bias))))
+            probability = _EMBEDDING_WEIGHT * embedding_probability + (1 - _EMBEDDING_WEIGHT) * vocabulary_probability
+        else:
+            probability = vocabulary_probability
+
+        return Classification(probability >= 0.5, probability, abs(probability - 0.5) * 2)
+
+
+_classifier: Optional[LocalClassifier] = None
+_classifier_lock = threading.Lock()
+
+
+def get_local_classifier() -> LocalClassifier:
+    """Return the process-wide local classifier, building its vocabulary and model on first use"""
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                start = time.perf_counter()
+                classifier = LocalClassifier()
+                classifier.load_vocabulary()
+                try:
+                    classifier.train()
+                except Exception as e:
+                    print(f"❌ [services/classifiers/local_classifier.py:get_local_classifier] Embedding model unavailable, using schema vocabulary only: {str(e)}")
+                _classifier = classifier
+                print(f"✅ [services/classifiers/local_classifier.py:get_local_classifier] Local classifier ready in {time.perf_counter() - start:.2f}s")
+    return _classifier
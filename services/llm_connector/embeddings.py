@@ -0,0 +1,91 @@
+import os
+from typing import List
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+# "torch" runs the model through sentence-transformers; "onnx" runs an exported copy with ONNX Runtime (no PyTorch)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+# Written by `python -m RAG.export_onnx_embeddings`
+ONNX_MODEL_DIR = os.getenv("EMBEDDING_ONNX_DIR", os.path.join("RAG", "onnx_embeddings"))
+ONNX_INT8 = os.getenv("EMBEDDING_ONNX_INT8", "true").lower() == "true"
+ONNX_THREADS = int(os.getenv("EMBEDDING_ONNX_THREADS", "0"))  # 0 lets ONNX Runtime decide
+ONNX_BATCH_SIZE = int(os.getenv("EMBEDDING_ONNX_BATCH_SIZE", "32"))
+# sentence-transformers truncates all-MiniLM-L6-v2 inputs at 256 word pieces
+MAX_SEQ_LENGTH = 256
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_INT8_MODEL_FILE = "model_int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    all-MiniLM-L6-v2 on ONNX Runtime, optionally with int8 weights.
+
+    Reproduces the sentence-transformers pipeline (word-piece tokenization,
+    attention-masked mean pooling, L2 normalization), so its vectors can be
+    searched against an index built with the PyTorch backend.
+    """
+
+    def __init__(self, model_dir: str = ONNX_MODEL_DIR, quantized: bool = ONNX_INT8,
+                 threads: int = ONNX_THREADS, batch_size: int = ONNX_BATCH_SIZE):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_path = os.path.join(model_dir, ONNX_INT8_MODEL_FILE if quantized else ONNX_MODEL_FILE)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        pad_id = self.tokenizer.token_to_id("[PAD]")
+        self.tokenizer.enable_padding(pad_id=pad_id if pad_id is not None else 0, pad_token="[PAD]")
+        self.batch_size = batch_size
+        self.quantized = quantized
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask,
+                 "token_type_ids": np.array([encoding.type_ids for encoding in encodings], dtype=np.int64)}
+        hidden = self.session.run(None, {name: value for name, value in feeds.items() if name in self.input_names})[0]
+
+        # Mean over real tokens only, then unit length (the model's Pooling + Normalize modules)
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = [self._embed(texts[i:i + self.batch_size]) for i in range(0, len(texts), self.batch_size)]
+        return np.concatenate(vectors).tolist() if vectors else []
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0].tolist()
+
+
+def load_embeddings(backend: str = None) -> Embeddings:
+    """
+    Build the embedding model for the configured backend. An ONNX backend
+    that cannot be loaded (onnxruntime missing, model not exported) falls
+    back to PyTorch.
+    """
+    backend = (backend or EMBEDDING_BACKEND).lower()
+    if backend == "onnx":
+        try:
+            embeddings = OnnxEmbeddings()
+            print(f"✅ [services/llm_connector/embeddings.py:load_embeddings] ONNX Runtime embeddings ({'int8' if embeddings.quantized else 'fp32'}) from {ONNX_MODEL_DIR}")
+            return embeddings
+        except Exception as e:
+            print(f"❌ [services/llm_connector/embeddings.py:load_embeddings] ONNX embeddings unavailable, using PyTorch: {str(e)}")
+            print("Export the model with: python -m RAG.export_onnx_embeddings (requires onnxruntime)")
+    elif backend != "torch":
+        raise ValueError(f"Unknown embedding backend: {backend}")
+
+    from langchain_huggingface.embeddings import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
@@ -0,0 +1,242 @@
+import json
+import mmap
+import os
+import tempfile
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+# "flat" is exact search; "hnsw" is a graph index (fast, ~1.1x the flat size);
+# "ivfpq" clusters and product-quantizes the vectors (PQ_M bytes per vector at 8 bits)
+INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat").lower()
+INDEX_TYPES = ("flat", "hnsw", "ivfpq")
+HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("FAISS_HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("FAISS_HNSW_EF_SEARCH", "64"))
+IVF_NLIST = int(os.getenv("FAISS_IVF_NLIST", "0"))  # 0 picks ~4 * sqrt(vectors)
+IVF_NPROBE = int(os.getenv("FAISS_IVF_NPROBE", "8"))
+PQ_M = int(os.getenv("FAISS_PQ_M", "16"))  # must divide the embedding dimension
+PQ_NBITS = int(os.getenv("FAISS_PQ_NBITS", "8"))
+# Map the index file read-only instead of reading it onto the heap
+MMAP = os.getenv("FAISS_MMAP", "true").lower() == "true"
+
+# Store layout: the FAISS index, one JSON document per line, the byte offset of
+# every line (n + 1 uint64) and a manifest that is written last
+STORE_MANIFEST = "store.json"
+VECTORS_FILE = "vectors.faiss"
+DOCS_FILE = "docs.jsonl"
+OFFSETS_FILE = "docs.offsets.npy"
+STORE_FILES = (STORE_MANIFEST, VECTORS_FILE, DOCS_FILE, OFFSETS_FILE)
+STORE_FORMAT = 1
+# Written by langchain's FAISS.save_local (pickled docstore)
+LEGACY_FILES = ("index.faiss", "index.pkl")
+# Each build goes to its own store-* subdirectory; CURRENT names the live one and is swapped atomically
+CURRENT_FILE = "CURRENT"
+VERSION_PREFIX = "store-"
+
+
+def build_index(vectors: np.ndarray, index_type: str = INDEX_TYPE) -> Tuple[object, Dict]:
+    """
+    Build and fill an L2 index of the given type. Returns the index and the
+    parameters it was built with. IVF-PQ needs enough vectors to train its
+    codebooks; with fewer it falls back to a flat index.
+    """
+    import faiss
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    count, dim = vectors.shape
+    index_type = index_type.lower()
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS index type: {index_type}")
+
+    if index_type == "ivfpq":
+        nlist = IVF_NLIST or max(1, int(4 * np.sqrt(count)))
+        if dim % PQ_M:
+            raise ValueError(f"FAISS_PQ_M={PQ_M} does not divide the embedding dimension {dim}")
+        if count < max(nlist, 2 ** PQ_NBITS):
+            print(f"❌ [services/llm_connector/index_store.py:build_index] {count} vectors are too few to train IVF-PQ "
+                  f"(needs {max(nlist, 2 ** PQ_NBITS)}), building a flat index")
+            index_type = "flat"
+
+    if index_type == "flat":
+        index, params = faiss.IndexFlatL2(dim), {}
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        params = {"m": HNSW_M, "ef_construction": HNSW_EF_CONSTRUCTION}
+    else:
+        index = faiss.IndexIVFPQ(faiss.IndexFlatL2(dim), dim, nlist, PQ_M, PQ_NBITS)
+        index.train(vectors)
+        params = {"nlist": nlist, "pq_m": PQ_M, "pq_nbits": PQ_NBITS}
+
+    index.add(vectors)
+    return index, {"index_type": index_type, **params}
+
+
+def write_store(path: str, index, documents: Sequence[Tuple[str, Document]], info: Optional[Dict] = None):
+    """Write an index and its (id, document) pairs, in index order, as a store"""
+    import faiss
+
+    os.makedirs(path, exist_ok=True)
+    faiss.write_index(index, os.path.join(path, VECTORS_FILE))
+    offsets = [0]
+    with open(os.path.join(path, DOCS_FILE), "wb") as f:
+        for doc_id, doc in documents:
+            line = json.dumps({"id": doc_id, "page_content": doc.page_content, "metadata": doc.metadata},
+                              ensure_ascii=False).encode("utf-8") + b"\n"
+            f.write(line)
+            offsets.append(offsets[-1] + len(line))
+    np.save(os.path.join(path, OFFSETS_FILE), np.asarray(offsets, dtype=np.uint64))
+    with open(os.path.join(path, STORE_MANIFEST), "w", encoding="utf-8") as f:
+        json.dump({"format": STORE_FORMAT, "count": index.ntotal, "dim": index.d, **(info or {})}, f, indent=2)
+
+
+def store_path(path: str) -> str:
+    """Directory of the live store under path: the build CURRENT names, else path itself"""
+    try:
+        with open(os.path.join(path, CURRENT_FILE), "r", encoding="utf-8") as f:
+            return os.path.join(path, f.read().strip())
+    except FileNotFoundError:
+        return path
+
+
+def publish_store(path: str, version: str):
+    """Point CURRENT at a finished build in one atomic rename"""
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{CURRENT_FILE}_", dir=path)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(tmp_path, os.path.join(path, CURRENT_FILE))
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def is_store(path: str) -> bool:
+    return os.path.exists(os.path.join(store_path(path), STORE_MANIFEST))
+
+
+def read_index(index_file: str, use_mmap: bool = MMAP):
+    """
+    Read a FAISS index, memory-mapping its vectors/codes read-only when
+    possible so the page cache is shared between processes. Falls back to a
+    plain read for index types or builds that cannot be mapped.
+    """
+    import faiss
+
+    if use_mmap:
+        flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+        try:
+            return faiss.read_index(index_file, flags)
+        except RuntimeError as e:
+            print(f"❌ [services/llm_connector/index_store.py:read_index] mmap load failed, reading into memory: {str(e)}")
+    return faiss.read_index(index_file)
+
+
+class DocumentFile:
+    """Documents of a store, read on demand from the memory-mapped docs.jsonl"""
+
+    def __init__(self, path: str):
+        self.offsets = np.load(os.path.join(path, OFFSETS_FILE), mmap_mode="r")
+        self._file = open(os.path.join(path, DOCS_FILE), "rb")
+        # mmap cannot map an empty file
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if len(self) else b""
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def record(self, position: int) -> Dict:
+        start, end = int(self.offsets[position]), int(self.offsets[position + 1])
+        return json.loads(self._data[start:end])
+
+    def get(self, position: int) -> Document:
+        record = self.record(position)
+        return Document(page_content=record["page_content"], metadata=record["metadata"], id=record["id"])
+
+    def __iter__(self) -> Iterator[Document]:
+        for position in range(len(self)):
+            yield self.get(position)
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+
+class MmapVectorStore:
+    """
+    Read side of a store: the FAISS index mapped read-only and documents
+    decoded only for the hits of each search. Exposes the search methods of
+    langchain's FAISS vectorstore that the app uses.
+    """
+
+    def __init__(self, path: str, embeddings: Embeddings, use_mmap: bool = MMAP):
+        with open(os.path.join(path, STORE_MANIFEST), "r", encoding="utf-8") as f:
+            self.info = json.load(f)
+        if self.info.get("format") != STORE_FORMAT:
+            raise ValueError(f"Unsupported index store format: {self.info.get('format')}")
+        self.embeddings = embeddings
+        self.index = read_index(os.path.join(path, VECTORS_FILE), use_mmap)
+        self.documents = DocumentFile(path)
+        if self.index.ntotal != len(self.documents):
+            raise ValueError(f"Index has {self.index.ntotal} vectors but the store has {len(self.documents)} documents")
+        self._set_search_params()
+
+    def _set_search_params(self):
+        index_type = self.info.get("index_type")
+        if index_type == "hnsw":
+            self.index.hnsw.efSearch = HNSW_EF_SEARCH
+        elif index_type == "ivfpq":
+            self.index.nprobe = IVF_NPROBE
+
+    @property
+    def ntotal(self) -> int:
+        return self.index.ntotal
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4) -> List[Tuple[Document, float]]:
+        query = np.asarray([embedding], dtype=np.float32)
+        distances, positions = self.index.search(query, min(k, self.ntotal))
+        return [(self.documents.get(int(position)), float(distance))
+                for position, distance in zip(positions[0], distances[0]) if position >= 0]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embeddings.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4) -> List[Document]:
+        return self.similarity_search_by_vector(self.embeddings.embed_query(query), k)
+
+    def close(self):
+        self.documents.close()
+
+
+def load_vectorstore(path: str, embeddings: Embeddings):
+    """Open the live store under path, or a legacy langchain FAISS index (pickled docstore)"""
+    if is_store(path):
+        return MmapVectorStore(store_path(path), embeddings)
+    from langchain_community.vectorstores import FAISS
+    return FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+
+
+def index_files(path: str) -> Tuple[str, ...]:
+    """Files whose changes mean the index at path was rebuilt (a published build never changes)"""
+    if os.path.exists(os.path.join(path, CURRENT_FILE)):
+        return (CURRENT_FILE,)
+    return STORE_FILES if is_store(path) else LEGACY_FILES
+
+
+def document_at(vectorstore, position: int) -> Document:
+    """The document at an index position, decoding only that one for a store"""
+    if isinstance(vectorstore, MmapVectorStore):
+        return vectorstore.documents.get(position)
+    return vectorstore.docstore.search(vectorstore.index_to_docstore_id[position])
+
+
+def iter_documents(vectorstore) -> Iterator[Document]:
+    """Every document of a store or a legacy FAISS vectorstore, in index order"""
+    if isinstance(vectorstore, MmapVectorStore):
+        return iter(vectorstore.documents)
+    return (document_at(vectorstore, position) for position in range(len(vectorstore.index_to_docstore_id)))
@@ -0,0 +1,91 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Hashable, Iterable, List, Sequence, Tuple
+import numpy as np
+
+# BM25 term-frequency saturation and document-length normalization
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_STOPWORDS = {
+    "a", "about", "all", "an", "and", "are", "as", "at", "be", "by", "can", "did", "do", "does", "each", "find",
+    "for", "from", "get", "give", "has", "have", "how", "i", "in", "is", "it", "list", "many", "me", "much", "of",
+    "on", "or", "our", "per", "please", "show", "that", "the", "their", "there", "this", "to", "was", "we", "were",
+    "what", "which", "who", "with", "you", "your",
+}
+
+
+def split_identifier(identifier: str) -> List[str]:
+    """Split CamelCase / snake_case identifiers into lowercase words"""
+    return [part.lower() for part in re.findall(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+", identifier)]
+
+
+def _stem(word: str) -> str:
+    """Fold plurals so "invoices" matches "Invoice" and "countries" matches "Country" """
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase word tokens with stopwords dropped. An identifier such as
+    "InvoiceLine" yields the whole name plus its parts ("invoiceline",
+    "invoice", "line"), so literal and spelled-out mentions both match.
+    """
+    tokens = []
+    for word in re.findall(r"[A-Za-z0-9]+", text):
+        parts = split_identifier(word)
+        if len(parts) > 1:
+            tokens.append(_stem(word.lower()))
+        tokens.extend(_stem(part) for part in parts if part not in _STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of texts, kept as an inverted index in memory"""
+
+    def __init__(self, texts: Iterable[str], k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        lengths = []
+        for position, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, frequency in counts.items():
+                self.postings[term].append((position, frequency))
+        self.lengths = np.asarray(lengths, dtype=np.float32)
+        self.average_length = float(self.lengths.mean()) if len(lengths) else 0.0
+        self.idf = {term: math.log(1 + (len(lengths) - len(docs) + 0.5) / (len(docs) + 0.5))
+                    for term, docs in self.postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[int, float]]:
+        """(position, score) of the k best-scoring texts that share a term with the query"""
+        scores = np.zeros(len(self), dtype=np.float32)
+        norms = self.k1 * (1 - self.b + self.b * self.lengths / max(self.average_length, 1e-9))
+        for term in set(tokenize(query)):
+            for position, frequency in self.postings.get(term, ()):
+                scores[position] += self.idf[term] * frequency * (self.k1 + 1) / (frequency + norms[position])
+        matched = np.flatnonzero(scores)
+        top = matched[np.argsort(-scores[matched], kind="stable")[:k]]
+        return [(int(position), float(scores[position])) for position in top]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Hashable]], k: int = 60) -> List[Tuple[Hashable, float]]:
+    """
+    Merge ranked lists: each item scores sum(1 / (k + rank)) over the lists
+    that contain it. Items in several lists rise above items ranked high in
+    only one; k damps the weight of the very top ranks.
+    """
+    scores: Dict[Hashable, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
@@ -1,8 +1,7 @@
 import os
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_community.vectorstores import FAISS
-from langchain_huggingface.embeddings import HuggingFaceEmbeddings
+import threading
 from config.config import set_env_variables
+from services.llm_connector.retriever import get_retriever
 
 # Set environment variables (e.g. GOOGLE_API_KEY)
 set_env_variables()
@@ -14,7 +13,9 @@ def load_llm():
         api_key = os.getenv("GOOGLE_API_KEY")
         if not api_key:
             raise ValueError("GOOGLE_API_KEY not found in environment variables. Please set it before running the application.")
-        
+
+        # The Gemini client pulls in the google-ai SDK; import it only when the LLM is built
+        from langchain_google_genai import ChatGoogleGenerativeAI
         return ChatGoogleGenerativeAI(
             model="gemini-1.5-pro",
             google_api_key=api_key,
@@ -32,10 +33,9 @@ def load_llm():
         raise
 
 def load_vectorstore():
-    """Load FAISS vectorstore for RAG"""
+    """Return the process-wide FAISS vectorstore for RAG (loaded once, reloaded on reindex)"""
     try:
-        embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-        return FAISS.load_local("RAG/faiss_index", embedding_model, allow_dangerous_deserialization=True)
+        return get_retriever().get_vectorstore()
     except Exception as e:
         print(f"❌ [services/llm_connector/llm_connector.py:load_vectorstore] Error loading vectorstore: {str(e)}")
         print("Make sure the RAG/faiss_index directory exists and contains the index files.")
@@ -44,15 +44,49 @@ def load_vectorstore():
 def retrieve_context(query: str, k: int = 3) -> str:
     """Perform semantic search over the vectorstore"""
     try:
-        vectorstore = load_vectorstore()
-        docs = vectorstore.similarity_search(query, k=k)
+        docs = get_retriever().similarity_search(query, k=k)
         return "\n\n".join([doc.page_content for doc in docs])
     except Exception as e:
         print(f"❌ [services/llm_connector/llm_connector.py:retrieve_context] Error retrieving context: {str(e)}")
         return ""
 
-# Initialize LLM only if API key is available
-try:
-    llm = load_llm()
-except Exception:
-    llm = None
+def retrieve_schema_context(query: str, max_tables: int = 4) -> str:
+    """Return whole table definitions (plus matching business rules) for the tables a question needs"""
+    try:
+        retriever = get_retriever()
+        if not retriever.has_schema_units():
+            return retrieve_context(query)
+
+        table_docs, rule_docs = retriever.schema_search(query, max_tables=max_tables)
+        sections = [doc.page_content for doc in table_docs]
+        if rule_docs:
+            sections.append("Relevant business rules and examples:\n" + "\n\n".join(doc.page_content for doc in rule_docs))
+        return "\n\n".join(sections)
+    except Exception as e:
+        print(f"❌ [services/llm_connector/llm_connector.py:retrieve_schema_context] Error retrieving schema context: {str(e)}")
+        return ""
+
+_llm = None
+_llm_loaded = False
+_llm_lock = threading.Lock()
+
+def get_llm():
+    """Return the process-wide LLM client, built on first use; None if it cannot be initialized"""
+    global _llm, _llm_loaded
+    if not _llm_loaded:
+        with _llm_lock:
+            if not _llm_loaded:
+                # Initialize LLM only if API key is available
+                try:
+                    _llm = load_llm()
+                except Exception:
+                    _llm = None
+                _llm_loaded = True
+    return _llm
+
+def set_llm(llm):
+    """Replace the process-wide LLM client (e.g. with a fake model for offline benchmarks)"""
+    global _llm, _llm_loaded
+    with _llm_lock:
+        _llm = llm
+        _llm_loaded = True
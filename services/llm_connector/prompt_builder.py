@@ -0,0 +1,113 @@
+import os
+from typing import List, Optional, Tuple
+from langchain_core.messages import BaseMessage
+from memory.tokens import count_tokens, truncate_to_tokens
+from models.sql_result import SQLResult
+from utils.metrics import counters
+
+# Token budget of each prompt section
+SCHEMA_TOKENS = int(os.getenv("PROMPT_SCHEMA_TOKENS", "3000"))
+SQL_RESULT_TOKENS = int(os.getenv("PROMPT_SQL_RESULT_TOKENS", "2000"))
+HISTORY_TOKENS = int(os.getenv("PROMPT_HISTORY_TOKENS", "2000"))
+# Rows shown at each end of a SQL result that had to be summarized
+RESULT_EDGE_ROWS = int(os.getenv("PROMPT_RESULT_EDGE_ROWS", "5"))
+# Most frequent values listed per text column in a result summary
+RESULT_TOP_VALUES = int(os.getenv("PROMPT_RESULT_TOP_VALUES", "3"))
+
+_TRUNCATED_NOTE = "\n[... cut to fit the prompt budget]"
+
+
+def fit_text(text: str, budget: int) -> str:
+    """text unchanged if it fits in budget tokens, otherwise its start plus a note"""
+    if count_tokens(text) <= budget:
+        return text
+    return truncate_to_tokens(text, max(budget - count_tokens(_TRUNCATED_NOTE), 0)) + _TRUNCATED_NOTE
+
+
+def fit_sections(text: str, budget: int, separator: str = "\n\n") -> str:
+    """
+    Keep whole leading sections (e.g. retrieved schema units, most relevant
+    first) while they fit; only the first section is ever cut mid-way.
+    """
+    if count_tokens(text) <= budget:
+        return text
+    sections = text.split(separator)
+    kept, used = [], 0
+    for section in sections:
+        tokens = count_tokens(section + separator)
+        if used + tokens > budget:
+            break
+        kept.append(section)
+        used += tokens
+    if not kept:
+        return fit_text(sections[0], budget)
+    print(f"✂️ Kept {len(kept)} of {len(sections)} context sections within {budget} tokens")
+    return separator.join(kept)
+
+
+def fit_sql_result(result: Optional[SQLResult], fallback: str = "", budget: int = SQL_RESULT_TOKENS) -> str:
+    """
+    The SQL result rendered as a table if it fits; otherwise head/tail rows
+    plus per-column summaries, with fewer edge rows until it fits. Without a
+    result (e.g. the query failed) the fallback text is used.
+    """
+    if result is None:
+        return fit_text(fallback, budget)
+    # Rendered here, for the prompt, rather than when the query ran
+    text = result.to_text()
+    if count_tokens(text) <= budget or not result.columns:
+        return fit_text(text, budget)
+
+    edge_rows = RESULT_EDGE_ROWS
+    while True:
+        summary = result.to_summary_text(edge_rows, edge_rows, RESULT_TOP_VALUES)
+        if count_tokens(summary) <= budget or edge_rows == 0:
+            break
+        edge_rows //= 2
+    print(f"✂️ SQL result ({result.row_count} rows) summarized to fit {budget} tokens")
+    counters.increment("prompt.sql_results_summarized")
+    return fit_text(summary, budget)
+
+
+def fit_history(messages: List[BaseMessage], budget: int = HISTORY_TOKENS) -> List[BaseMessage]:
+    """Most recent (user, assistant) pairs whose content fits in budget tokens"""
+    kept: List[BaseMessage] = []
+    used = 0
+    for start in range(len(messages) - 2, -1, -2):
+        pair = messages[start:start + 2]
+        tokens = sum(count_tokens(msg.content) for msg in pair)
+        if used + tokens > budget:
+            break
+        kept[:0] = pair
+        used += tokens
+    return kept
+
+
+class PromptBuilder:
+    """
+    Collects the sections of one prompt, each fitted to its own token budget,
+    and logs how many tokens every section ended up using.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.sections: List[Tuple[str, int]] = []
+
+    def add(self, section: str, text: str) -> str:
+        """Record an already fitted section and return it"""
+        self.sections.append((section, count_tokens(text)))
+        return text
+
+    def add_messages(self, section: str, messages: List[BaseMessage]) -> List[BaseMessage]:
+        self.sections.append((section, sum(count_tokens(msg.content) for msg in messages)))
+        return messages
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(tokens for _, tokens in self.sections)
+
+    def log(self):
+        breakdown = ", ".join(f"{section}={tokens}" for section, tokens in self.sections)
+        print(f"🧮 Prompt tokens [{self.name}]: {self.total_tokens} ({breakdown})")
+        counters.increment(f"prompt.{self.name}.prompts")
+        counters.increment(f"prompt.{self.name}.tokens", self.total_tokens)
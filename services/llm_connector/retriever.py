@@ -0,0 +1,249 @@
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+from services.llm_connector.embeddings import load_embeddings
+from services.llm_connector.index_store import document_at, index_files, iter_documents, load_vectorstore
+from services.llm_connector.lexical_index import BM25Index, reciprocal_rank_fusion
+
+# FAISS and the embedding stack are imported on first load, not at import time
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+INDEX_PATH = os.getenv("FAISS_INDEX_PATH", "RAG/faiss_index")
+
+# How often (in seconds) a query may stat the index files to look for a reindex
+RELOAD_CHECK_INTERVAL = float(os.getenv("RETRIEVER_RELOAD_CHECK_SECONDS", "5"))
+# "hybrid" fuses BM25 and FAISS rankings; "vector" and "lexical" use one of them.
+# Hybrid answers lexically until the embedding model has finished loading.
+RETRIEVER_MODE = os.getenv("RETRIEVER_MODE", "hybrid").lower()
+# Candidates each ranker contributes before fusion
+CANDIDATES = int(os.getenv("RETRIEVER_CANDIDATES", "20"))
+# Reciprocal rank fusion constant: larger values flatten the gap between ranks
+RRF_K = int(os.getenv("RETRIEVER_RRF_K", "60"))
+# Ranked schema documents looked at to pick tables
+SCHEMA_FETCH_K = int(os.getenv("RETRIEVER_SCHEMA_FETCH_K", "8"))
+
+
+class IndexSnapshot(NamedTuple):
+    """A loaded vectorstore, its table documents and the BM25 index of all its documents (by index position)"""
+    vectorstore: "FAISS"
+    table_docs: Dict[str, object]
+    lexical: BM25Index
+
+
+def _build_snapshot(vectorstore: "FAISS") -> IndexSnapshot:
+    # Documents are streamed once into the BM25 postings and not kept: search hits
+    # are decoded from the store by position, like vector hits
+    table_docs = {}
+
+    def texts():
+        for doc in iter_documents(vectorstore):
+            # Map table name -> full table definition for schema-mode indexes
+            if doc.metadata.get("kind") == "table":
+                table_docs[doc.metadata["table"]] = doc
+            yield doc.page_content
+
+    lexical = BM25Index(texts())
+    return IndexSnapshot(vectorstore, table_docs, lexical)
+
+
+def _doc_key(doc) -> str:
+    return doc.id or doc.page_content
+
+
+class _QueryEmbeddings(Embeddings):
+    """Hands the vectorstore the service's embedding model, loaded only when a vector search needs it"""
+
+    def __init__(self, service: "RetrieverService"):
+        self.service = service
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.service.get_embeddings().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.service.get_embeddings().embed_query(text)
+
+
+class RetrieverService:
+    """
+    Keeps the embedding model and FAISS index resident for the whole process.
+
+    Queries read the current snapshot reference without locking. When the
+    index files on disk change, a fresh snapshot is loaded on the side and
+    swapped in with a single reference assignment, so in-flight queries keep
+    using the old index and new queries see the new one.
+    """
+
+    def __init__(self, index_path: str = INDEX_PATH, check_interval: float = RELOAD_CHECK_INTERVAL,
+                 mode: str = RETRIEVER_MODE):
+        if mode not in ("hybrid", "vector", "lexical"):
+            raise ValueError(f"Unknown retriever mode: {mode}")
+        self.index_path = index_path
+        self.check_interval = check_interval
+        self.mode = mode
+        self._embeddings = None
+        self._embeddings_loading = False
+        self._snapshot: Optional[IndexSnapshot] = None
+        self._signature = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        # Separate so a slow model load never holds up index reloads or lexical searches
+        self._embeddings_lock = threading.Lock()
+
+    def _index_signature(self) -> Optional[Tuple]:
+        """Return the (mtime, size) of every index file, or None if any is missing"""
+        signature = []
+        for name in index_files(self.index_path):
+            try:
+                stat = os.stat(os.path.join(self.index_path, name))
+            except FileNotFoundError:
+                return None
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def get_embeddings(self) -> Embeddings:
+        """Return the shared embedding model (EMBEDDING_BACKEND), loading it on first use"""
+        if self._embeddings is None:
+            with self._embeddings_lock:
+                if self._embeddings is None:
+                    self._embeddings = load_embeddings()
+        return self._embeddings
+
+    def _load_embeddings_in_background(self):
+        try:
+            self.get_embeddings()
+        except Exception as e:
+            print(f"❌ [services/llm_connector/retriever.py:RetrieverService._load_embeddings_in_background] Embedding model failed to load: {str(e)}")
+        finally:
+            self._embeddings_loading = False
+
+    def _embeddings_ready(self) -> bool:
+        """True once the embedding model is loaded; otherwise start loading it in the background"""
+        if self._embeddings is not None:
+            return True
+        # Never wait on the loader: a second thread started by a race just finds the model loaded
+        if not self._embeddings_loading:
+            self._embeddings_loading = True
+            threading.Thread(target=self._load_embeddings_in_background, name="embedding-loader", daemon=True).start()
+        return False
+
+    def get_snapshot(self) -> IndexSnapshot:
+        """Return the current snapshot, reloading it if the index changed on disk"""
+        snapshot = self._snapshot
+        if snapshot is None or time.monotonic() - self._last_check >= self.check_interval:
+            snapshot = self._refresh()
+        return snapshot
+
+    def get_vectorstore(self) -> "FAISS":
+        """Return the current vectorstore, reloading it if the index changed on disk"""
+        return self.get_snapshot().vectorstore
+
+    def _refresh(self) -> IndexSnapshot:
+        """Load the index if it is missing or stale and swap it in"""
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            if self._snapshot is not None and time.monotonic() - self._last_check < self.check_interval:
+                return self._snapshot
+
+            signature = self._index_signature()
+            if self._snapshot is not None and signature == self._signature:
+                self._last_check = time.monotonic()
+                return self._snapshot
+
+            try:
+                start = time.perf_counter()
+                vectorstore = load_vectorstore(self.index_path, _QueryEmbeddings(self))
+                snapshot = _build_snapshot(vectorstore)
+                # A reindex that landed mid-load is picked up on the next check
+                if self._index_signature() != signature:
+                    signature = None
+            except Exception as e:
+                if self._snapshot is None:
+                    raise
+                print(f"❌ [services/llm_connector/retriever.py:RetrieverService._refresh] Keeping previous index, reload failed: {str(e)}")
+                self._last_check = time.monotonic()
+                return self._snapshot
+
+            action = "Reloaded" if self._snapshot is not None else "Loaded"
+            self._snapshot = snapshot
+            self._signature = signature
+            self._last_check = time.monotonic()
+            print(f"✅ [services/llm_connector/retriever.py:RetrieverService._refresh] {action} FAISS index in {time.perf_counter() - start:.2f}s")
+            return snapshot
+
+    def reload(self) -> "FAISS":
+        """Force an immediate re-check of the index files"""
+        self._last_check = 0.0
+        return self.get_vectorstore()
+
+    def _search(self, snapshot: IndexSnapshot, query: str, k: int) -> List:
+        """
+        Top k documents for the query. Hybrid mode fuses the BM25 and FAISS
+        candidate lists with reciprocal rank fusion, so documents naming a
+        table or column literally are not outranked by loosely related prose.
+        """
+        lexical = [document_at(snapshot.vectorstore, position)
+                   for position, _ in snapshot.lexical.search(query, max(k, CANDIDATES))]
+        if self.mode == "lexical" or (self.mode == "hybrid" and not self._embeddings_ready()):
+            return lexical[:k]
+
+        vector = snapshot.vectorstore.similarity_search(query, k=max(k, CANDIDATES) if self.mode == "hybrid" else k)
+        if self.mode == "vector":
+            return vector
+
+        docs = {}
+        for doc in vector + lexical:
+            docs.setdefault(_doc_key(doc), doc)
+        fused = reciprocal_rank_fusion([[_doc_key(doc) for doc in vector], [_doc_key(doc) for doc in lexical]], RRF_K)
+        return [docs[key] for key, _ in fused[:k]]
+
+    def similarity_search(self, query: str, k: int = 3) -> List:
+        """Thread-safe search over the resident index (hybrid, vector or lexical per RETRIEVER_MODE)"""
+        return self._search(self.get_snapshot(), query, k)
+
+    def has_schema_units(self) -> bool:
+        """True when the index was built with schema-native documents"""
+        return bool(self.get_snapshot().table_docs)
+
+    def schema_search(self, query: str, max_tables: int = 4, fetch_k: int = SCHEMA_FETCH_K, max_rules: int = 2) -> Tuple[List, List]:
+        """
+        Rank tables by their best-matching table or column document, then fill
+        the remaining slots with tables named by matching rules, and return
+        (whole table definitions, matching rule/example documents).
+        """
+        snapshot = self.get_snapshot()
+        hits = self._search(snapshot, query, fetch_k)
+
+        matched, mentioned, rules = [], [], []
+        for doc in hits:
+            kind = doc.metadata.get("kind")
+            if kind in ("table", "column"):
+                matched.append(doc.metadata["table"])
+            else:
+                mentioned.extend(name for name in doc.metadata.get("tables", "").split(",") if name)
+                if len(rules) < max_rules:
+                    rules.append(doc)
+
+        tables = []
+        for name in matched + mentioned:
+            if name not in tables and name in snapshot.table_docs:
+                tables.append(name)
+
+        table_docs = [snapshot.table_docs[name] for name in tables[:max_tables]]
+        return table_docs, rules
+
+
+_retriever: Optional[RetrieverService] = None
+_retriever_lock = threading.Lock()
+
+
+def get_retriever() -> RetrieverService:
+    """Return the process-wide retriever service"""
+    global _retriever
+    if _retriever is None:
+        with _retriever_lock:
+            if _retriever is None:
+                _retriever = RetrieverService()
+    return _retriever
@@ -0,0 +1,182 @@
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from persistence.connection_pool import get_pool, close_pool, shutdown_executor
+
+# "sqlite" survives restarts and can be shared by workers on one host; "memory" is per process
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "sqlite").lower()
+# "eager" builds every resource in startup(); "lazy" builds (and imports) each one on first use
+STARTUP_MODE = os.getenv("RUNTIME_STARTUP", "eager").lower()
+
+
+class Runtime:
+    """
+    Process-wide registry of the heavy resources: the LLM client, the resident
+    retriever, the SQLite connection pool, the session checkpointer and the
+    compiled workflow.
+
+    Each resource is built exactly once, on startup() or on first access, and
+    shared by the CLI, every Streamlit session and the HTTP server. startup()
+    and shutdown() report how long each resource took.
+    """
+
+    RESOURCES = ("llm", "retriever", "db_pool", "checkpointer", "graph")
+
+    def __init__(self):
+        self._resources: Dict[str, Any] = {}
+        self.timings: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self.started = False
+        self._lock = threading.RLock()
+
+    # Builders import their modules themselves, so a lazy startup never loads
+    # langgraph, the Gemini SDK or the embedding stack before they are needed
+
+    def _build_llm(self):
+        from services.llm_connector.llm_connector import get_llm
+        llm = get_llm()
+        if llm is None:
+            self.errors["llm"] = "LLM could not be initialized (check GOOGLE_API_KEY)"
+        return llm
+
+    def _build_retriever(self):
+        from services.llm_connector.retriever import get_retriever
+        retriever = get_retriever()
+        # Load the FAISS index and embedding model now rather than on the first question
+        retriever.get_snapshot()
+        retriever.get_embeddings()
+        return retriever
+
+    def _build_db_pool(self):
+        pool = get_pool()
+        # Open one warm connection up front
+        with pool.connection() as conn:
+            conn.execute("SELECT 1;").fetchone()
+        return pool
+
+    def _build_checkpointer(self):
+        if CHECKPOINT_BACKEND == "memory":
+            from langgraph.checkpoint.memory import InMemorySaver
+            return InMemorySaver()
+        from persistence.checkpointer import get_checkpointer
+        return get_checkpointer()
+
+    def _build_graph(self):
+        from graph.graph import graph
+        return graph(checkpointer=self.checkpointer)
+
+    def _get(self, name: str):
+        if name in self._resources:
+            return self._resources[name]
+        with self._lock:
+            if name not in self._resources:
+                builder: Callable[[], Any] = getattr(self, f"_build_{name}")
+                start = time.perf_counter()
+                try:
+                    self._resources[name] = builder()
+                    if name != "llm":
+                        self.errors.pop(name, None)
+                except Exception as e:
+                    self.errors[name] = str(e)
+                    raise
+                finally:
+                    self.timings[name] = time.perf_counter() - start
+        return self._resources[name]
+
+    @property
+    def llm(self):
+        return self._get("llm")
+
+    @property
+    def retriever(self):
+        return self._get("retriever")
+
+    @property
+    def db_pool(self):
+        return self._get("db_pool")
+
+    @property
+    def checkpointer(self):
+        return self._get("checkpointer")
+
+    @property
+    def graph(self):
+        return self._get("graph")
+
+    def startup(self, mode: Optional[str] = None) -> Dict[str, float]:
+        """
+        Build every resource once; failures are logged and retried on first
+        access. In lazy mode nothing is built here and each resource is built
+        on first access instead.
+        """
+        with self._lock:
+            if self.started:
+                return self.timings
+            if (mode or STARTUP_MODE) == "lazy":
+                self.started = True
+                print("🚀 Runtime started lazily; resources are built on first use")
+                return self.timings
+            total = time.perf_counter()
+            for name in self.RESOURCES:
+                try:
+                    self._get(name)
+                except Exception:
+                    pass
+                if name in self.errors:
+                    print(f"❌ [services/runtime/runtime.py:Runtime.startup] {name} unavailable after {self.timings[name]:.2f}s: {self.errors[name]}")
+                else:
+                    print(f"✅ [services/runtime/runtime.py:Runtime.startup] {name} ready in {self.timings[name]:.2f}s")
+            self.timings["total"] = time.perf_counter() - total
+            self.started = True
+            print(f"🚀 Runtime started in {self.timings['total']:.2f}s")
+            return self.timings
+
+    def shutdown(self) -> Dict[str, float]:
+        """Release pooled connections, the checkpoint database and worker threads"""
+        timings: Dict[str, float] = {}
+        releases = [("db_pool", close_pool)]
+        # Only close the checkpoint database if something opened it
+        if "persistence.checkpointer" in sys.modules:
+            releases.append(("checkpointer", sys.modules["persistence.checkpointer"].close_checkpointer))
+        releases.append(("executor", shutdown_executor))
+        with self._lock:
+            for name, release in releases:
+                start = time.perf_counter()
+                try:
+                    release()
+                except Exception as e:
+                    print(f"❌ [services/runtime/runtime.py:Runtime.shutdown] Error releasing {name}: {str(e)}")
+                timings[name] = time.perf_counter() - start
+            # The compiled graph holds the closed checkpointer, so both are rebuilt on next use
+            for name in ("db_pool", "checkpointer", "graph"):
+                self._resources.pop(name, None)
+            self.started = False
+        print(f"👋 Runtime shut down in {sum(timings.values()):.2f}s")
+        return timings
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Readiness and build time per resource"""
+        return {
+            name: {
+                "ready": name in self._resources and self._resources[name] is not None,
+                "seconds": self.timings.get(name),
+                "error": self.errors.get(name),
+            }
+            for name in self.RESOURCES
+        }
+
+
+_runtime: Optional[Runtime] = None
+_runtime_lock = threading.Lock()
+
+
+def get_runtime() -> Runtime:
+    """Return the process-wide runtime registry"""
+    global _runtime
+    if _runtime is None:
+        with _runtime_lock:
+            if _runtime is None:
+                _runtime = Runtime()
+    return _runtime
@@ -0,0 +1,303 @@
+import argparse
+import math
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+from models.query_plan import GuardDecision
+from models.sql_result import MAX_ROWS
+from persistence.connection_pool import DB_PATH
+from services.sql.result_cache import database_version
+from utils.metrics import counters
+
+GUARD_ENABLED = os.getenv("SQL_GUARD_ENABLED", "true").lower() == "true"
+# Estimated row visits a query may cost before SQL_GUARD_POLICY applies
+MAX_COST = float(os.getenv("SQL_GUARD_MAX_COST", "5000000"))
+# Above this a query is rejected whatever the policy
+REJECT_COST = float(os.getenv("SQL_GUARD_REJECT_COST", "500000000"))
+# limit | low_priority | reject; "limit" falls back to the lane when a LIMIT cannot stop the query early
+POLICY = os.getenv("SQL_GUARD_POLICY", "limit").lower()
+# Rows allowed by an injected LIMIT (one past the fetch cap, so the result still reports truncation)
+LIMIT_ROWS = int(os.getenv("SQL_GUARD_LIMIT_ROWS", str(MAX_ROWS + 1)))
+# Expensive queries running at once, and how long one waits for a slot before failing
+LOW_PRIORITY_SLOTS = int(os.getenv("SQL_GUARD_LOW_PRIORITY_SLOTS", "1"))
+LOW_PRIORITY_TIMEOUT = float(os.getenv("SQL_GUARD_LOW_PRIORITY_TIMEOUT_SECONDS", "30"))
+
+# Rows per index lookup when sqlite_stat1 has no figure for the index
+DEFAULT_LOOKUP_ROWS = 10
+# Rows assumed for anything the plan scans that cannot be resolved to a table
+DEFAULT_UNKNOWN_ROWS = 1000
+
+_LOOP = re.compile(r"^(SCAN|SEARCH) (?:TABLE )?(\S+)(?: AS (\S+))?(.*)$")
+_INDEX = re.compile(r"USING (?:COVERING )?INDEX (\S+)")
+_SOURCE = re.compile(r"(?:\bFROM\b|\bJOIN\b|,)\s*([\w\"\[\]`]+)\s+(?:AS\s+)?(\w+)", re.IGNORECASE)
+_TRAILING_LIMIT = re.compile(r"\bLIMIT\s+\d+(?:\s*(?:,|OFFSET)\s*\d+)?\s*$", re.IGNORECASE)
+_AGGREGATE = re.compile(r"\b(?:COUNT|SUM|AVG|MIN|MAX|TOTAL|GROUP_CONCAT)\s*\(|\bGROUP\s+BY\b|\bDISTINCT\b", re.IGNORECASE)
+_NOT_ALIASES = {"on", "where", "join", "left", "right", "full", "inner", "outer", "cross", "natural", "group", "order",
+                "limit", "using", "union", "except", "intersect", "having", "window", "as", "select", "from"}
+
+
+class LowPriorityLaneBusy(RuntimeError):
+    """Raised when an expensive query waited too long for a low-priority slot"""
+
+
+class TableStats:
+    """
+    Row counts per table and average rows per index lookup for one database
+    version. Uses sqlite_stat1 where ANALYZE has run; other tables are counted
+    on first use.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.tables = {name.lower(): name for (name,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%';")}
+        self.rows: Dict[str, int] = {}
+        self.lookups: Dict[str, int] = {}
+        self.analyzed = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1';").fetchone() is not None
+        if self.analyzed:
+            for table, index, stat in conn.execute("SELECT tbl, idx, stat FROM sqlite_stat1;"):
+                numbers = [int(part) for part in str(stat).split() if part.isdigit()]
+                if not numbers:
+                    continue
+                self.rows[table.lower()] = max(self.rows.get(table.lower(), 0), numbers[0])
+                if index and len(numbers) > 1:
+                    self.lookups[index.lower()] = numbers[1]
+        self._lock = threading.Lock()
+
+    def table_rows(self, conn: sqlite3.Connection, table: str) -> Optional[int]:
+        key = table.strip('"[]`').lower()
+        if key not in self.tables:
+            return None
+        if key not in self.rows:
+            count = conn.execute(f'SELECT COUNT(*) FROM "{self.tables[key]}";').fetchone()[0]
+            with self._lock:
+                self.rows[key] = count
+        return self.rows[key]
+
+
+_stats: Dict[Tuple, TableStats] = {}
+_stats_lock = threading.Lock()
+
+
+def get_table_stats(conn: sqlite3.Connection, version: Optional[Tuple] = None) -> TableStats:
+    """Stats for the connection's database, rebuilt when its database_version (if not given) changes"""
+    key = version or database_version(conn)
+    stats = _stats.get(key)
+    if stats is None:
+        stats = TableStats(conn)
+        if not stats.analyzed:
+            print("❌ [services/sql/cost_guard.py:get_table_stats] No sqlite_stat1, counting table rows instead; "
+                  "run python -m services.sql.cost_guard --analyze")
+        with _stats_lock:
+            _stats.clear()
+            _stats[key] = stats
+    return stats
+
+
+def _aliases(sql: str) -> Dict[str, str]:
+    """alias -> table or CTE name for the sources in FROM / JOIN clauses"""
+    aliases = {}
+    for source, alias in _SOURCE.findall(sql):
+        if alias.lower() not in _NOT_ALIASES:
+            aliases[alias.lower()] = source.strip('"[]`')
+    return aliases
+
+
+class _PlanEstimator:
+    """Walks the EXPLAIN QUERY PLAN tree: nested loops multiply, sorts and subqueries add"""
+
+    def __init__(self, conn: sqlite3.Connection, sql: str, stats: TableStats):
+        self.conn = conn
+        self.stats = stats
+        self.aliases = _aliases(sql)
+        self.derived: Dict[str, float] = {}
+        self.sorts = False
+
+    def _source_rows(self, name: str) -> float:
+        key = name.lower()
+        for candidate in (key, self.aliases.get(key, "").lower()):
+            if candidate in self.derived:
+                return self.derived[candidate]
+            rows = self.stats.table_rows(self.conn, candidate) if candidate else None
+            if rows is not None:
+                return rows
+        return DEFAULT_UNKNOWN_ROWS
+
+    def _loop(self, verb: str, name: str, rest: str) -> Tuple[float, float]:
+        """(rows per outer row, one-off cost) of a SCAN or SEARCH step"""
+        if name == "CONSTANT":
+            return 1.0, 0.0
+        rows = self._source_rows(name)
+        if verb == "SCAN":
+            return rows, 0.0
+        if "AUTOMATIC" in rest:
+            # SQLite builds a transient index by scanning the source once
+            return min(DEFAULT_LOOKUP_ROWS, rows), rows
+        if "PRIMARY KEY" in rest and "=" in rest and ">" not in rest and "<" not in rest:
+            return 1.0, 0.0
+        ranges = rest.count(">") + rest.count("<")
+        if ranges:
+            return max(rows / 4 ** min(ranges, 2), 1.0), 0.0
+        index = _INDEX.search(rest)
+        lookup = self.stats.lookups.get(index.group(1).lower()) if index else None
+        return float(min(lookup or DEFAULT_LOOKUP_ROWS, rows)), 0.0
+
+    def estimate(self, nodes: List[Tuple[str, list]]) -> Tuple[float, float]:
+        """(rows produced, row visits) for sibling plan nodes"""
+        rows, cost = 1.0, 0.0
+        for detail, children in nodes:
+            loop = _LOOP.match(detail)
+            if loop:
+                verb, name, _, rest = loop.groups()
+                per_row, setup = self._loop(verb, name, rest)
+                rows *= max(per_row, 1.0)
+                cost += setup + rows
+            elif detail.startswith("USE TEMP B-TREE"):
+                self.sorts = True
+                cost += rows * math.log2(max(rows, 2.0))
+            elif detail.startswith(("MATERIALIZE", "CO-ROUTINE")):
+                sub_rows, sub_cost = self.estimate(children)
+                self.derived[detail.split()[-1].lower()] = sub_rows
+                cost += sub_cost
+            elif detail.startswith("CORRELATED"):
+                _, sub_cost = self.estimate(children)
+                cost += rows * sub_cost
+            elif detail.startswith(("COMPOUND", "MULTI-INDEX OR")):
+                parts = [self.estimate(part_children) for _, part_children in children]
+                rows *= max(sum(part_rows for part_rows, _ in parts), 1.0)
+                cost += sum(part_cost for _, part_cost in parts)
+                if detail.startswith("MULTI-INDEX OR"):
+                    cost += rows
+            else:
+                _, sub_cost = self.estimate(children)
+                cost += sub_cost
+        return rows, cost
+
+
+def explain(conn: sqlite3.Connection, sql: str) -> Tuple[List[str], List[Tuple[str, list]]]:
+    """The plan as indented lines plus a (detail, children) tree"""
+    nodes: Dict[int, Tuple[str, list]] = {0: ("", [])}
+    lines = []
+    depth = {0: -1}
+    for node_id, parent, _, detail in conn.execute("EXPLAIN QUERY PLAN " + sql):
+        node = (detail, [])
+        nodes.get(parent, nodes[0])[1].append(node)
+        nodes[node_id] = node
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines, nodes[0][1]
+
+
+def strip_statement(sql: str) -> str:
+    """The statement without trailing semicolons, comments and whitespace (quoted text is left alone)"""
+    end = i = 0
+    while i < len(sql):
+        char = sql[i]
+        if sql.startswith("--", i):
+            newline = sql.find("\n", i)
+            i = len(sql) if newline < 0 else newline + 1
+            continue
+        if sql.startswith("/*", i):
+            close = sql.find("*/", i + 2)
+            i = len(sql) if close < 0 else close + 2
+            continue
+        if char in "'\"`[":
+            close = sql.find("]" if char == "[" else char, i + 1)
+            i = end = len(sql) if close < 0 else close + 1
+            continue
+        if not char.isspace() and char != ";":
+            end = i + 1
+        i += 1
+    return sql[:end]
+
+
+def inject_limit(sql: str, limit: int = LIMIT_ROWS) -> str:
+    # The newlines keep the closing parenthesis out of any comment left in the statement
+    return f"SELECT * FROM (\n{strip_statement(sql)}\n) LIMIT {int(limit)}"
+
+
+def _decide(sql: str, estimator: _PlanEstimator, cost: float) -> Tuple[str, str]:
+    if cost <= MAX_COST:
+        return "run", ""
+    over = f"estimated {cost:,.0f} row visits"
+    if cost > REJECT_COST:
+        return "reject", f"{over} (reject above {REJECT_COST:,.0f})"
+    policy = POLICY if POLICY in ("limit", "low_priority", "reject") else "limit"
+    if policy == "limit":
+        statement = strip_statement(sql)
+        # Sorting and aggregation read every row before the first one is returned, and a
+        # query that already has a LIMIT gains nothing from another one
+        if estimator.sorts or _AGGREGATE.search(statement) or _TRAILING_LIMIT.search(statement):
+            policy = "low_priority"
+        else:
+            return "limit", f"{over} (limit above {MAX_COST:,.0f}), capped at {LIMIT_ROWS} rows"
+    return policy, f"{over} (policy {policy} above {MAX_COST:,.0f})"
+
+
+def check_query(conn: sqlite3.Connection, sql: str, version: Optional[Tuple] = None) -> GuardDecision:
+    """
+    Plan, estimate and classify one statement. sqlite3 errors from EXPLAIN
+    (e.g. a syntax error) propagate, as executing the query would fail too.
+    Pass the database_version when the caller already has it.
+    """
+    if not GUARD_ENABLED:
+        return GuardDecision(action="run", sql=sql)
+
+    lines, tree = explain(conn, sql)
+    estimator = _PlanEstimator(conn, sql, get_table_stats(conn, version))
+    rows, cost = estimator.estimate(tree)
+    action, reason = _decide(sql, estimator, cost)
+    decision = GuardDecision(action=action, sql=inject_limit(sql) if action == "limit" else sql,
+                             estimated_cost=cost, estimated_rows=rows, plan=lines, reason=reason)
+    counters.increment(f"sql_guard.{action}")
+    if action != "run":
+        print(f"🛡️ Cost guard: {action} ({reason})")
+    return decision
+
+
+_lane = threading.BoundedSemaphore(max(1, LOW_PRIORITY_SLOTS))
+
+
+@contextmanager
+def low_priority_lane(timeout: float = LOW_PRIORITY_TIMEOUT):
+    """Hold one of the few slots expensive queries share, so they queue instead of occupying every worker"""
+    if not _lane.acquire(timeout=timeout):
+        counters.increment("sql_guard.lane_timeouts")
+        raise LowPriorityLaneBusy(f"Expensive query waited {timeout:.0f}s for the low-priority lane")
+    try:
+        yield
+    finally:
+        _lane.release()
+
+
+def analyze(db_path: str = DB_PATH):
+    """Run ANALYZE so sqlite_stat1 holds row counts for every table and index"""
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("ANALYZE;")
+        conn.commit()
+        count = conn.execute("SELECT COUNT(*) FROM sqlite_stat1;").fetchone()[0]
+        print(f"✅ [services/sql/cost_guard.py:analyze] sqlite_stat1 has {count} rows for {db_path}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQL cost guard: ANALYZE the database or explain a query")
+    parser.add_argument("sql", nargs="?", help="Query to plan and classify")
+    parser.add_argument("--analyze", action="store_true", help="Write sqlite_stat1 (needs write access)")
+    parser.add_argument("--db-path", default=DB_PATH)
+    args = parser.parse_args()
+
+    if args.analyze:
+        analyze(args.db_path)
+    if args.sql:
+        connection = sqlite3.connect(args.db_path)
+        decision = check_query(connection, args.sql)
+        print(decision.plan_text())
+        print(f"cost≈{decision.estimated_cost:,.0f} rows≈{decision.estimated_rows:,.0f} -> {decision.action}"
+              + (f": {decision.reason}" if decision.reason else ""))
+        if decision.sql != args.sql:
+            print(decision.sql)
@@ -1,25 +1,17 @@
+import asyncio
 import sqlite3
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from langchain_core.runnables import RunnableConfig
 from models.schema import State
-from langchain_core.messages import SystemMessage
-
-def convert_sql_response_to_text(sql_results: str) -> str:
-    """
-    Convert SQL query results to natural language text.
-    This represents the "Convert response to text" step in the flowchart.
-    """
-    if not sql_results:
-        return "No results to convert."
-    
-    # Simple conversion - in a real implementation, you might use an LLM here
-    # to convert the results to more natural language
-    if "Query Results:" in sql_results:
-        return f"Here are the results from your query:\n{sql_results}"
-    elif "Query executed successfully" in sql_results:
-        return f"Your query was executed successfully. {sql_results}"
-    else:
-        return f"Query result: {sql_results}"
+from models.sql_result import SQLResult
+from langchain_core.messages import HumanMessage, SystemMessage
+from persistence.connection_pool import get_pool, run_in_db_executor
+from services.sql.cost_guard import check_query, low_priority_lane
+from services.sql.query_control import QueryControl, QueryInterrupted
+from services.sql.result_cache import get_result_cache
+from services.sql.question_cache import get_question_cache
+from memory.conversation import SQL_RESULT_MESSAGE
 
 def extract_sql_query(state: State) -> str:
     """
@@ -45,10 +37,73 @@ def extract_sql_query(state: State) -> str:
     
     return ""
 
-def execute_sql_query(state: State) -> dict:
+def _remember_question(state: State, sql_query: str):
+    """Add the latest user question and its SQL to the semantic question cache"""
+    cache = get_question_cache()
+    question = next(
+        (msg.content for msg in reversed(state["messages"]) if isinstance(msg, HumanMessage)),
+        None,
+    )
+    if not cache or not question:
+        return
+    try:
+        cache.add(question, sql_query)
+    except Exception as e:
+        print(f"❌ [services/sql/execute_sql_query.py:_remember_question] Error updating question cache: {str(e)}")
+
+def _run_query(conn, sql_query: str) -> SQLResult:
+    cursor = conn.cursor()
+    cursor.execute(sql_query)
+    # Fetch in bounded batches into a columnar result
+    result = SQLResult.from_cursor(cursor)
+    cursor.close()
+    return result
+
+def _rejected(state: State, sql_query: str, decision) -> dict:
+    """Result of a query the cost guard refused to run, with its plan for the chatbot to explain"""
+    error_msg = (f"Query not executed: {decision.reason}. Ask a narrower question or add filters.\n"
+                 f"Query plan:\n{decision.plan_text()}")
+    print(f"❌ [services/sql/execute_sql_query.py:execute_sql_query] Rejected by the cost guard: {decision.reason}")
+    if state.get("sql_cache_hit") and get_question_cache():
+        get_question_cache().invalidate(sql_query)
+    return {
+        "status": "rejected",
+        "sql_query": sql_query,
+        "sql_output": error_msg,
+        "sql_result": None,
+        "sql_guard": decision,
+        "messages": [SystemMessage(content=error_msg)]
+    }
+
+def _interrupted(state: State, sql_query: str, decision, interruption) -> dict:
+    """Structured result of a query stopped by its time/step budget or cancelled"""
+    error_msg = interruption.describe()
+    if interruption.timed_out:
+        error_msg += ". Ask a narrower question or add filters."
+    print(f"⏱️ [services/sql/execute_sql_query.py:execute_sql_query] {error_msg}")
+    return {
+        "status": "timeout" if interruption.timed_out else "cancelled",
+        "sql_query": sql_query,
+        "sql_output": error_msg,
+        "sql_result": None,
+        "sql_guard": decision,
+        "sql_interrupted": interruption,
+        "messages": [SystemMessage(content=error_msg)]
+    }
+
+def _thread_key(config: Optional[RunnableConfig]) -> Optional[str]:
+    """Conversation thread the query runs for, so cancel_queries(thread_id) can reach it"""
+    return ((config or {}).get("configurable") or {}).get("thread_id")
+
+def execute_sql_query(state: State, config: Optional[RunnableConfig] = None) -> dict:
     """
     Execute a SQL query based on the state and return the results in text format.
+    Each statement runs under the SQL_QUERY_TIMEOUT_SECONDS / SQL_MAX_VM_STEPS
+    budget and can be cancelled with cancel_queries(thread_id).
     """
+    return _execute(state, QueryControl(_thread_key(config)))
+
+def _execute(state: State, control: QueryControl) -> dict:
     # First, try to get SQL from the state
     sql_query = state.get("sql_query", "")
     
@@ -59,92 +114,105 @@ def execute_sql_query(state: State) -> dict:
     if not sql_query:
         return {
             "status": "error", 
-            "results": "No SQL query found in the conversation. Please provide a valid SQL query.",
             "sql_output": "No SQL query available to execute."
         }
     
+    decision = None
     try:
-        # Connect to the SQLite database
-        db_path = "persistence/db/Chinook_Sqlite.db"
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # Execute the query
-        cursor.execute(sql_query)
-        
-        # Get column names
-        columns = [description[0] for description in cursor.description] if cursor.description else []
-        
-        # Fetch results
-        rows = cursor.fetchall()
+        # Borrow a warm read-only connection from the pool
+        cache = get_result_cache()
+        with get_pool().connection() as conn:
+            # Reuse a cached result if the database has not changed since
+            version = cache.version(conn) if cache else None
+            result = cache.get(sql_query, version) if cache else None
+
+            if result is None:
+                # Plan and cost the query before running it
+                with control.running(conn):
+                    decision = check_query(conn, sql_query, version)
+                if decision.action == "reject":
+                    return _rejected(state, sql_query, decision)
+                if decision.action != "low_priority":
+                    with control.running(conn):
+                        result = _run_query(conn, decision.sql)
+            else:
+                print("⚡ Served from the SQL result cache")
+
+        if result is None:
+            # Expensive queries take turns, without holding a pooled connection while they wait
+            with low_priority_lane(), get_pool().connection() as conn, control.running(conn):
+                result = _run_query(conn, decision.sql)
+
+        if decision is not None:
+            if decision.action == "limit" and result.truncated:
+                result.truncated_exact = False
+                result.truncation_reason += ", LIMIT added by the cost guard"
+            if cache:
+                cache.put(sql_query, version, result)
         
         # Print execution results
         print(f"✅ Query executed successfully!")
-        print(f"📊 Results: {len(rows)} rows returned")
-        if columns:
-            print(f"📋 Columns: {', '.join(columns)}")
-        
-        # Format results as text
-        if not rows:
-            result_text = "Query executed successfully. No results returned."
-        else:
-            # Create a formatted table
-            if columns:
-                # Calculate column widths
-                col_widths = [len(col) for col in columns]
-                for row in rows:
-                    for i, cell in enumerate(row):
-                        col_widths[i] = max(col_widths[i], len(str(cell)))
-                
-                # Create header
-                header = " | ".join(f"{col:<{col_widths[i]}}" for i, col in enumerate(columns))
-                separator = "-" * len(header)
-                
-                # Create rows
-                formatted_rows = []
-                for row in rows:
-                    formatted_row = " | ".join(f"{str(cell):<{col_widths[i]}}" for i, cell in enumerate(row))
-                    formatted_rows.append(formatted_row)
-                
-                result_text = f"Query Results:\n{separator}\n{header}\n{separator}\n"
-                result_text += "\n".join(formatted_rows)
-                result_text += f"\n{separator}\nTotal rows: {len(rows)}"
-            else:
-                # For queries that don't return data (INSERT, UPDATE, DELETE, etc.)
-                result_text = f"Query executed successfully. {len(rows)} rows affected."
+        print(f"📊 Results: {result.row_count} rows returned")
+        if result.truncated:
+            print(f"✂️ Truncated: {result.truncated_rows}{'' if result.truncated_exact else '+'} more rows ({result.truncation_reason})")
+        if result.columns:
+            print(f"📋 Columns: {', '.join(result.columns)}")
         
-        # Close connection
-        conn.close()
-        
-        # Convert results to natural language text
-        natural_language_result = convert_sql_response_to_text(result_text)
+        # The rows stay in sql_result and are rendered by the chatbot when it builds its prompt;
+        # the history only gets a one-line summary
+        summary = result.describe()
+
+        # Remember freshly generated SQL that ran successfully for similar future questions
+        if not state.get("sql_cache_hit"):
+            _remember_question(state, sql_query)
         
         return {
             "status": "success",
-            "results": result_text,
             "sql_query": sql_query,
-            "sql_output": natural_language_result,
-            "row_count": len(rows),
-            "messages": state["messages"] + [SystemMessage(content=natural_language_result)]
+            "sql_output": summary,
+            "row_count": result.row_count,
+            "truncated_rows": result.truncated_rows,
+            "sql_result": result,
+            "sql_guard": decision,
+            "messages": [SystemMessage(content=summary, name=SQL_RESULT_MESSAGE)]
         }
         
+    except QueryInterrupted as e:
+        return _interrupted(state, sql_query, decision, e.interruption)
     except sqlite3.Error as e:
         error_msg = f"Database error: {str(e)}"
         print(f"❌ [services/sql/execute_sql_query.py:execute_sql_query] {error_msg}")
+        if state.get("sql_cache_hit") and get_question_cache():
+            get_question_cache().invalidate(sql_query)
         return {
             "status": "error",
-            "results": error_msg,
             "sql_query": sql_query,
             "sql_output": error_msg,
-            "messages": state["messages"] + [SystemMessage(content=error_msg)]
+            "sql_result": None,
+            "sql_guard": decision,
+            "messages": [SystemMessage(content=error_msg)]
         }
     except Exception as e:
         error_msg = f"Error executing SQL query: {str(e)}"
         print(f"❌ [services/sql/execute_sql_query.py:execute_sql_query] {error_msg}")
         return {
             "status": "error", 
-            "results": error_msg,
             "sql_query": sql_query,
             "sql_output": error_msg,
-            "messages": state["messages"] + [SystemMessage(content=error_msg)]
-        }  
\ No newline at end of file
+            "sql_result": None,
+            "sql_guard": decision,
+            "messages": [SystemMessage(content=error_msg)]
+        }
+
+async def aexecute_sql_query(state: State, config: Optional[RunnableConfig] = None) -> dict:
+    """
+    Async execute_sql_query. The blocking part (pool checkout, cache lookups,
+    fetching) runs on the bounded SQLite executor so the event loop stays free.
+    Cancelling the awaiting task interrupts the query on the executor thread.
+    """
+    control = QueryControl(_thread_key(config))
+    try:
+        return await run_in_db_executor(_execute, state, control)
+    except asyncio.CancelledError:
+        control.cancel()
+        raise
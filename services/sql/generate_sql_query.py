@@ -1,7 +1,76 @@
+import asyncio
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import SystemMessage, HumanMessage
 from models.schema import State
-from services.llm_connector.llm_connector import llm, retrieve_context
+from services.llm_connector.llm_connector import get_llm, retrieve_schema_context
+from services.llm_connector.prompt_builder import SCHEMA_TOKENS, PromptBuilder, fit_sections
+
+def fetch_schema_context(question: str) -> str:
+    """Retrieve the database schema context for a question from RAG"""
+    try:
+        rag_context = retrieve_schema_context(question)
+        if not rag_context:
+            rag_context = "No relevant database schema found."
+    except Exception as e:
+        rag_context = f"Error retrieving schema context: {str(e)}"
+    return rag_context
+
+def _sql_prompt(question: str, rag_context: str) -> list:
+    prompt = PromptBuilder("generate_sql")
+    instructions = prompt.add("instructions", """You are a world-class SQL expert.
+Using the database schema information provided below, write a correct, optimized SQL query that answers the user's question.
+Return ONLY the SQL query, no explanations or markdown formatting.""")
+    schema = prompt.add("schema", fit_sections(rag_context, SCHEMA_TOKENS))
+    request = prompt.add("question", f"Generate SQL query for: {question}")
+    system_prompt = f"""{instructions}
+
+Database Schema Information:
+{schema}"""
+
+    if get_llm() is None:
+        raise ValueError("LLM not available")
+
+    prompt.log()
+    return [
+        SystemMessage(content=system_prompt),
+        HumanMessage(content=request)
+    ]
+
+def _validated_sql(response) -> str:
+    sql_query = response.content.strip()
+    
+    # Validate generated SQL
+    if not sql_query or sql_query.lower() in ['', 'none', 'null', 'no sql generated']:
+        raise ValueError("No valid SQL query was generated")
+    return sql_query
+
+def draft_sql(question: str, rag_context: str) -> str:
+    """Ask the LLM for a SQL query answering the question; raises if none is produced"""
+    return _validated_sql(get_llm().invoke(_sql_prompt(question, rag_context)))
+
+async def adraft_sql(question: str, rag_context: str) -> str:
+    """Async draft_sql"""
+    return _validated_sql(await get_llm().ainvoke(_sql_prompt(question, rag_context)))
+
+def _generated(state: State, sql_query: str) -> dict:
+    # Print the generated SQL query for verification
+    print(f"\n🔍 Generated SQL Query:")
+    print(f"```sql")
+    print(f"{sql_query}")
+    print(f"```")
+    print(f"📊 Executing query...")
+    
+    # Add the generated SQL to the state
+    return {
+        "sql_query": sql_query,
+        "messages": [SystemMessage(content=f"Generated SQL using RAG context: {sql_query}")]
+    }
+
+def _failed(state: State, error_msg: str) -> dict:
+    return {
+        "sql_query": "",
+        "messages": [SystemMessage(content=error_msg)]
+    }
 
 def generate_sql_query(state: State) -> dict:
     """
@@ -12,60 +81,32 @@ def generate_sql_query(state: State) -> dict:
     
     # Validate input
     if not latest_user_message or not latest_user_message.strip():
-        error_msg = "No valid user message found for SQL generation."
-        return {
-            "sql_query": "",
-            "messages": state["messages"] + [SystemMessage(content=error_msg)]
-        }
+        return _failed(state, "No valid user message found for SQL generation.")
     
     # Retrieve relevant database schema context from RAG
+    rag_context = fetch_schema_context(latest_user_message)
+
+    # Generate SQL using LLM with RAG context
     try:
-        rag_context = retrieve_context(latest_user_message)
-        if not rag_context:
-            rag_context = "No relevant database schema found."
+        return _generated(state, draft_sql(latest_user_message, rag_context))
     except Exception as e:
-        rag_context = f"Error retrieving schema context: {str(e)}"
-    
-    system_prompt = f"""You are a world-class SQL expert.
-Using the database schema information provided below, write a correct, optimized SQL query that answers the user's question.
-Return ONLY the SQL query, no explanations or markdown formatting.
+        error_msg = f"Error generating SQL: {str(e)}"
+        print(f"❌ [services/sql/generate_sql_query.py:generate_sql_query] {error_msg}")
+        return _failed(state, error_msg)
 
-Database Schema Information:
-{rag_context}"""
+async def agenerate_sql_query(state: State) -> dict:
+    """Async generate_sql_query: retrieval runs in a worker thread, the LLM via ainvoke"""
+    latest_user_message = state["messages"][-1].content
+
+    if not latest_user_message or not latest_user_message.strip():
+        return _failed(state, "No valid user message found for SQL generation.")
+
+    # Embedding + FAISS search are CPU-bound; keep them off the event loop
+    rag_context = await asyncio.to_thread(fetch_schema_context, latest_user_message)
 
-    # Generate SQL using LLM with RAG context
     try:
-        if llm is None:
-            raise ValueError("LLM not available")
-            
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=f"Generate SQL query for: {latest_user_message}")
-        ]
-        
-        response = llm.invoke(messages)
-        sql_query = response.content.strip()
-        
-        # Validate generated SQL
-        if not sql_query or sql_query.lower() in ['', 'none', 'null', 'no sql generated']:
-            raise ValueError("No valid SQL query was generated")
-        
-        # Print the generated SQL query for verification
-        print(f"\n🔍 Generated SQL Query:")
-        print(f"```sql")
-        print(f"{sql_query}")
-        print(f"```")
-        print(f"📊 Executing query...")
-        
-        # Add the generated SQL to the state
-        return {
-            "sql_query": sql_query,
-            "messages": state["messages"] + [SystemMessage(content=f"Generated SQL using RAG context: {sql_query}")]
-        }
+        return _generated(state, await adraft_sql(latest_user_message, rag_context))
     except Exception as e:
         error_msg = f"Error generating SQL: {str(e)}"
-        print(f"❌ [services/sql/generate_sql_query.py:generate_sql_query] {error_msg}")
-        return {
-            "sql_query": "",
-            "messages": state["messages"] + [SystemMessage(content=error_msg)]
-        }
+        print(f"❌ [services/sql/generate_sql_query.py:agenerate_sql_query] {error_msg}")
+        return _failed(state, error_msg)
@@ -0,0 +1,37 @@
+from langchain_core.messages import HumanMessage
+from models.schema import State
+from services.sql.question_cache import get_question_cache
+from persistence.connection_pool import run_in_db_executor
+
+def lookup_cached_sql(state: State) -> dict:
+    """
+    Reuse the SQL of a previously answered, semantically similar question.
+    A hit skips both the classifier and the SQL generator.
+    """
+    last_user_message = next(
+        (msg for msg in reversed(state["messages"]) if isinstance(msg, HumanMessage)),
+        None,
+    )
+    cache = get_question_cache()
+    if not cache or not last_user_message or not last_user_message.content.strip():
+        return {"sql_cache_hit": False}
+
+    try:
+        match = cache.lookup(last_user_message.content)
+    except Exception as e:
+        print(f"❌ [services/sql/lookup_cached_sql.py:lookup_cached_sql] Error looking up question cache: {str(e)}")
+        return {"sql_cache_hit": False}
+
+    if match is None:
+        return {"sql_cache_hit": False}
+
+    sql_query, score = match
+    print(f"\n⚡ Reusing cached SQL (similarity {score:.2f}):")
+    print(f"```sql")
+    print(f"{sql_query}")
+    print(f"```")
+    return {"sql_cache_hit": True, "sql_needed_or_not": True, "sql_query": sql_query}
+
+async def alookup_cached_sql(state: State) -> dict:
+    """Async lookup_cached_sql; embedding and the schema_version check run off the event loop"""
+    return await run_in_db_executor(lookup_cached_sql, state)
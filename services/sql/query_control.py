@@ -0,0 +1,129 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Optional, Set
+from models.sql_result import SQLInterruption
+from utils.metrics import counters
+
+# Wall-clock budget of one statement, 0 disables
+QUERY_TIMEOUT = float(os.getenv("SQL_QUERY_TIMEOUT_SECONDS", "30"))
+# SQLite virtual-machine instructions one statement may run, 0 disables
+MAX_VM_STEPS = int(os.getenv("SQL_MAX_VM_STEPS", "2000000000"))
+# The progress handler runs every this many VM instructions (budget checks are this coarse)
+PROGRESS_INTERVAL = int(os.getenv("SQL_PROGRESS_INTERVAL", "10000"))
+
+
+class QueryInterrupted(sqlite3.OperationalError):
+    """Raised when a query is stopped by its budget or cancelled"""
+
+    def __init__(self, interruption: SQLInterruption):
+        super().__init__(interruption.describe())
+        self.interruption = interruption
+
+
+class QueryControl:
+    """
+    Budget and cancel switch for the statements of one graph node.
+
+    While a statement runs, SQLite calls a progress handler every
+    PROGRESS_INTERVAL instructions. The handler aborts the statement once its
+    deadline or step budget is used up, or once cancel() has been called.
+    cancel() may be called from any thread. It also calls
+    Connection.interrupt(), so a statement stuck in one long step stops too.
+    """
+
+    def __init__(self, key: Optional[str] = None, timeout: float = QUERY_TIMEOUT, max_steps: int = MAX_VM_STEPS,
+                 interval: int = PROGRESS_INTERVAL):
+        self.key = key
+        self.timeout = timeout
+        self.max_steps = max_steps
+        self.interval = max(1, interval)
+        self.reason = ""
+        self.steps = 0
+        self.started = 0.0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _progress(self) -> int:
+        self.steps += self.interval
+        if not self.reason:
+            if self.timeout and time.monotonic() - self.started > self.timeout:
+                self.reason = "timeout"
+            elif self.max_steps and self.steps > self.max_steps:
+                self.reason = "steps"
+        return 1 if self.reason else 0
+
+    def cancel(self, reason: str = "cancelled"):
+        """Stop the running statement (and any later one) from another thread"""
+        with self._lock:
+            if not self.reason:
+                self.reason = reason
+            if self._conn is not None:
+                self._conn.interrupt()
+
+    def interruption(self) -> SQLInterruption:
+        return SQLInterruption(reason=self.reason, elapsed_seconds=time.monotonic() - self.started,
+                               vm_steps=self.steps, timeout_seconds=self.timeout, max_vm_steps=self.max_steps)
+
+    def _interrupted(self) -> QueryInterrupted:
+        counters.increment("sql.interrupted")
+        counters.increment(f"sql.interrupted.{self.reason}")
+        return QueryInterrupted(self.interruption())
+
+    @contextmanager
+    def running(self, conn: sqlite3.Connection):
+        """Enforce the budget on statements run on conn inside the with-block, each with its own deadline"""
+        with self._lock:
+            self.started = time.monotonic()
+            self.steps = 0
+            if self.reason:
+                raise self._interrupted()
+            self._conn = conn
+        conn.set_progress_handler(self._progress, self.interval)
+        _register(self)
+        try:
+            yield self
+        except sqlite3.OperationalError as e:
+            if self.reason and not isinstance(e, QueryInterrupted):
+                raise self._interrupted() from e
+            raise
+        finally:
+            _unregister(self)
+            with self._lock:
+                self._conn = None
+            conn.set_progress_handler(None, self.interval)
+
+
+_active: Dict[Optional[str], Set[QueryControl]] = defaultdict(set)
+_active_lock = threading.Lock()
+
+
+def _register(control: QueryControl):
+    with _active_lock:
+        _active[control.key].add(control)
+
+
+def _unregister(control: QueryControl):
+    with _active_lock:
+        controls = _active.get(control.key)
+        if controls is not None:
+            controls.discard(control)
+            if not controls:
+                del _active[control.key]
+
+
+def cancel_queries(key: str, reason: str = "cancelled") -> int:
+    """Interrupt every running query started for key (e.g. a session's thread_id); returns how many"""
+    with _active_lock:
+        controls = list(_active.get(key, ()))
+    for control in controls:
+        control.cancel(reason)
+    return len(controls)
+
+
+def running_queries() -> int:
+    with _active_lock:
+        return sum(len(controls) for controls in _active.values())
@@ -0,0 +1,270 @@
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from persistence.connection_pool import get_pool
+from services.llm_connector.retriever import get_retriever
+from utils.metrics import counters
+
+CACHE_ENABLED = os.getenv("SQL_QUESTION_CACHE_ENABLED", "true").lower() == "true"
+CACHE_PATH = os.getenv("SQL_QUESTION_CACHE_PATH", os.path.join("persistence", "question_cache.jsonl"))
+SIMILARITY_THRESHOLD = float(os.getenv("SQL_QUESTION_CACHE_THRESHOLD", "0.92"))
+MAX_ENTRIES = int(os.getenv("SQL_QUESTION_CACHE_MAX_ENTRIES", "500"))
+MAX_AGE_SECONDS = float(os.getenv("SQL_QUESTION_CACHE_MAX_AGE_SECONDS", str(7 * 24 * 3600)))
+
+# Questions at least this similar to a cached one (with the same literals) replace it instead of adding a duplicate
+_DUPLICATE_THRESHOLD = 0.98
+# The log is compacted once it holds this many records per live entry
+_COMPACT_RATIO = 2
+
+_QUOTED = re.compile(r"(?<!\w)(['\"])(.+?)\1(?!\w)")
+_TOKEN = re.compile(r"[A-Za-z0-9][\w/&'-]*(?:\.\d+)?")
+# Capitalised words that start questions rather than name something
+_QUESTION_WORDS = {
+    "a", "all", "an", "and", "are", "average", "by", "can", "compare", "could", "count", "did", "display", "do",
+    "does", "each", "every", "find", "for", "from", "get", "give", "how", "i", "in", "is", "list", "name", "number",
+    "of", "on", "or", "per", "please", "rank", "return", "show", "sort", "sum", "tell", "the", "top", "total",
+    "was", "were", "what", "when", "where", "which", "who", "whom", "whose", "with",
+}
+
+
+def question_literals(question: str) -> List[str]:
+    """
+    Values a question pins its SQL to: quoted strings, numbers and
+    capitalised names ("invoices in 2009", "albums by AC/DC"). Questions that
+    differ only in these embed almost identically but need different SQL.
+    """
+    literals = [match.group(2) for match in _QUOTED.finditer(question)]
+    for token in _TOKEN.findall(_QUOTED.sub(" ", question)):
+        token = re.sub(r"'s$", "", token)
+        if token[0].isdigit() or (token[0].isupper() and token.lower() not in _QUESTION_WORDS):
+            literals.append(token)
+    return literals
+
+
+def _normalize(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class QuestionCache:
+    """
+    Cache of (question, SQL) pairs that executed successfully, searched by
+    cosine similarity of MiniLM question embeddings. A cached question only
+    matches when its literals (see question_literals) are the same, so
+    "invoices in 2009" never reuses the SQL of "invoices in 2010".
+
+    Entries expire after max_age seconds, the least recently used entry is
+    evicted past max_entries, and the whole cache is dropped when the
+    database schema_version changes. Changes are appended to a JSONL log,
+    which is rewritten once it holds mostly superseded records.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, threshold: float = SIMILARITY_THRESHOLD,
+                 max_entries: int = MAX_ENTRIES, max_age: float = MAX_AGE_SECONDS):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._entries: List[Dict] = []
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._schema_version: Optional[int] = None
+        self._recent: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._log_records = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        """Replay the log: a schema_version record starts over, then add / drop records apply in order"""
+        if not os.path.exists(self.path):
+            return
+        entries: "OrderedDict[str, Dict]" = OrderedDict()
+        torn = False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A write cut short by a crash; everything before it is intact
+                        torn = True
+                        break
+                    self._log_records += 1
+                    if "schema_version" in record:
+                        self._schema_version = record["schema_version"]
+                        entries.clear()
+                    elif "add" in record:
+                        entries[record["add"]["id"]] = record["add"]
+                    elif "drop" in record:
+                        for entry_id in record["drop"]:
+                            entries.pop(entry_id, None)
+            self._entries = list(entries.values())
+            for entry in self._entries:
+                entry.setdefault("literals", question_literals(entry["question"]))
+            self._vectors = np.array([entry.pop("vector") for entry in self._entries], dtype=np.float32)
+        except Exception as e:
+            print(f"❌ [services/sql/question_cache.py:QuestionCache._load] Ignoring unreadable cache file: {str(e)}")
+            self._entries, self._vectors = [], np.zeros((0, 0), dtype=np.float32)
+            self._schema_version = None
+            return
+        if torn:
+            print("❌ [services/sql/question_cache.py:QuestionCache._load] Dropped a truncated record from the cache log")
+            self._compact()
+
+    def _append(self, record: Dict):
+        """Append one record to the log, compacting it when it has grown; called with the lock held"""
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        self._log_records += 1
+        if self._log_records > max(_COMPACT_RATIO * len(self._entries), 100):
+            self._compact()
+
+    def _compact(self):
+        """Rewrite the log atomically as the live entries only; called with the lock held"""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"schema_version": self._schema_version}) + "\n")
+            for entry, vector in zip(self._entries, self._vectors):
+                f.write(json.dumps({"add": dict(entry, vector=vector.tolist())}) + "\n")
+        os.replace(tmp_path, self.path)
+        self._log_records = 1 + len(self._entries)
+
+    def _embed(self, question: str) -> np.ndarray:
+        with self._lock:
+            vector = self._recent.get(question)
+        if vector is None:
+            vector = _normalize(get_retriever().get_embeddings().embed_query(question))
+            with self._lock:
+                self._recent[question] = vector
+                while len(self._recent) > 64:
+                    self._recent.popitem(last=False)
+        return vector
+
+    def _current_schema_version(self) -> int:
+        with get_pool().connection() as conn:
+            return conn.execute("PRAGMA schema_version;").fetchone()[0]
+
+    def _drop(self, indexes: List[int]):
+        dropped = set(indexes)
+        dropped_ids = [self._entries[i]["id"] for i in sorted(dropped)]
+        keep = [i for i in range(len(self._entries)) if i not in dropped]
+        self._entries = [self._entries[i] for i in keep]
+        self._vectors = self._vectors[keep] if keep else np.zeros((0, 0), dtype=np.float32)
+        # Logged after the entries are gone: a compaction triggered by the append must not write them back
+        self._append({"drop": dropped_ids})
+
+    def _expire(self, schema_version: int):
+        """Drop everything on a schema change and entries older than max_age"""
+        if self._schema_version != schema_version:
+            if self._entries:
+                counters.increment("question_cache.invalidations", len(self._entries))
+            self._entries, self._vectors = [], np.zeros((0, 0), dtype=np.float32)
+            self._schema_version = schema_version
+            self._compact()
+            return
+        cutoff = time.time() - self.max_age
+        expired = [i for i, entry in enumerate(self._entries) if entry["created_at"] < cutoff]
+        if expired:
+            counters.increment("question_cache.evictions", len(expired))
+            self._drop(expired)
+
+    def _scores(self, vector: np.ndarray) -> np.ndarray:
+        return self._vectors @ vector if self._entries else np.zeros(0, dtype=np.float32)
+
+    def _best_match(self, scores: np.ndarray, literals: List[str], threshold: float) -> Tuple[int, float]:
+        """The most similar entry at or above threshold whose literals equal the question's"""
+        for i in np.argsort(-scores, kind="stable"):
+            if scores[i] < threshold:
+                break
+            if self._entries[i]["literals"] == literals:
+                return int(i), float(scores[i])
+        return -1, 0.0
+
+    def lookup(self, question: str) -> Optional[Tuple[str, float]]:
+        """Return (sql, similarity) for the closest cached question above the threshold with the same literals"""
+        vector = self._embed(question)
+        literals = question_literals(question)
+        schema_version = self._current_schema_version()
+        with self._lock:
+            self._expire(schema_version)
+            scores = self._scores(vector)
+            best, score = self._best_match(scores, literals, self.threshold)
+            if best < 0:
+                if scores.size and scores.max() >= self.threshold:
+                    counters.increment("question_cache.literal_mismatches")
+                counters.increment("question_cache.misses")
+                return None
+            entry = self._entries[best]
+            entry["last_used"] = time.time()
+            entry["hits"] = entry.get("hits", 0) + 1
+            counters.increment("question_cache.hits")
+            return entry["sql"], score
+
+    def add(self, question: str, sql: str):
+        """Remember a question whose generated SQL executed successfully"""
+        vector = self._embed(question)
+        literals = question_literals(question)
+        schema_version = self._current_schema_version()
+        now = time.time()
+        with self._lock:
+            self._expire(schema_version)
+            scores = self._scores(vector)
+            duplicates = [int(i) for i in np.flatnonzero(scores >= _DUPLICATE_THRESHOLD)
+                          if self._entries[i]["literals"] == literals]
+            if duplicates:
+                self._drop(duplicates)
+
+            entry = {"id": uuid.uuid4().hex, "question": question, "sql": sql, "literals": literals,
+                     "created_at": now, "last_used": now, "hits": 0}
+            self._entries.append(entry)
+            self._vectors = vector[None, :] if self._vectors.size == 0 else np.vstack([self._vectors, vector])
+            self._append({"add": dict(entry, vector=vector.tolist())})
+
+            if len(self._entries) > self.max_entries:
+                lru = min(range(len(self._entries)), key=lambda i: self._entries[i]["last_used"])
+                self._drop([lru])
+                counters.increment("question_cache.evictions")
+
+    def invalidate(self, sql: str):
+        """Forget every cached question that maps to SQL that no longer runs"""
+        with self._lock:
+            stale = [i for i, entry in enumerate(self._entries) if entry["sql"] == sql]
+            if stale:
+                self._drop(stale)
+                counters.increment("question_cache.invalidations", len(stale))
+
+    def stats(self) -> Dict[str, float]:
+        hits = counters.get("question_cache.hits")
+        misses = counters.get("question_cache.misses")
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": hits,
+                "misses": misses,
+                "literal_mismatches": counters.get("question_cache.literal_mismatches"),
+                "evictions": counters.get("question_cache.evictions"),
+                "invalidations": counters.get("question_cache.invalidations"),
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            }
+
+
+_cache: Optional[QuestionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_question_cache() -> Optional[QuestionCache]:
+    """Return the process-wide question cache, or None when disabled"""
+    global _cache
+    if not CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = QuestionCache()
+    return _cache
@@ -0,0 +1,156 @@
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from models.sql_result import SQLResult
+from persistence.connection_pool import get_pool
+from utils.metrics import counters
+
+CACHE_ENABLED = os.getenv("SQL_RESULT_CACHE_ENABLED", "true").lower() == "true"
+CACHE_MAX_ENTRIES = int(os.getenv("SQL_RESULT_CACHE_MAX_ENTRIES", "256"))
+CACHE_MAX_BYTES = int(os.getenv("SQL_RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# String literals and quoted identifiers are kept verbatim; everything else is normalized
+_QUOTED = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")""")
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace and lowercase everything outside quotes, dropping trailing semicolons"""
+    parts = _QUOTED.split(sql.strip().rstrip(";").strip())
+    normalized = []
+    for i, part in enumerate(parts):
+        if i % 2:
+            normalized.append(part)
+        else:
+            normalized.append(re.sub(r"\s+", " ", part).lower())
+    return "".join(normalized).strip()
+
+
+def read_change_counter(db_path: str) -> Tuple:
+    """File change counter from the database header (bytes 24-27), plus WAL state if present"""
+    with open(db_path, "rb") as f:
+        f.seek(24)
+        counter = int.from_bytes(f.read(4), "big")
+    try:
+        wal = os.stat(db_path + "-wal")
+        return counter, wal.st_mtime_ns, wal.st_size
+    except FileNotFoundError:
+        return (counter,)
+
+
+# Last PRAGMA data_version seen per connection, and a generation bumped whenever one moves
+_data_versions: Dict[int, int] = {}
+_generation = 0
+_version_lock = threading.Lock()
+
+
+def database_version(conn: sqlite3.Connection) -> Tuple:
+    """
+    Version of the connection's database: its path, file change counter
+    (with WAL state) and a generation bumped whenever PRAGMA data_version
+    moves on any connection seen here, so a commit by another process is
+    noticed even when WAL leaves the main file untouched.
+    """
+    global _generation
+    path = next((file for _, name, file in conn.execute("PRAGMA database_list;") if name == "main"), "")
+    data_version = conn.execute("PRAGMA data_version;").fetchone()[0]
+    with _version_lock:
+        last = _data_versions.get(id(conn))
+        if last is not None and last != data_version:
+            _generation += 1
+        _data_versions[id(conn)] = data_version
+        generation = _generation
+    try:
+        change_counter = read_change_counter(path)
+    except OSError:
+        change_counter = ()
+    return path, change_counter, generation
+
+
+class ResultCache:
+    """
+    LRU cache of SQLResult objects keyed by normalized SQL.
+
+    Every entry remembers the database_version it was computed against, so a
+    commit by any other process invalidates every cached result.
+    """
+
+    def __init__(self, db_path: str, max_entries: int = CACHE_MAX_ENTRIES, max_bytes: int = CACHE_MAX_BYTES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[Tuple, SQLResult]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def version(self, conn: sqlite3.Connection) -> Tuple:
+        """Current database version as seen through the given connection"""
+        return database_version(conn)
+
+    def get(self, sql: str, version: Tuple) -> Optional[SQLResult]:
+        key = normalize_sql(sql)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                counters.increment("sql_result_cache.hits")
+                return entry[1]
+            if entry is not None:
+                self._remove(key)
+                counters.increment("sql_result_cache.invalidations")
+        counters.increment("sql_result_cache.misses")
+        return None
+
+    def put(self, sql: str, version: Tuple, result: SQLResult):
+        if result.size_bytes > self.max_bytes:
+            return
+        key = normalize_sql(sql)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (version, result)
+            self._bytes += result.size_bytes
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                counters.increment("sql_result_cache.evictions")
+
+    def _remove(self, key: str):
+        _, result = self._entries.pop(key)
+        self._bytes -= result.size_bytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        hits = counters.get("sql_result_cache.hits")
+        misses = counters.get("sql_result_cache.misses")
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": hits,
+                "misses": misses,
+                "evictions": counters.get("sql_result_cache.evictions"),
+                "invalidations": counters.get("sql_result_cache.invalidations"),
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            }
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """Return the process-wide result cache, or None when disabled"""
+    global _cache
+    if not CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache(get_pool().db_path)
+    return _cache
@@ -0,0 +1,142 @@
+import asyncio
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
+from models.schema import State
+from services.classifiers.classify_sql_needed_or_not import classify_sql_needed_or_not, aclassify_sql_needed_or_not
+from services.sql.generate_sql_query import fetch_schema_context, draft_sql, adraft_sql
+from utils.metrics import counters
+
+# One event per run of the parallel step, so the classifier branch can tell the
+# speculative SQL branch to stop before it spends an LLM call. The event must
+# outlive both branches (the classifier may finish before the SQL branch starts),
+# so it is removed by resolve_speculation, or after _CANCEL_EVENT_TTL seconds
+# when a turn never gets there.
+_cancel_events: Dict[Tuple, Tuple[threading.Event, float]] = {}
+_cancel_events_lock = threading.Lock()
+_CANCEL_EVENT_TTL = 300.0
+
+
+def _last_user_message(state: State):
+    return next(
+        (msg for msg in reversed(state["messages"]) if isinstance(msg, HumanMessage)),
+        None,
+    )
+
+
+def _run_key(config: Optional[RunnableConfig]) -> Tuple:
+    """(thread_id, checkpoint the step started from): the same for both parallel branches, unique per run"""
+    configurable = (config or {}).get("configurable", {})
+    return configurable.get("thread_id"), configurable.get("checkpoint_map", {}).get("")
+
+
+def _cancel_event(config: Optional[RunnableConfig]) -> threading.Event:
+    key = _run_key(config)
+    now = time.monotonic()
+    with _cancel_events_lock:
+        for stale in [k for k, (_, created) in _cancel_events.items() if now - created > _CANCEL_EVENT_TTL]:
+            del _cancel_events[stale]
+        if key not in _cancel_events:
+            _cancel_events[key] = (threading.Event(), now)
+        return _cancel_events[key][0]
+
+
+def _release_cancel_events(config: Optional[RunnableConfig]):
+    """Forget the events of the thread's finished parallel step (turns on one thread never overlap)"""
+    thread_id = _run_key(config)[0]
+    if thread_id is None:
+        return
+    with _cancel_events_lock:
+        for key in [k for k in _cancel_events if k[0] == thread_id]:
+            del _cancel_events[key]
+
+
+def speculative_classify(state: State, config: RunnableConfig = None) -> dict:
+    """Classifier branch: signals the SQL branch as soon as no SQL is needed"""
+    result = classify_sql_needed_or_not(state)
+    if not result.get("sql_needed_or_not"):
+        _cancel_event(config).set()
+    return result
+
+
+async def aspeculative_classify(state: State, config: RunnableConfig = None) -> dict:
+    """Async speculative_classify"""
+    result = await aclassify_sql_needed_or_not(state)
+    if not result.get("sql_needed_or_not"):
+        _cancel_event(config).set()
+    return result
+
+
+def speculative_generate_sql(state: State, config: RunnableConfig = None) -> dict:
+    """
+    SQL branch, run in parallel with the classifier: retrieve schema context and
+    draft SQL as if the question needs it. Skips the LLM call if the classifier
+    has already ruled SQL out by the time retrieval finishes.
+    """
+    counters.increment("speculation.started")
+    message = _last_user_message(state)
+    if not message or not message.content.strip():
+        return {"sql_query": "", "speculation_status": "failed"}
+
+    start = time.perf_counter()
+    rag_context = fetch_schema_context(message.content)
+    if _cancel_event(config).is_set():
+        counters.increment("speculation.cancelled")
+        return {"sql_query": "", "speculation_status": "cancelled"}
+
+    try:
+        sql_query = draft_sql(message.content, rag_context)
+    except Exception as e:
+        print(f"❌ [services/sql/speculative_sql.py:speculative_generate_sql] Error drafting SQL: {str(e)}")
+        return {"sql_query": "", "speculation_status": "failed"}
+
+    counters.increment("speculation.draft_seconds", time.perf_counter() - start)
+    return {"sql_query": sql_query, "speculation_status": "drafted"}
+
+
+async def aspeculative_generate_sql(state: State, config: RunnableConfig = None) -> dict:
+    """Async speculative_generate_sql"""
+    counters.increment("speculation.started")
+    message = _last_user_message(state)
+    if not message or not message.content.strip():
+        return {"sql_query": "", "speculation_status": "failed"}
+
+    start = time.perf_counter()
+    rag_context = await asyncio.to_thread(fetch_schema_context, message.content)
+    if _cancel_event(config).is_set():
+        counters.increment("speculation.cancelled")
+        return {"sql_query": "", "speculation_status": "cancelled"}
+
+    try:
+        sql_query = await adraft_sql(message.content, rag_context)
+    except Exception as e:
+        print(f"❌ [services/sql/speculative_sql.py:aspeculative_generate_sql] Error drafting SQL: {str(e)}")
+        return {"sql_query": "", "speculation_status": "failed"}
+
+    counters.increment("speculation.draft_seconds", time.perf_counter() - start)
+    return {"sql_query": sql_query, "speculation_status": "drafted"}
+
+
+def resolve_speculation(state: State, config: RunnableConfig = None) -> dict:
+    """Join node: keep the drafted SQL if the classifier wants SQL, otherwise discard it"""
+    _release_cancel_events(config)
+    status = state.get("speculation_status", "")
+    sql_query = state.get("sql_query", "")
+
+    if state.get("sql_needed_or_not"):
+        if status == "drafted" and sql_query:
+            counters.increment("speculation.used")
+            print(f"\n🔍 Generated SQL Query (speculative):")
+            print(f"```sql")
+            print(f"{sql_query}")
+            print(f"```")
+            print(f"📊 Executing query...")
+            return {"messages": [SystemMessage(content=f"Generated SQL using RAG context: {sql_query}")]}
+        return {}
+
+    if status == "drafted":
+        counters.increment("speculation.wasted")
+        print(f"🗑️ Discarded speculative SQL (classifier: no SQL needed); wasted calls so far: {int(counters.get('speculation.wasted'))}")
+    return {"sql_query": ""}
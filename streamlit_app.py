@@ -1,16 +1,27 @@
+import os
 import streamlit as st
 import time
+import uuid
 from typing import List, Dict, Any
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from models.schema import State
-from graph.graph import graph
 from config.config import set_env_variables
-from services.llm_connector.llm_connector import load_llm
-from utils.cache_cleaner import clean_pycache
 
-# Initialize environment and LLM
+# Load .env before the modules below read their settings
 set_env_variables()
-llm = load_llm()
+
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from models.schema import State
+from services.runtime.runtime import get_runtime
+from services.chat.streaming import stream_turn, final_answer, thread_config
+from utils.cache_cleaner import CLEAN_PYCACHE, clean_pycache
+
+# Initialize the shared runtime (built once per process, not per rerun)
+runtime = get_runtime()
+runtime.startup()
+
+# Optionally rebuild the knowledge base in the background when the DB schema changes
+if os.getenv("SCHEMA_WATCHER", "false").lower() == "true":
+    from RAG.knowledge_base_generation import start_schema_watcher
+    start_schema_watcher()
 
 # Page configuration
 st.set_page_config(
@@ -180,54 +191,78 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+def _restore_messages(thread_id: str) -> List[Dict[str, Any]]:
+    """Rebuild the visible chat from the thread's last checkpoint (the bounded message window)"""
+    try:
+        saved = runtime.graph.get_state(thread_config(thread_id)).values
+    except Exception as e:
+        print(f"❌ [streamlit_app.py:_restore_messages] Error loading checkpoint: {str(e)}")
+        return []
+    return [
+        {"role": "user" if isinstance(msg, HumanMessage) else "assistant", "content": msg.content}
+        for msg in saved.get("messages", [])
+        if isinstance(msg, (HumanMessage, AIMessage))
+    ]
+
 def initialize_session_state():
     """Initialize session state variables"""
+    if "thread_id" not in st.session_state:
+        # The session id in the URL lets a reload (or another server) resume the checkpointed conversation
+        st.session_state.thread_id = st.query_params.get("session") or uuid.uuid4().hex
+        st.query_params["session"] = st.session_state.thread_id
     if "messages" not in st.session_state:
-        st.session_state.messages = []
+        st.session_state.messages = _restore_messages(st.session_state.thread_id)
     if "state" not in st.session_state:
         st.session_state.state = {
             "messages": [],
-            "memory": []
         }
     if "processing" not in st.session_state:
         st.session_state.processing = False
 
 def clear_chat():
-    """Clear the chat history"""
+    """Clear the chat history and start a new checkpointed thread"""
+    try:
+        runtime.checkpointer.delete_thread(st.session_state.thread_id)
+    except Exception as e:
+        print(f"❌ [streamlit_app.py:clear_chat] Error deleting checkpoint: {str(e)}")
+    st.session_state.thread_id = uuid.uuid4().hex
+    st.query_params["session"] = st.session_state.thread_id
     st.session_state.messages = []
     st.session_state.state = {
         "messages": [],
-        "memory": []
     }
 
-def process_message(user_input: str) -> str:
-    """Process user message through the agentic RAG system"""
+def process_message(user_input: str, placeholder=None) -> str:
+    """Process user message through the agentic RAG system, rendering tokens into placeholder as they arrive"""
     try:
-        # Initialize the graph
-        app = graph()
+        # Reuse the workflow compiled once for every session
+        app = runtime.graph
         
-        # Add user message to state
-        st.session_state.state["messages"].append(HumanMessage(content=user_input))
+        # Only the new message is sent; history is restored from the checkpoint
+        turn = {"messages": [HumanMessage(content=user_input)]}
         
-        # Execute graph
-        output = app.invoke(st.session_state.state)
-        st.session_state.state.update(output)
+        # Execute graph, streaming the answer
+        response_text = ""
+        for kind, payload in stream_turn(app, turn, thread_config(st.session_state.thread_id)):
+            if kind == "token":
+                response_text += payload
+                if placeholder is not None:
+                    display_message("assistant", response_text + "▌", placeholder)
+            else:
+                st.session_state.state = payload.state
+                st.session_state.last_timings = {
+                    "time_to_first_token": payload.time_to_first_token,
+                    "total_seconds": payload.total_seconds,
+                }
         
         # Get the last AI message
-        if st.session_state.state["messages"]:
-            last_message = st.session_state.state["messages"][-1]
-            if isinstance(last_message, AIMessage):
-                return last_message.content
-            else:
-                return "I'm sorry, I couldn't generate a response. Please try again."
-        else:
-            return "I'm sorry, I couldn't generate a response. Please try again."
+        return final_answer(st.session_state.state)
             
     except Exception as e:
         return f"I'm sorry, I encountered an error: {str(e)}"
 
-def display_message(role: str, content: str):
-    """Display a chat message with proper styling"""
+def display_message(role: str, content: str, container=None):
+    """Display a chat message with proper styling (optionally inside a placeholder container)"""
     if role == "user":
         avatar = "👤"
         avatar_class = "user-avatar"
@@ -237,7 +272,7 @@ def display_message(role: str, content: str):
         avatar_class = "assistant-avatar"
         message_class = "assistant-message"
     
-    st.markdown(f"""
+    (container or st).markdown(f"""
     <div class="chat-message {message_class}">
         <div class="message-avatar {avatar_class}">{avatar}</div>
         <div class="message-content">{content}</div>
@@ -277,7 +312,7 @@ def main():
         
         st.markdown("---")
         st.markdown("### System Status")
-        if llm:
+        if runtime.llm:
             st.success("✅ LLM Connected")
         else:
             st.error("❌ LLM Not Available")
@@ -288,6 +323,12 @@ def main():
                 st.info("🔍 SQL Query Mode")
             else:
                 st.info("💬 Chat Mode")
+
+        # Latency of the last answer: first token vs. complete response
+        timings = st.session_state.get("last_timings")
+        if timings:
+            ttft = timings["time_to_first_token"]
+            st.caption(f"⏱️ First token: {f'{ttft:.2f}s' if ttft is not None else 'n/a'} · Total: {timings['total_seconds']:.2f}s")
     
     # Main chat area
     st.title("💬 Agentic RAG with SQL Chat")
@@ -350,9 +391,9 @@ def main():
         # Get the user's message
         user_message = st.session_state.messages[-1]["content"]
         
-        # Process the message
+        # Process the message, rendering the answer incrementally
         with st.spinner("Thinking..."):
-            response = process_message(user_message)
+            response = process_message(user_message, st.empty())
         
         # Add assistant response to display
         st.session_state.messages.append({
@@ -367,6 +408,7 @@ def main():
         st.rerun()
 
 if __name__ == "__main__":
-    # Clean cache on startup
-    clean_pycache()
+    # Clean cache on startup only when asked to: it forces a full recompile
+    if CLEAN_PYCACHE:
+        clean_pycache()
     main() 
\ No newline at end of file
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test the SQLite checkpointer: round trips, pruning, thread deletion and resuming after a restart
+"""
+
+import sys
+import os
+import contextlib
+import io
+import tempfile
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault("SQL_QUESTION_CACHE_ENABLED", "false")
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from benchmarks.graph_invoke_history import ScriptedChatModel
+from graph.graph import graph
+from memory.conversation import ConversationMemory
+from persistence.checkpointer import SQLiteCheckpointSaver
+from services.chat.streaming import thread_config
+from services.llm_connector.llm_connector import set_llm
+
+
+def _saver(**kwargs) -> SQLiteCheckpointSaver:
+    return SQLiteCheckpointSaver(os.path.join(tempfile.mkdtemp(), "checkpoints.db"), **kwargs)
+
+
+def _put(saver: SQLiteCheckpointSaver, thread_id: str, step: int, values: dict) -> dict:
+    """Write a checkpoint on top of the thread's latest one, bumping the version of every channel in values"""
+    config = thread_config(thread_id)
+    latest = saver.get_tuple(config)
+    checkpoint = empty_checkpoint()
+    if latest:
+        config = latest.config
+        checkpoint["channel_versions"] = dict(latest.checkpoint["channel_versions"])
+        checkpoint["channel_values"] = dict(latest.checkpoint["channel_values"])
+    new_versions = {}
+    for channel, value in values.items():
+        new_versions[channel] = saver.get_next_version(checkpoint["channel_versions"].get(channel), None)
+        checkpoint["channel_versions"][channel] = new_versions[channel]
+        checkpoint["channel_values"][channel] = value
+    return saver.put(config, checkpoint, {"source": "loop", "step": step}, new_versions)
+
+
+def _rows(saver: SQLiteCheckpointSaver, table: str, thread_id: str) -> int:
+    return saver._conn.execute(f"SELECT COUNT(*) FROM {table} WHERE thread_id = ?;", (thread_id,)).fetchone()[0]
+
+
+def test_round_trip():
+    """put, get_tuple, list and put_writes return what was stored"""
+    saver = _saver()
+    first = _put(saver, "t", 0, {"messages": ["hi"], "memory": {"turns": 1}})
+    second = _put(saver, "t", 1, {"messages": ["hi", "hello"]})
+    saver.put_writes(second, [("messages", ["pending"]), ("sql_query", "SELECT 1")], task_id="task-1")
+
+    latest = saver.get_tuple(thread_config("t"))
+    assert latest.config == second
+    assert latest.parent_config == first
+    assert latest.checkpoint["channel_values"] == {"messages": ["hi", "hello"], "memory": {"turns": 1}}
+    assert latest.metadata["step"] == 1
+    assert latest.pending_writes == [("task-1", "messages", ["pending"]), ("task-1", "sql_query", "SELECT 1")]
+    assert saver.get_tuple(first).checkpoint["channel_values"] == {"messages": ["hi"], "memory": {"turns": 1}}
+
+    assert [item.config for item in saver.list(thread_config("t"))] == [second, first]
+    assert [item.config for item in saver.list(thread_config("t"), limit=1)] == [second]
+    assert [item.config for item in saver.list(thread_config("t"), before=second)] == [first]
+    assert [item.config for item in saver.list(None, filter={"step": 0})] == [first]
+    saver.close()
+    print("✅ Checkpoints and writes round-trip")
+
+
+def test_keep_last_prunes_unreachable_blobs():
+    """Only keep_last checkpoints survive, with their writes; blobs they still use are kept"""
+    saver = _saver(keep_last=2)
+    configs = [_put(saver, "t", 0, {"a": 0, "b": "kept"})]
+    for step in range(1, 4):
+        saver.put_writes(configs[-1], [("a", step)], task_id=f"task-{step}")
+        configs.append(_put(saver, "t", step, {"a": step}))
+
+    assert [item.config for item in saver.list(thread_config("t"))] == configs[:-3:-1]
+    assert saver.get_tuple(configs[0]) is None
+    assert _rows(saver, "writes", "t") == 1
+    versions = [row[0] for row in saver._conn.execute("SELECT channel FROM blobs WHERE thread_id = 't' ORDER BY channel;")]
+    assert versions == ["a", "a", "b"]
+    assert saver.get_tuple(thread_config("t")).checkpoint["channel_values"] == {"a": 3, "b": "kept"}
+    assert saver.get_tuple(configs[-2]).checkpoint["channel_values"] == {"a": 2, "b": "kept"}
+    saver.close()
+    print("✅ KEEP_LAST pruning drops old checkpoints and unreachable blobs")
+
+
+def test_delete_thread():
+    """delete_thread removes one thread's checkpoints, blobs and writes only"""
+    saver = _saver()
+    for thread_id in ("gone", "kept"):
+        config = _put(saver, thread_id, 0, {"messages": [thread_id]})
+        saver.put_writes(config, [("messages", ["more"])], task_id="task")
+    saver.delete_thread("gone")
+
+    assert saver.get_tuple(thread_config("gone")) is None
+    assert all(_rows(saver, table, "gone") == 0 for table in ("checkpoints", "blobs", "writes"))
+    assert saver.get_tuple(thread_config("kept")).checkpoint["channel_values"] == {"messages": ["kept"]}
+    assert _rows(saver, "writes", "kept") == 1
+    saver.close()
+    print("✅ delete_thread removes only that thread")
+
+
+def test_memory_resumes_after_restart():
+    """A new saver on the same file resumes the conversation; memory turns come back as lists"""
+    set_llm(ScriptedChatModel())
+    path = os.path.join(tempfile.mkdtemp(), "checkpoints.db")
+    config = thread_config("restart-test")
+
+    saver = SQLiteCheckpointSaver(path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = graph(speculative=False, checkpointer=saver)
+        for i in range(2):
+            app.invoke({"messages": [HumanMessage(content=f"How many tables? {i}")]}, config)
+    saver.close()
+
+    saver = SQLiteCheckpointSaver(path)
+    app = graph(speculative=False, checkpointer=saver)
+    memory = app.get_state(config).values["memory"]
+    assert isinstance(memory, ConversationMemory)
+    assert memory.total_turns == 2
+    assert all(isinstance(turn, list) for turn in memory.turns)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        app.invoke({"messages": [HumanMessage(content="How many tables? 2")]}, config)
+    memory = app.get_state(config).values["memory"]
+    assert memory.total_turns == 3
+    assert [msg.content for msg in memory.history()[::2]] == [f"How many tables? {i}" for i in range(3)]
+    saver.close()
+    print("✅ Conversation memory resumes after a restart")
+
+
+if __name__ == "__main__":
+    test_round_trip()
+    test_keep_last_prunes_unreachable_blobs()
+    test_delete_thread()
+    test_memory_resumes_after_restart()
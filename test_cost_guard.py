@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Test that the cost guard's injected LIMIT survives trailing comments and semicolons
+"""
+
+import sys
+import os
+import sqlite3
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.sql.cost_guard import inject_limit, strip_statement
+
+
+def _connection():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE Track (TrackId INTEGER PRIMARY KEY, Name TEXT);")
+    conn.execute("CREATE TABLE InvoiceLine (InvoiceLineId INTEGER PRIMARY KEY, TrackId INTEGER);")
+    conn.executemany("INSERT INTO Track VALUES (?, ?);", [(i, f"t{i}") for i in range(50)])
+    conn.executemany("INSERT INTO InvoiceLine VALUES (?, ?);", [(i, i % 50) for i in range(50)])
+    return conn
+
+
+def test_inject_limit_trailing_line_comment():
+    """A trailing -- comment must not swallow the closing parenthesis"""
+    conn = _connection()
+    for sql in ["SELECT * FROM Track t, InvoiceLine il -- every pair",
+                "SELECT * FROM Track t, InvoiceLine il; -- every pair",
+                "SELECT * FROM Track t, InvoiceLine il /* every pair */ ;\n",
+                "SELECT * FROM Track t,\n  InvoiceLine il -- every pair\n-- and a second comment"]:
+        rows = conn.execute(inject_limit(sql, 10)).fetchall()
+        assert len(rows) == 10, sql
+    print("✅ Injected LIMIT runs with trailing comments")
+
+
+def test_strip_statement_keeps_quoted_text():
+    """Comment markers and semicolons inside quotes are part of the statement"""
+    assert strip_statement("SELECT '--x;' AS a; -- note") == "SELECT '--x;' AS a"
+    assert strip_statement('SELECT "a--b" FROM t /* c */') == 'SELECT "a--b" FROM t'
+    assert strip_statement("SELECT 1 -- a\n-- b\n;;  ") == "SELECT 1"
+    print("✅ Quoted text is left alone")
+
+
+if __name__ == "__main__":
+    test_inject_limit_trailing_line_comment()
+    test_strip_statement_keeps_quoted_text()
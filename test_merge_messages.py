@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Test the State["messages"] reducer: the append fast path and the add_messages fallback
+"""
+
+import sys
+import os
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, SystemMessage
+from memory.conversation import SQL_RESULT_MESSAGE, compact_messages, merge_messages
+
+
+def _history(turns):
+    messages = []
+    for i in range(turns):
+        messages = merge_messages(messages, [HumanMessage(content=f"q{i}")])
+        messages = merge_messages(messages, [SystemMessage(content=f"table {i}", name=SQL_RESULT_MESSAGE),
+                                             AIMessage(content=f"a{i}")])
+    return messages
+
+
+def test_append_fast_path():
+    """New id-less messages get unique ids and are appended without touching the input list"""
+    left = _history(1)
+    before = list(left)
+    merged = merge_messages(left, HumanMessage(content="next"))
+    assert left == before and len(left) == 3
+    assert [msg.content for msg in merged] == ["q0", "table 0", "a0", "next"]
+    ids = [msg.id for msg in merged]
+    assert all(ids) and len(set(ids)) == len(ids)
+    assert merge_messages(left, []) is left
+    print("✅ Fast path assigns ids and leaves the input list alone")
+
+
+def test_compaction_falls_back_to_add_messages():
+    """RemoveMessage and id replacements from compact_messages are applied by add_messages"""
+    messages = _history(3)
+    updates = compact_messages(messages, window_turns=2, sql_payload_turns=1)
+    assert any(isinstance(msg, RemoveMessage) for msg in updates)
+    merged = merge_messages(messages, updates)
+
+    assert [msg.content for msg in merged if isinstance(msg, HumanMessage)] == ["q1", "q2"]
+    assert [msg.id for msg in merged] == [msg.id for msg in messages[3:]]
+    tables = [msg.content for msg in merged if isinstance(msg, SystemMessage)]
+    assert tables == ["[SQL result evicted from memory]", "table 2"]
+    assert len(messages) == 9
+    print("✅ Removals and replacements go through add_messages")
+
+
+if __name__ == "__main__":
+    test_append_fast_path()
+    test_compaction_falls_back_to_add_messages()
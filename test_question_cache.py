@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test which literals pin a cached question to its SQL
+"""
+
+import sys
+import os
+import tempfile
+import numpy as np
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.sql.question_cache import QuestionCache, question_literals
+
+
+class _OfflineCache(QuestionCache):
+    """QuestionCache with one orthogonal vector per question and a fixed schema version"""
+
+    def _embed(self, question):
+        vector = np.zeros(256, dtype=np.float32)
+        vector[int(question.split()[-1].rstrip("?")) % 256] = 1.0
+        return vector
+
+    def _current_schema_version(self):
+        return 1
+
+
+def test_question_literals():
+    """Numbers, quoted values and names are literals; question words are not"""
+    assert question_literals("How many invoices in 2009?") == ["2009"]
+    assert question_literals("How many invoices in 2009?") != question_literals("How many invoices in 2010?")
+    assert question_literals("List the albums by AC/DC") == ["AC/DC"]
+    assert question_literals("Which tracks have genre 'Rock'?") == ["Rock"]
+    assert question_literals("Show customers from Germany's capital") == ["Germany"]
+    assert question_literals("Which employee supports the most customers?") == []
+    print("✅ Question literals extracted")
+
+
+def test_dropped_entries_stay_dropped_after_compaction():
+    """Entries invalidated while the log compacts must not come back on reload"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "question_cache.jsonl")
+        cache = _OfflineCache(path)
+        for i in range(120):
+            cache.add(f"Invoices in {i}?", f"SELECT {i}")
+        for i in range(60):
+            cache.invalidate(f"SELECT {i}")
+        live = sorted(entry["sql"] for entry in cache._entries)
+        assert len(live) == 60
+
+        reloaded = _OfflineCache(path)
+        assert sorted(entry["sql"] for entry in reloaded._entries) == live
+        assert reloaded._vectors.shape[0] == 60
+        assert reloaded.lookup("Invoices in 40?") is None
+        assert reloaded.lookup("Invoices in 100?")[0] == "SELECT 100"
+    print("✅ Dropped entries stay dropped after compaction")
+
+
+if __name__ == "__main__":
+    test_question_literals()
+    test_dropped_entries_stay_dropped_after_compaction()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Test schema extraction on indexes without plain column names
+"""
+
+import sys
+import os
+import sqlite3
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from RAG.schema_extractor import format_schema_chunk, iter_table_schemas
+
+
+def test_expression_index():
+    """An expression index is listed with <expr> instead of stopping extraction"""
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, x TEXT, y TEXT);")
+    conn.execute("CREATE INDEX ei ON t(lower(x));")
+    conn.execute("CREATE INDEX mixed ON t(y, lower(x) COLLATE NOCASE);")
+    conn.execute("CREATE TABLE u (id INTEGER PRIMARY KEY, t_id INTEGER REFERENCES t(id));")
+
+    schemas = {schema["table"]: schema for schema in iter_table_schemas(conn)}
+    assert set(schemas) == {"t", "u"}
+    indexes = {index["name"]: index["columns"] for index in schemas["t"]["indexes"]}
+    assert indexes == {"ei": ["<expr>"], "mixed": ["y", "<expr>"]}
+
+    chunk = format_schema_chunk(schemas["t"])
+    assert "  - ei (<expr>)" in chunk
+    assert "  - mixed (y, <expr>)" in chunk
+    print("✅ Expression indexes are extracted")
+
+
+if __name__ == "__main__":
+    test_expression_index()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Test that the speculative SQL branch is cancelled when the classifier answers first
+"""
+
+import sys
+import os
+import contextlib
+import io
+import time
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault("SQL_QUESTION_CACHE_ENABLED", "false")
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from benchmarks.graph_invoke_history import ScriptedChatModel
+from graph.graph import graph
+from services.chat.streaming import thread_config
+from services.llm_connector.llm_connector import set_llm
+from services.sql import speculative_sql
+from utils.metrics import counters
+
+
+def test_classifier_finishes_first():
+    """An instant "no SQL" classifier stops the draft of a slower SQL branch, and no event is left behind"""
+    drafts = []
+    originals = (speculative_sql.classify_sql_needed_or_not, speculative_sql.fetch_schema_context,
+                 speculative_sql.draft_sql)
+    speculative_sql.classify_sql_needed_or_not = lambda state: {"sql_needed_or_not": False}
+    speculative_sql.fetch_schema_context = lambda question: time.sleep(0.2) or ""
+    speculative_sql.draft_sql = lambda question, context: drafts.append(question) or "SELECT 1"
+    try:
+        set_llm(ScriptedChatModel())
+        app = graph(speculative=True, checkpointer=InMemorySaver())
+        cancelled = counters.get("speculation.cancelled")
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(3):
+                app.invoke({"messages": [HumanMessage(content=f"Hello {i}")]}, thread_config("speculation-test"))
+    finally:
+        (speculative_sql.classify_sql_needed_or_not, speculative_sql.fetch_schema_context,
+         speculative_sql.draft_sql) = originals
+
+    assert drafts == []
+    assert counters.get("speculation.cancelled") - cancelled == 3
+    assert speculative_sql._cancel_events == {}
+    print("✅ Speculative draft cancelled when the classifier answers first")
+
+
+if __name__ == "__main__":
+    test_classifier_finishes_first()
@@ -1,6 +1,9 @@
 import os
 import shutil
 
+# Wiping __pycache__ forces every module to be recompiled on the next launch, so it is opt-in
+CLEAN_PYCACHE = os.getenv("CLEAN_PYCACHE", "false").lower() == "true"
+
 def clean_pycache():
     """Clean all __pycache__ directories"""
     try:
@@ -0,0 +1,32 @@
+import threading
+from typing import Dict
+
+
+class Counters:
+    """Thread-safe named counters shared by the caches, pools and graph nodes"""
+
+    def __init__(self):
+        self._values: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1):
+        with self._lock:
+            self._values[name] = self._values.get(name, 0) + value
+
+    def get(self, name: str) -> float:
+        with self._lock:
+            return self._values.get(name, 0)
+
+    def snapshot(self, prefix: str = "") -> Dict[str, float]:
+        """Return a copy of every counter whose name starts with prefix"""
+        with self._lock:
+            return {name: value for name, value in self._values.items() if name.startswith(prefix)}
+
+    def reset(self, prefix: str = ""):
+        with self._lock:
+            for name in [name for name in self._values if name.startswith(prefix)]:
+                del self._values[name]
+
+
+# Process-wide registry
+counters = Counters()
@@ -0,0 +1,87 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+# Lines written by the profiled child to separate its import phase from runtime startup
+_PHASE_MARKER = "startup-profile-phase:"
+_RESULT_MARKER = "startup-profile-result:"
+
+_CHILD = """
+import json, sys, time
+print({phase!r} + "imports", file=sys.stderr, flush=True)
+start = time.perf_counter()
+for module in {modules!r}:
+    __import__(module)
+imports = time.perf_counter() - start
+print({phase!r} + "startup", file=sys.stderr, flush=True)
+from services.runtime.runtime import get_runtime
+runtime = get_runtime()
+start = time.perf_counter()
+runtime.startup()
+startup = time.perf_counter() - start
+print({result!r} + json.dumps({{"imports": imports, "startup": startup, "resources": runtime.timings}}), flush=True)
+"""
+
+
+def _parse_importtime(stderr: str) -> Dict[str, List[Tuple[str, int, int]]]:
+    """-X importtime lines per phase as (module, self us, cumulative us)"""
+    phases: Dict[str, List[Tuple[str, int, int]]] = defaultdict(list)
+    phase = "interpreter"
+    for line in stderr.splitlines():
+        if line.startswith(_PHASE_MARKER):
+            phase = line[len(_PHASE_MARKER):]
+            continue
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        phases[phase].append((name.strip(), int(self_us), int(cumulative_us)))
+    return phases
+
+
+def _print_phase(title: str, records: List[Tuple[str, int, int]], top: int):
+    if not records:
+        return
+    by_package: Dict[str, int] = defaultdict(int)
+    for name, self_us, _ in records:
+        by_package[name.split(".")[0]] += self_us
+    total = sum(by_package.values())
+    print(f"\n{title}: {total / 1e6:.2f}s in {len(records)} modules")
+    print(f"  {'package':<40} {'self s':>8}")
+    for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {package:<40} {self_us / 1e6:>8.3f}")
+    print(f"  {'slowest modules (incl. their imports)':<40} {'cum s':>8}")
+    for name, _, cumulative_us in sorted(records, key=lambda record: -record[2])[:top]:
+        print(f"  {name:<40} {cumulative_us / 1e6:>8.3f}")
+
+
+def profile_startup(modules: List[str], top: int = 15) -> int:
+    """
+    Import modules and start the runtime in a fresh interpreter under
+    -X importtime, then print where the time went: per package and module for
+    the imports and for runtime startup, plus the build time of each resource.
+    Honors RUNTIME_STARTUP, so eager and lazy startups can be compared.
+    """
+    code = _CHILD.format(phase=_PHASE_MARKER, result=_RESULT_MARKER, modules=modules)
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                               capture_output=True, text=True)
+    result = next((line[len(_RESULT_MARKER):] for line in completed.stdout.splitlines() if line.startswith(_RESULT_MARKER)), None)
+    if completed.returncode != 0 or result is None:
+        print(f"❌ [utils/startup_profile.py:profile_startup] Profiled startup failed (exit {completed.returncode})")
+        print(completed.stderr[-2000:])
+        return completed.returncode or 1
+
+    summary = json.loads(result)
+    phases = _parse_importtime(completed.stderr)
+    print(f"⏱️ Startup profile ({os.getenv('RUNTIME_STARTUP', 'eager')} mode): "
+          f"imports {summary['imports']:.2f}s, runtime startup {summary['startup']:.2f}s")
+    _print_phase("Imports", phases.get("imports", []), top)
+    _print_phase("Imports during runtime startup", phases.get("startup", []), top)
+    resources = {name: seconds for name, seconds in summary["resources"].items() if name != "total"}
+    if resources:
+        print("\nResource initialization:")
+        for name, seconds in resources.items():
+            print(f"  {name:<40} {seconds:>8.3f}")
+    return 0